@@ -1,9 +1,9 @@
 import backend.middleware as middleware
-from pydantic import BaseModel
 import datetime
+from uuid import uuid4
 
 
-class Model(BaseModel):
+class Model(middleware.Model):
     urlTitle: str
     title: str
     description: str
@@ -11,8 +11,8 @@ class Model(BaseModel):
     content: str
 
     @classmethod
-    def build(cls, event: middleware.Event, context):
-        return cls(**event.body)
+    def request_values(cls, event: middleware.Event, context):
+        return event.body
 
 
 article_table = middleware.get_article_table()
@@ -23,14 +23,27 @@ article_table = middleware.get_article_table()
 @middleware.admin_guard
 @middleware.data(Model)
 def handler(event: middleware.Event, context, data: Model):
-    article_table.put_item(
-        Item={
-            "urlTitle": data.urlTitle,
-            "title": data.title,
-            "tag": data.tag,
-            "content": data.content,
-            "description": data.description,
-            "published": datetime.date.today().isoformat()
-        }
-    )
+    published = datetime.date.today().isoformat()
+    try:
+        middleware.transact_write_items([
+            {"Put": {
+                "TableName": article_table.name,
+                "Item": {
+                    "urlTitle": data.urlTitle,
+                    "title": data.title,
+                    "tag": data.tag,
+                    **middleware.article_content.attributes(data.content),
+                    "description": data.description,
+                    "published": published,
+                    "collection": "article",  # partition key of the publishedIndex
+                    "version": uuid4().hex
+                },
+                "ConditionExpression": "attribute_not_exists(urlTitle)"
+            }},
+            middleware.tag_catalog.add_article(data.tag, published)
+        ])
+    except middleware.TransactionCanceled as e:
+        if e.reasons and e.reasons[0] == "ConditionalCheckFailed":
+            return middleware.Response(status_code=409, error_messages=["Article already exists"])
+        return middleware.Response(status_code=409, error_messages=["Conflicting write, please retry"])
     return middleware.Response(status_code=201)
@@ -1,13 +1,12 @@
 import backend.middleware as middleware
-from pydantic import BaseModel
 
 
-class Model(BaseModel):
+class Model(middleware.Model):
     urlTitle: str
 
     @classmethod
-    def build(cls, event: middleware.Event, context):
-        return cls(urlTitle=event.path_parameters.get("articleUrlTitle"))
+    def request_values(cls, event: middleware.Event, context):
+        return {"urlTitle": event.path_parameters.get("articleUrlTitle")}
 
 
 article_table = middleware.get_article_table()
@@ -18,5 +17,20 @@ article_table = middleware.get_article_table()
 @middleware.admin_guard
 @middleware.data(Model)
 def handler(event: middleware.Event, context, data: Model):
-    article_table.delete_item(Key={"urlTitle": data.urlTitle})
+    article = article_table.get_item(
+        Key={"urlTitle": data.urlTitle}, ProjectionExpression="tag", ConsistentRead=True).get("Item")
+    if not article:
+        return middleware.Response()
+    try:
+        middleware.transact_write_items([
+            {"Delete": {
+                "TableName": article_table.name,
+                "Key": {"urlTitle": data.urlTitle},
+                "ConditionExpression": "tag = :tag",  # the tag catalog is updated based on this tag
+                "ExpressionAttributeValues": {":tag": article["tag"]}
+            }},
+            middleware.tag_catalog.remove_article(article["tag"])
+        ])
+    except middleware.TransactionCanceled:
+        return middleware.Response(status_code=409, error_messages=["Conflicting write, please retry"])
     return middleware.Response()
@@ -1,22 +1,46 @@
 import backend.middleware as middleware
-from pydantic import BaseModel
+from typing import List, Optional
 
 
-class Model(BaseModel):
+class Model(middleware.Model):
     urlTitle: str
 
     @classmethod
-    def build(cls, event: middleware.Event, context):
-        return cls(urlTitle=event.path_parameters.get("articleUrlTitle"))
+    def request_values(cls, event: middleware.Event, context):
+        return {"urlTitle": event.path_parameters.get("articleUrlTitle")}
 
 
+# attributes selectable with ?fields= (urlTitle is always included)
+FIELDS = ("title", "description", "tag", "content", "published", "version")
+
 article_table = middleware.get_article_table()
 
 
-@middleware.middleware
+def load_article(url_title: str, projection: Optional[List[str]] = None) -> Optional[dict]:
+    article = article_table.get_item(Key={"urlTitle": url_title}, projection=projection).get("Item")
+    if article is not None:
+        article.pop("collection", None)  # index key (publishedIndex)
+        middleware.article_content.decode(article)
+    return article
+
+
+def is_current(article: dict) -> bool:
+    """Revalidates a cached article by reading its version attribute only"""
+    item = article_table.get_item(Key={"urlTitle": article["urlTitle"]}, ProjectionExpression="version").get("Item")
+    return item is not None and item.get("version") == article.get("version")
+
+
+@middleware.middleware(cache_control="public, max-age=60")
 @middleware.data(Model)
-def handler(event: middleware.Event, context, data: Model):
-    article = article_table.get_item(Key={"urlTitle": data.urlTitle}).get("Item")
+@middleware.fields(FIELDS)
+def handler(event: middleware.Event, context, data: Model, fields: middleware.Fields):
+    # the version is read for the ETag/ revalidation, contentEncoding to decode the content
+    projection = fields.projection("urlTitle", "version", "contentEncoding")
+    article = middleware.cache.get_or_load(
+        middleware.cache.key(article_table.name, {"urlTitle": data.urlTitle},
+                             ",".join(projection) if projection else None),
+        lambda: load_article(data.urlTitle, projection),
+        revalidate=is_current)
     if not article:
         return middleware.Response(status_code=404, error_messages=["Article does not exist"])
-    return middleware.Response(body={"article": article})
+    return middleware.Response(body={"article": fields.select(article)}, etag=article.get("version"))
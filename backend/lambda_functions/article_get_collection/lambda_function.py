@@ -1,11 +1,121 @@
 import backend.middleware as middleware
+import boto3.dynamodb.conditions
+import os
+from typing import List, Optional
 
 
-article_table = middleware.get_article_table()
+DEFAULT_LIMIT = 20
+MAX_URL_TITLES = 100
+SUMMARY_ATTRIBUTES = ["urlTitle", "title", "description", "tag", "published"]
+CURSOR_KEYS = {"collection", "published", "urlTitle"}
 
+# during the migration to the publishedIndex (articles without the "collection" attribute are not indexed):
+# scan the whole table and return all articles at once
+legacy_scan = os.environ.get("ArticleCollectionLegacyScan", "false").lower() == "true"
 
-@middleware.middleware
-def handler(event: middleware.Event, context):
-    articles = article_table.scan_paginate_items(ProjectionExpression="urlTitle,title,description,tag,published")
+
+class Model(middleware.Model):
+    limit: Optional[int] = None
+    cursor: Optional[str] = None
+    urlTitles: Optional[str] = None
+    view: Optional[str] = None
+
+    @classmethod
+    def request_values(cls, event: middleware.Event, context):
+        return {
+            "limit": event.query_string_parameters.get("limit"),
+            "cursor": event.query_string_parameters.get("cursor"),
+            "urlTitles": event.query_string_parameters.get("urlTitles"),
+            "view": event.query_string_parameters.get("view")
+        }
+
+
+article_table = middleware.get_article_table(low_level=True)
+
+
+def add_activity(articles: list):
+    """Adds commentCount, replyCount and lastActivity (maintained by the projection worker) to the articles"""
+    activity = middleware.projections.get_article_activity(article["urlTitle"] for article in articles)
+    for article in articles:
+        article.update(activity.get(article["urlTitle"], {}))
+
+
+def scan_all() -> dict:
+    articles = article_table.scan_paginate_items(ProjectionExpression=",".join(SUMMARY_ATTRIBUTES))
     articles.sort(key=lambda item: item["published"], reverse=True)
-    return middleware.Response(body={"articles": articles})
+    return {"articles": list(articles)}
+
+
+def query_page(limit: int, start_key: Optional[dict]) -> dict:
+    response = article_table.query(
+        IndexName="publishedIndex",
+        KeyConditionExpression=boto3.dynamodb.conditions.Key("collection").eq("article"),
+        ProjectionExpression=",".join(SUMMARY_ATTRIBUTES),
+        ScanIndexForward=False,
+        Limit=limit,
+        ExclusiveStartKey=start_key
+    )
+    return {"articles": response["Items"], "lastEvaluatedKey": response.get("LastEvaluatedKey")}
+
+
+def get_batch(url_titles: List[str], full: bool) -> middleware.Response:
+    """The requested articles (in the requested order, the url titles not found are listed as "missing"), 503 if
+    not all of them could be read
+    """
+    items, unprocessed = middleware.batch_get(
+        article_table.name, [{"urlTitle": url_title} for url_title in url_titles],
+        projection=None if full else SUMMARY_ATTRIBUTES)
+    if unprocessed:  # throttled
+        return middleware.Response(status_code=503, headers={"Retry-After": "1"},
+                                   error_messages=["The articles couldn't be read, try again"])
+    found = {item["urlTitle"]: item for item in items}
+    articles = [found[url_title] for url_title in url_titles if url_title in found]
+    for article in articles:
+        article.pop("collection", None)  # index key (publishedIndex)
+        middleware.article_content.decode(article)
+    add_activity(articles)
+    body = {"articles": articles}
+    missing = [url_title for url_title in url_titles if url_title not in found]
+    if missing:
+        body["missing"] = missing
+    return middleware.Response(body=body)
+
+
+@middleware.middleware(cache_control="public, max-age=60")
+@middleware.data(Model)
+def handler(event: middleware.Event, context, data: Model):
+    if data.urlTitles is not None:
+        url_titles = list(dict.fromkeys(url_title for url_title in data.urlTitles.split(",") if url_title))
+        if not url_titles or len(url_titles) > MAX_URL_TITLES:
+            return middleware.Response(
+                status_code=400, error_messages=[f"urlTitles: expected 1 to {MAX_URL_TITLES} url titles"])
+        return get_batch(url_titles, data.view == "full")
+
+    if legacy_scan:
+        page = middleware.cache.get_or_load(
+            middleware.cache.key(article_table.name, {}, ",".join(SUMMARY_ATTRIBUTES), scan=True), scan_all)
+        articles = [dict(article) for article in page["articles"]]  # cached page, add_activity modifies
+        add_activity(articles)
+        return middleware.Response(body={"articles": articles})
+
+    start_key = None
+    if data.cursor:
+        try:
+            start_key = middleware.decode_cursor(data.cursor)
+        except ValueError:
+            start_key = {}
+        # a publishedIndex key: the cursor is passed on as ExclusiveStartKey (and into the cache key)
+        if (start_key.keys() != CURSOR_KEYS or start_key["collection"] != "article"
+                or not all(type(value) is str for value in start_key.values())):
+            return middleware.Response(status_code=400, error_messages=["Invalid cursor"])
+    limit = data.limit if data.limit is not None else DEFAULT_LIMIT
+    page = middleware.cache.get_or_load(
+        middleware.cache.key(article_table.name, start_key or {}, ",".join(SUMMARY_ATTRIBUTES),
+                             index="publishedIndex", limit=limit),
+        lambda: query_page(limit, start_key))
+    articles = [dict(article) for article in page["articles"]]  # cached page, add_activity modifies
+    add_activity(articles)
+    body = {"articles": articles}
+    if page["lastEvaluatedKey"] is not None:
+        body["cursor"] = middleware.encode_cursor(page["lastEvaluatedKey"])
+    return middleware.Response(body=body)
@@ -0,0 +1,126 @@
+import backend.middleware as middleware
+import base64
+import datetime
+import functools
+from uuid import uuid4
+
+
+class Model(middleware.Model):
+    articles: list
+
+    @classmethod
+    def request_values(cls, event: middleware.Event, context):
+        return {"articles": event.body.get("articles")}
+
+
+article_table = middleware.get_article_table()
+catalog_table = middleware.get_catalog_table()
+
+
+# handler decorator
+def ndjson_body(middleware_wrapped_handler):
+    """Maps an NDJSON body (first line {"key": ...}, then an article per line) to {"key": ..., "articles": [...]}
+
+    Applied before register_user (the key) and the validation; lines that aren't valid JSON become invalid articles
+    """
+
+    @functools.wraps(middleware_wrapped_handler)
+    def wrapper(event: middleware.Event, *args, **kwargs):
+        content_type = event.get_header("Content-Type", "").split(";")[0].strip()
+        if content_type == "application/x-ndjson" and type(event.raw_body) is str:
+            raw = base64.b64decode(event.raw_body) if event.is_base_64_encoded else event.raw_body.encode()
+            values = []
+            for line in raw.splitlines():
+                if line.strip():
+                    try:
+                        values.append(middleware.codec.loads(line))
+                    except (middleware.codec.codec.DecodeError, ValueError):
+                        values.append(None)
+            head = values[0] if values and type(values[0]) is dict else {}
+            event.body = {"key": head.get("key"), "articles": values[1:]}
+        return middleware_wrapped_handler(event, *args, **kwargs)
+    return wrapper
+
+
+@functools.lru_cache(maxsize=None)
+def article_validator():
+    """The POST /article body validator (compiled from the api spec), applied per article"""
+    return middleware.validation.compile_schema(
+        middleware.validation.load_routes()["POST /article"]["body"], "article")
+
+
+def validate(article) -> list:
+    errors = []
+    if type(article) is not dict:
+        return ["article: expected object"]
+    article_validator()(article, errors)
+    if "published" in article:
+        try:
+            datetime.date.fromisoformat(article["published"])
+        except (TypeError, ValueError):
+            errors.append("article.published: expected ISO date (YYYY-MM-DD)")
+    return errors
+
+
+@middleware.middleware
+@ndjson_body
+@middleware.register_user
+@middleware.admin_guard
+@middleware.data(Model)
+def handler(event: middleware.Event, context, data: Model):
+    results = [{"index": i} for i in range(len(data.articles))]
+    valid = {}  # urlTitle -> index
+    for result, article in zip(results, data.articles):
+        errors = validate(article)
+        if errors:
+            result.update(status=400, errors=errors)
+            if type(article) is dict and type(article.get("urlTitle")) is str:
+                result["urlTitle"] = article["urlTitle"]
+            continue
+        result["urlTitle"] = article["urlTitle"]
+        if article["urlTitle"] in valid:
+            result.update(status=409, errors=["Duplicate urlTitle in the request"])
+            continue
+        valid[article["urlTitle"]] = result["index"]
+
+    found, unprocessed = middleware.batch_get(
+        article_table.name, [{"urlTitle": url_title} for url_title in valid],
+        projection=["urlTitle", "tag", "published"], ConsistentRead=True)
+    existing = {item["urlTitle"]: item for item in found}
+    # throttled: whether these articles exist (their tag, published date) is unknown, they aren't written
+    for key in unprocessed:
+        results[valid.pop(key["urlTitle"])].update(status=503, errors=["Existing article not read (retry)"])
+    today = datetime.date.today().isoformat()
+    items = []
+    for url_title, index in valid.items():
+        article = data.articles[index]
+        items.append({
+            "urlTitle": url_title,
+            "title": article["title"],
+            "tag": article["tag"],
+            **middleware.article_content.attributes(article["content"]),
+            "description": article["description"],
+            "published": article.get("published") or existing.get(url_title, {}).get("published") or today,
+            "collection": "article",  # partition key of the publishedIndex
+            "version": uuid4().hex
+        })
+    errors = middleware.batch_write(article_table.name, items)
+
+    # the tag catalog is updated once per tag for the whole batch
+    counts = {}
+    latest_published = {}
+    for item, error in zip(items, errors):
+        result = results[valid[item["urlTitle"]]]
+        if error is not None:
+            result.update(status=503, errors=[error])
+            continue
+        previous = existing.get(item["urlTitle"])
+        result["status"] = 200 if previous else 201
+        latest_published[item["tag"]] = max(latest_published.get(item["tag"], ""), item["published"])
+        if previous and previous["tag"] == item["tag"]:
+            continue
+        if previous:
+            counts[previous["tag"]] = counts.get(previous["tag"], 0) - 1
+        counts[item["tag"]] = counts.get(item["tag"], 0) + 1
+    middleware.tag_catalog.apply_counts(catalog_table, counts, latest_published)
+    return middleware.Response(body={"results": results})
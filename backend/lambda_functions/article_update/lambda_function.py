@@ -1,9 +1,9 @@
 import backend.middleware as middleware
-from pydantic import BaseModel
 import botocore.exceptions
+from uuid import uuid4
 
 
-class Model(BaseModel):
+class Model(middleware.Model):
     urlTitle: str
     title: str
     description: str
@@ -11,12 +11,12 @@ class Model(BaseModel):
     content: str
 
     @classmethod
-    def build(cls, event: middleware.Event, context):
-        kwargs = {**event.body, "urlTitle": event.path_parameters.get("articleUrlTitle")}
-        return cls(**kwargs)
+    def request_values(cls, event: middleware.Event, context):
+        return {**event.body, "urlTitle": event.path_parameters.get("articleUrlTitle")}
 
 
 article_table = middleware.get_article_table()
+catalog_table = middleware.get_catalog_table()
 
 
 @middleware.middleware
@@ -24,21 +24,48 @@ article_table = middleware.get_article_table()
 @middleware.admin_guard
 @middleware.data(Model)
 def handler(event: middleware.Event, context, data: Model):
+    article = article_table.get_item(
+        Key={"urlTitle": data.urlTitle}, ProjectionExpression="tag, published", ConsistentRead=True).get("Item")
+    if not article:
+        return middleware.Response(status_code=404, error_messages=["Article does not exist"])
+    content, content_encoding = middleware.article_content.encode(data.content)
+    update = {
+        "Key": {
+            "urlTitle": data.urlTitle
+        },
+        "UpdateExpression": "SET title=:title, description=:description, tag=:tag, content=:content, "
+                            "version=:version, #collection=:collection" +
+                            (", contentEncoding=:content_encoding" if content_encoding else " REMOVE contentEncoding"),
+        "ExpressionAttributeNames": {
+            "#collection": "collection"  # reserved word
+        },
+        "ExpressionAttributeValues": {
+            ":title": data.title,
+            ":description": data.description,
+            ":tag": data.tag,
+            ":content": content,
+            ":version": uuid4().hex,
+            ":collection": "article",
+            ":old_tag": article["tag"],
+            **({":content_encoding": content_encoding} if content_encoding else {})
+        },
+        "ConditionExpression": "tag = :old_tag"  # the tag catalog is updated based on the old tag
+    }
     try:
-        article_table.update_item(
-            Key={
-                "urlTitle": data.urlTitle
-            },
-            UpdateExpression="SET title=:title, description=:description, tag=:tag, content=:content",
-            ExpressionAttributeValues={
-                ":title": data.title,
-                ":description": data.description,
-                ":tag": data.tag,
-                ":content": data.content
-            },
-            ConditionExpression="attribute_exists(urlTitle)"
-        )
+        if article["tag"] == data.tag:
+            article_table.update_item(**update)
+        else:
+            entry = middleware.tag_catalog.get_entry(catalog_table, data.tag)
+            middleware.transact_write_items([
+                {"Update": {"TableName": article_table.name, **update}},
+                middleware.tag_catalog.remove_article(article["tag"]),
+                middleware.tag_catalog.add_article(
+                    data.tag, article["published"], entry.get("latestPublished") if entry else None)
+            ])
     except botocore.exceptions.ClientError as e:
         if e.response["Error"]["Code"] == "ConditionalCheckFailedException":
-            return middleware.Response(status_code=404, error_messages=["Article does not exist"])
+            return middleware.Response(status_code=409, error_messages=["Conflicting write, please retry"])
+        raise
+    except middleware.TransactionCanceled:
+        return middleware.Response(status_code=409, error_messages=["Conflicting write, please retry"])
     return middleware.Response()
@@ -1,18 +1,16 @@
 import backend.middleware as middleware
-from pydantic import BaseModel
 import datetime
 from uuid import uuid4
 
 
-class Model(BaseModel):
+class Model(middleware.Model):
     articleUrlTitle: str
     author: str
     content: str
 
     @classmethod
-    def build(cls, event: middleware.Event, context):
-        kwargs = {**event.body, "articleUrlTitle": event.path_parameters.get("articleUrlTitle")}
-        return cls(**kwargs)
+    def request_values(cls, event: middleware.Event, context):
+        return {**event.body, "articleUrlTitle": event.path_parameters.get("articleUrlTitle")}
 
 
 comment_table = middleware.get_comment_table()
@@ -31,8 +29,7 @@ def handler(event: middleware.Event, context, data: Model):
             "articleUrlTitle": data.articleUrlTitle,
             "id": id_,
             "content": data.content,
-            "author": author,
-            "resps": {}
+            "author": author
         }
     )
     return middleware.Response(status_code=201, body={"id": id_})
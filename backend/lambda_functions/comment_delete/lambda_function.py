@@ -1,15 +1,17 @@
 import backend.middleware as middleware
-from pydantic import BaseModel
+import boto3.dynamodb.conditions
 
 
-class Model(BaseModel):
+class Model(middleware.Model):
     articleUrlTitle: str
     commentId: str
 
     @classmethod
-    def build(cls, event: middleware.Event, context):
-        return cls(articleUrlTitle=event.path_parameters.get("articleUrlTitle"),
-                   commentId=event.path_parameters.get("commentId"))
+    def request_values(cls, event: middleware.Event, context):
+        return {
+            "articleUrlTitle": event.path_parameters.get("articleUrlTitle"),
+            "commentId": event.path_parameters.get("commentId")
+        }
 
 
 comment_table = middleware.get_comment_table()
@@ -21,4 +23,11 @@ comment_table = middleware.get_comment_table()
 @middleware.data(Model)
 def handler(event: middleware.Event, context, data: Model):
     comment_table.delete_item(Key={"articleUrlTitle": data.articleUrlTitle, "id": data.commentId})
+    replies = comment_table.iter_query(
+        KeyConditionExpression=boto3.dynamodb.conditions.Key("articleUrlTitle").eq(data.articleUrlTitle) &
+        boto3.dynamodb.conditions.Key("id").begins_with(data.commentId + middleware.comments.REPLY_SEPARATOR),
+        ProjectionExpression="articleUrlTitle, id"
+    )
+    for reply in replies:
+        comment_table.delete_item(Key=reply)
     return middleware.Response()
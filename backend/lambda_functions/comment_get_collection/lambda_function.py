@@ -1,22 +1,133 @@
 import backend.middleware as middleware
-from pydantic import BaseModel
 import boto3.dynamodb.conditions
+from typing import List, Optional
 
 
-class Model(BaseModel):
+DEFAULT_LIMIT = 20
+# attributes selectable with ?fields= (id is always included)
+FIELDS = ("author", "content", "resps")
+
+
+class Model(middleware.Model):
     articleUrlTitle: str
+    limit: Optional[int] = None
+    cursor: Optional[str] = None
+    order: Optional[str] = None
+    respLimit: Optional[int] = None
 
     @classmethod
-    def build(cls, event: middleware.Event, context):
-        return cls(articleUrlTitle=event.path_parameters.get("articleUrlTitle"))
+    def request_values(cls, event: middleware.Event, context):
+        return {
+            "articleUrlTitle": event.path_parameters.get("articleUrlTitle"),
+            "limit": event.query_string_parameters.get("limit"),
+            "cursor": event.query_string_parameters.get("cursor"),
+            "order": event.query_string_parameters.get("order"),
+            "respLimit": event.query_string_parameters.get("respLimit")
+        }
+
+
+comment_table = middleware.get_comment_table(low_level=True)
+
 
+def query_threads(article_url_title: str, limit: int, newest_first: bool, start_key: Optional[dict],
+                  projection: Optional[List[str]] = None, resp_limit: Optional[int] = None):
+    """Reads the items of the next limit comments with all their replies, returns (items, cursor key or None)
 
-comment_table = middleware.get_comment_table()
+    Replies are separate items next to their comment (middleware.comments), so the query Limit only bounds the
+    comments: queries (at least DEFAULT_LIMIT items each) continue until the page holds limit whole threads, items
+    beyond are cut. Oldest first a thread is its comment followed by the replies, the page ends before the next
+    comment. Newest first the replies come before their comment, the page ends with the limit-th comment.
+    With a resp_limit only a thread's oldest resp_limit + 1 replies are read (one more than returned, which marks it
+    truncated): oldest first the query skips the rest of the thread, newest first (the newest replies come first) a
+    thread with more replies is read by a query of its own, bounded to the comment and these replies.
+    """
+    key = boto3.dynamodb.conditions.Key
+    items = []
+    comments = 0
+    resume_id = None  # oldest first: the id after which the next page starts
+    thread_start, thread_replies = 0, 0  # newest first: the current thread's replies, items[thread_start:]
+    while True:
+        response = comment_table.query(
+            KeyConditionExpression=key("articleUrlTitle").eq(article_url_title),
+            ScanIndexForward=not newest_first,
+            Limit=max(limit - comments + 1, DEFAULT_LIMIT),
+            ExclusiveStartKey=start_key,
+            projection=projection)
+        start_key = response.get("LastEvaluatedKey")
+        for i, item in enumerate(response["Items"]):
+            comment_id, resp_id = middleware.comments.split_id(item["id"])
+            if not newest_first:
+                if resp_id is None and comments == limit:
+                    return items, {"articleUrlTitle": article_url_title, "id": resume_id}
+                items.append(item)
+                resume_id = item["id"]
+                if resp_id is None:
+                    comments += 1
+                    thread_replies = 0
+                    continue
+                thread_replies += 1
+                if resp_limit is not None and thread_replies == resp_limit + 1:  # skip the rest of the thread
+                    resume_id = middleware.comments.thread_end_id(comment_id)
+                    start_key = {"articleUrlTitle": article_url_title, "id": resume_id}
+                    break
+                continue
+            if resp_id is not None:
+                if thread_replies == 0:
+                    thread_start = len(items)
+                items.append(item)
+                thread_replies += 1
+                if resp_limit is None or thread_replies <= resp_limit + 1:
+                    continue
+                # the newest replies of a long thread, read the comment and its oldest replies instead
+                del items[thread_start:]
+                thread = comment_table.query(
+                    KeyConditionExpression=key("articleUrlTitle").eq(article_url_title) & key("id").begins_with(
+                        comment_id),
+                    Limit=resp_limit + 2,
+                    projection=projection)["Items"]
+                if not thread or middleware.comments.split_id(thread[0]["id"])[1] is not None:
+                    thread = []  # replies without their comment
+                items.extend(reversed(thread))
+                start_key = {"articleUrlTitle": article_url_title, "id": comment_id}
+                thread_replies = 0
+                if thread:
+                    comments += 1
+                    if comments == limit:
+                        return items, start_key
+                break
+            items.append(item)
+            thread_replies = 0
+            comments += 1
+            if comments == limit:
+                if i == len(response["Items"]) - 1 and start_key is None:
+                    return items, None
+                return items, {"articleUrlTitle": article_url_title, "id": item["id"]}
+        if start_key is None:
+            return items, None
 
 
-@middleware.middleware
+@middleware.middleware(cache_control="public, max-age=10")
 @middleware.data(Model)
-def handler(event: middleware.Event, context, data: Model):
-    comments = comment_table.query_paginate_items(
-        KeyConditionExpression=boto3.dynamodb.conditions.Key("articleUrlTitle").eq(data.articleUrlTitle))
-    return middleware.Response(body={"comments": comments})
+@middleware.fields(FIELDS)
+def handler(event: middleware.Event, context: middleware.Context, data: Model, fields: middleware.Fields):
+    start_key = None
+    if data.cursor:
+        try:
+            start_key = middleware.decode_cursor(data.cursor)
+        except ValueError:
+            start_key = {}
+        if start_key.get("articleUrlTitle") != data.articleUrlTitle:
+            return middleware.Response(status_code=400, error_messages=["Invalid cursor"])
+    items, cursor_key = query_threads(
+        data.articleUrlTitle,
+        data.limit if data.limit is not None else DEFAULT_LIMIT,
+        data.order == "newest",
+        start_key,
+        # resps: the replies' attributes and the (not yet migrated) "resps" maps
+        fields.projection("id", *(("author", "content", "resps") if "resps" in fields else ())),
+        data.respLimit)
+    comments = middleware.comments.assemble(items, resp_limit=data.respLimit)
+    body = {"comments": [fields.select(comment) for comment in comments]}
+    if cursor_key is not None:
+        body["cursor"] = middleware.encode_cursor(cursor_key)
+    return middleware.Response(body=body)
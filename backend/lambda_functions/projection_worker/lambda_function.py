@@ -0,0 +1,45 @@
+"""Projection worker: consumes the Article and Comment table streams (see middleware.projections)
+
+Records are grouped by article, each article's projection is refreshed once per batch. If an article fails, the
+lowest sequence number of its records is reported (ReportBatchItemFailures): the batch is checkpointed up to there
+and retried from there (refreshing is idempotent), after the retries the records go to the dead-letter queue.
+"""
+
+import os
+import logging
+import backend.middleware as middleware
+
+
+article_table = middleware.get_article_table(low_level=True)
+comment_table = middleware.get_comment_table(low_level=True)
+catalog_table = middleware.get_catalog_table(low_level=True)
+
+# stream record key attribute (holding the article's urlTitle) per source table
+key_attributes = {
+    os.environ.get("ArticleTableName"): "urlTitle",
+    os.environ.get("CommentTableName"): "articleUrlTitle",
+}
+
+
+def table_name(record: dict) -> str:
+    # arn:aws:dynamodb:<region>:<account>:table/<name>/stream/<label>
+    return record["eventSourceARN"].split(":table/", 1)[1].split("/", 1)[0]
+
+
+def handler(event, context):
+    sequence_numbers = {}  # urlTitle -> sequence numbers of its records
+    for record in event["Records"]:
+        keys = middleware.utils.deserialize_item(record["dynamodb"]["Keys"])
+        url_title = keys[key_attributes[table_name(record)]]
+        sequence_numbers.setdefault(url_title, []).append(record["dynamodb"]["SequenceNumber"])
+
+    failed = []
+    for url_title, numbers in sequence_numbers.items():
+        try:
+            middleware.projections.refresh_article_activity(article_table, comment_table, catalog_table, url_title)
+        except Exception:
+            logging.exception(f"Failed to refresh the projections of article '{url_title}'")
+            failed += numbers
+    if not failed:
+        return {"batchItemFailures": []}
+    return {"batchItemFailures": [{"itemIdentifier": min(failed, key=int)}]}
@@ -1,24 +1,21 @@
 import backend.middleware as middleware
-from pydantic import BaseModel
 import datetime
 from uuid import uuid4
-import botocore.exceptions
 
 
-class Model(BaseModel):
+class Model(middleware.Model):
     articleUrlTitle: str
     commentId: str
     author: str
     content: str
 
     @classmethod
-    def build(cls, event: middleware.Event, context):
-        kwargs = {
+    def request_values(cls, event: middleware.Event, context):
+        return {
             **event.body,
             "articleUrlTitle": event.path_parameters.get("articleUrlTitle"),
             "commentId": event.path_parameters.get("commentId")
         }
-        return cls(**kwargs)
 
 
 comment_table = middleware.get_comment_table()
@@ -28,29 +25,29 @@ comment_table = middleware.get_comment_table()
 @middleware.register_user
 @middleware.data(Model)
 def handler(event: middleware.Event, context, data: Model):
+    if middleware.comments.split_id(data.commentId)[1] is not None:  # replies can't be replied to
+        return middleware.Response(status_code=404, error_messages=["Comment does not exist"])
     id_ = f"{datetime.datetime.utcnow().isoformat()}#{uuid4()}"
     author = data.author
     if data.author == "admin" and not middleware.authenticator.current_user_is_admin:
         author += "#not-the-real-admin"
+    reply_key = middleware.comments.reply_key(data.articleUrlTitle, data.commentId, id_)
     try:
-        comment_table.update_item(
-            Key={
-                "articleUrlTitle": data.articleUrlTitle,
-                "id": data.commentId
-            },
-            UpdateExpression="SET resps.#resp_id=:resp",
-            ExpressionAttributeNames={
-                "#resp_id": id_
-            },
-            ExpressionAttributeValues={
-                ":resp": {
-                    "content": data.content,
-                    "author": author
-                }
-            },
-            ConditionExpression="attribute_exists(id)"
-        )
-    except botocore.exceptions.ClientError as e:
-        if e.response["Error"]["Code"] == "ConditionalCheckFailedException":
+        # a small put of the reply item, the comment is only checked (not rewritten)
+        middleware.transact_write_items([
+            {"ConditionCheck": {
+                "TableName": comment_table.name,
+                "Key": {"articleUrlTitle": data.articleUrlTitle, "id": data.commentId},
+                "ConditionExpression": "attribute_exists(id)"
+            }},
+            {"Put": {
+                "TableName": comment_table.name,
+                "Item": {**reply_key, "content": data.content, "author": author},
+                "ConditionExpression": "attribute_not_exists(id)"
+            }}
+        ])
+    except middleware.TransactionCanceled as e:
+        if e.condition_failed:
             return middleware.Response(status_code=404, error_messages=["Comment does not exist"])
+        raise
     return middleware.Response(status_code=201, body={"id": id_})
@@ -1,22 +1,20 @@
 import backend.middleware as middleware
-from pydantic import BaseModel
 import botocore.exceptions
 
 
-class Model(BaseModel):
+class Model(middleware.Model):
     articleUrlTitle: str
     commentId: str
     respId: str
 
     @classmethod
-    def build(cls, event: middleware.Event, context):
-        kwargs = {
+    def request_values(cls, event: middleware.Event, context):
+        return {
             **event.body,
             "articleUrlTitle": event.path_parameters.get("articleUrlTitle"),
             "commentId": event.path_parameters.get("commentId"),
             "respId": event.path_parameters.get("respId")
         }
-        return cls(**kwargs)
 
 
 comment_table = middleware.get_comment_table()
@@ -27,19 +25,25 @@ comment_table = middleware.get_comment_table()
 @middleware.admin_guard
 @middleware.data(Model)
 def handler(event: middleware.Event, context, data: Model):
-    try:
-        comment_table.update_item(
-            Key={
-                "articleUrlTitle": data.articleUrlTitle,
-                "id": data.commentId
-            },
-            UpdateExpression="REMOVE resps.#resp_id",
-            ExpressionAttributeNames={
-                "#resp_id": data.respId
-            },
-            ConditionExpression="attribute_exists(id)"
-        )
-    except botocore.exceptions.ClientError as e:
-        if e.response["Error"]["Code"] == "ConditionalCheckFailedException":
-            pass
+    response = comment_table.delete_item(
+        Key=middleware.comments.reply_key(data.articleUrlTitle, data.commentId, data.respId),
+        ReturnValues="ALL_OLD"
+    )
+    if "Attributes" not in response:
+        # not migrated yet (tools/migrate_comment_replies.py): the reply is in the comment's "resps" map
+        try:
+            comment_table.update_item(
+                Key={
+                    "articleUrlTitle": data.articleUrlTitle,
+                    "id": data.commentId
+                },
+                UpdateExpression="REMOVE resps.#resp_id",
+                ExpressionAttributeNames={
+                    "#resp_id": data.respId
+                },
+                ConditionExpression="attribute_exists(resps.#resp_id)"
+            )
+        except botocore.exceptions.ClientError as e:
+            if e.response["Error"]["Code"] != "ConditionalCheckFailedException":
+                raise
     return middleware.Response()
@@ -0,0 +1,52 @@
+"""Single-function router: serves all API routes from one Lambda function (see stacks/constructs/api.py)
+
+The route (API Gateway resource path and method) selects the handler module of the per-route function, which is
+imported on the route's first request: a container only initializes the routes it serves. Unknown routes (the
+default integration/ proxy resource) are served by the default handler.
+"""
+
+import backend.middleware as middleware
+import importlib
+import time
+
+# "METHOD resource" -> handler (backend/lambda_functions/<name>)
+ROUTES = {
+    "GET /article": "article_get_collection",
+    "POST /article": "article_create",
+    "POST /article-import": "article_import",
+    "GET /article/{articleUrlTitle}": "article_get",
+    "PATCH /article/{articleUrlTitle}": "article_update",
+    "DELETE /article/{articleUrlTitle}": "article_delete",
+    "GET /article/{articleUrlTitle}/comments": "comment_get_collection",
+    "POST /article/{articleUrlTitle}/comments": "comment_create",
+    "DELETE /article/{articleUrlTitle}/comments/{commentId}": "comment_delete",
+    "POST /article/{articleUrlTitle}/comments/{commentId}/resps": "resp_create",
+    "DELETE /article/{articleUrlTitle}/comments/{commentId}/resps/{respId}": "resp_delete",
+    "GET /tag": "tag_get_collection",
+    "GET /tag/{tagName}": "tag_get_article_collection",
+    "POST /admin-login": "admin_login",
+}
+DEFAULT = "default"
+
+# deployed, the lambda_functions directory is the code root ("<name>.lambda_function"), locally it's a package
+_package = __name__.rpartition(".")[0].rpartition(".")[0]
+_handlers = {}
+
+
+def get_handler(name: str):
+    """Returns the handler function, imports its module on first use (the import is recorded as "init" phase)"""
+    handler_ = _handlers.get(name)
+    if handler_ is None:
+        start = time.perf_counter()
+        module = importlib.import_module(f"{_package}.{name}.lambda_function" if _package else
+                                         f"{name}.lambda_function")
+        handler_ = _handlers[name] = module.handler
+        middleware.metrics.record_pending("init", time.perf_counter() - start)
+    return handler_
+
+
+def handler(event: dict, context):
+    if middleware.warm_up.is_warm_up(event):  # initializes all routes, the default handler answers
+        for name in set(ROUTES.values()):
+            get_handler(name)
+    return get_handler(ROUTES.get(f"{event.get('httpMethod')} {event.get('resource')}", DEFAULT))(event, context)
@@ -1,26 +1,50 @@
 import backend.middleware as middleware
-from pydantic import BaseModel
 import boto3.dynamodb.conditions
+from typing import Optional
 
 
-class Model(BaseModel):
+class Model(middleware.Model):
     tagName: str
+    cursor: Optional[str] = None
 
     @classmethod
-    def build(cls, event: middleware.Event, context):
-        return cls(tagName=event.path_parameters.get("tagName"))
+    def request_values(cls, event: middleware.Event, context):
+        return {
+            "tagName": event.path_parameters.get("tagName"),
+            "cursor": event.query_string_parameters.get("cursor")
+        }
 
 
-article_table = middleware.get_article_table()
+article_table = middleware.get_article_table(low_level=True)
 
 
-@middleware.middleware
-@middleware.data(Model)
-def handler(event: middleware.Event, context, data: Model):
+def query_page(tag: str, start_key: Optional[dict]) -> dict:
     articles = article_table.query_paginate_items(
         IndexName="tagIndex",
-        KeyConditionExpression=boto3.dynamodb.conditions.Key("tag").eq(data.tagName),
+        KeyConditionExpression=boto3.dynamodb.conditions.Key("tag").eq(tag),
         Select="ALL_PROJECTED_ATTRIBUTES",
-        ScanIndexForward=False
+        ScanIndexForward=False,
+        ExclusiveStartKey=start_key,
+        allow_partial=True
     )
-    return middleware.Response(body={"articles": articles})
+    return {"articles": list(articles), "lastEvaluatedKey": articles.last_evaluated_key}
+
+
+@middleware.middleware(cache_control="public, max-age=60")
+@middleware.data(Model)
+def handler(event: middleware.Event, context: middleware.Context, data: Model):
+    start_key = None
+    if data.cursor:
+        try:
+            start_key = middleware.decode_cursor(data.cursor)
+        except ValueError:
+            start_key = {}
+        if start_key.get("tag") != data.tagName:
+            return middleware.Response(status_code=400, error_messages=["Invalid cursor"])
+    page = middleware.cache.get_or_load(
+        middleware.cache.key(article_table.name, start_key or {"tag": data.tagName}, index="tagIndex"),
+        lambda: query_page(data.tagName, start_key))
+    body = {"articles": page["articles"]}
+    if page["lastEvaluatedKey"] is not None:
+        body["cursor"] = middleware.encode_cursor(page["lastEvaluatedKey"])
+    return middleware.Response(body=body)
@@ -1,13 +1,10 @@
 import backend.middleware as middleware
 
 
-article_table = middleware.get_article_table()
+catalog_table = middleware.get_catalog_table(low_level=True)
 
 
-@middleware.middleware
+@middleware.middleware(cache_control="public, max-age=300")
 def handler(event: middleware.Event, context):
-    items = article_table.scan_paginate_items(
-        IndexName="tagIndex",
-        ProjectionExpression="tag"
-    )
-    return middleware.Response(body={"tags": list(set([item["tag"] for item in items]))})
+    catalog = middleware.tag_catalog.tags(catalog_table)
+    return middleware.Response(body={"tags": [entry["name"] for entry in catalog], "catalog": catalog})
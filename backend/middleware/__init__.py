@@ -5,8 +5,51 @@ Use the handler decorators like this, in this order!:
 @middleware
 @register_user
 @admin_guard
-@data(Model)
+@data(Model)  (Model derived from middleware.Model)
+@fields(allowed)  (optional, sparse fieldsets)
+
+Heavy dependencies are imported on first access of an attribute that needs them (boto3: table accessors/ Secrets
+Manager, pydantic: data, Model), so routes that don't use them don't pay for the import on cold starts.
 """
 
-from .main import middleware, Event, Response
-from .utils import authenticator, register_user, admin_guard, data, get_article_table, get_comment_table
+import importlib
+from . import codec, compression, metrics
+from .main import middleware, Event, Context, DeadlineExceeded, Response
+
+# attribute -> submodule, imported on first access
+_lazy_attributes = {
+    "authenticator": "utils",
+    "register_user": "utils",
+    "admin_guard": "utils",
+    "fields": "utils",
+    "Fields": "utils",
+    "Items": "utils",
+    "encode_cursor": "utils",
+    "decode_cursor": "utils",
+    "get_article_table": "utils",
+    "get_comment_table": "utils",
+    "get_catalog_table": "utils",
+    "transact_write_items": "utils",
+    "batch_get": "utils",
+    "batch_write": "utils",
+    "TransactionCanceled": "utils",
+    "data": "request_data",
+    "Model": "request_data",
+}
+_lazy_submodules = {"aws", "utils", "request_data", "validation", "secret_cache", "tag_catalog",
+                    "projections", "comments", "cache", "article_content", "warm_up"}
+
+
+def __getattr__(name: str):
+    if name in _lazy_attributes:
+        value = getattr(importlib.import_module(f".{_lazy_attributes[name]}", __name__), name)
+    elif name in _lazy_submodules:
+        value = importlib.import_module(f".{name}", __name__)
+    else:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted([*globals(), *_lazy_attributes, *_lazy_submodules])
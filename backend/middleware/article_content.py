@@ -0,0 +1,52 @@
+"""Article content at rest: large contents are stored zlib compressed, as a binary attribute
+
+    {"urlTitle": "my-article", ..., "content": b"x\xda...", "contentEncoding": "zlib"}
+
+Contents of at least "ContentCompressionMinSize" bytes (UTF-8 encoded, environment variable, default 1024) are
+compressed; items without "contentEncoding" hold the content as a plain string (small contents, and items written
+before, see tools/reencode_article_content.py). DynamoDB bills binary attributes by their raw size, so the read and
+write capacity of an article shrinks with its compressed size.
+Writers store the attributes of "attributes", readers pass the item to "decode" (project "contentEncoding" along with
+"content").
+"""
+
+import os
+import zlib
+from typing import Optional, Tuple
+
+ENCODING = "zlib"
+
+min_size = int(os.environ.get("ContentCompressionMinSize", 1024))
+
+
+def encode(content: str) -> Tuple[object, Optional[str]]:
+    """Returns (stored content, content encoding): the compressed bytes and "zlib", or the string and None"""
+    data = content.encode()
+    if len(data) >= min_size:
+        compressed = zlib.compress(data, 9)  # articles are written rarely and read often
+        if len(compressed) < len(data):
+            return compressed, ENCODING
+    return content, None
+
+
+def attributes(content: str) -> dict:
+    """The item attributes that store the content ("content", and "contentEncoding" if compressed)"""
+    stored, encoding = encode(content)
+    if encoding is None:
+        return {"content": stored}
+    return {"content": stored, "contentEncoding": encoding}
+
+
+def decode(item: dict) -> dict:
+    """Replaces the stored content of the item with the string (in place) and removes "contentEncoding"
+
+    Accepts the binary types of both table APIs (bytes, boto3's Binary)
+    """
+    encoding = item.pop("contentEncoding", None)
+    if encoding is None or "content" not in item:
+        return item
+    if encoding != ENCODING:
+        raise ValueError(f"Unknown content encoding '{encoding}'")
+    stored = item["content"]
+    item["content"] = zlib.decompress(getattr(stored, "value", stored)).decode()
+    return item
@@ -0,0 +1,120 @@
+"""Process-wide boto3 session, clients and resources with tuned botocore configs
+
+Everything is created lazily on first use and then shared (one connection pool per service/ region).
+The config profile is selected with the "AwsConfigProfile" environment variable (set per environment by the stack),
+single settings can be overwritten with environment variables:
+    AwsConnectTimeout, AwsReadTimeout (seconds), AwsMaxAttempts, AwsRetryMode, AwsMaxPoolConnections
+The settings bound the duration of a DynamoDB call (max_call_duration), which is kept in reserve before the deadline
+(see utils.get_deadline_reserve): with every profile most of the API functions' timeout (API_FUNCTION_TIMEOUT) has to
+remain for the handler.
+"""
+
+import os
+import threading
+from typing import Optional
+
+API_FUNCTION_TIMEOUT = 10  # seconds, the timeout of the API functions (set by the stack)
+
+PROFILES = {
+    "default": {
+        "connect_timeout": 0.5,
+        "read_timeout": 1,
+        "max_attempts": 2,
+        "retry_mode": "standard",
+        "max_pool_connections": 10,
+    },
+    "production": {
+        "connect_timeout": 0.5,
+        "read_timeout": 1,
+        "max_attempts": 2,
+        "retry_mode": "adaptive",
+        "max_pool_connections": 16,
+    },
+    "testing": {
+        "connect_timeout": 0.75,
+        "read_timeout": 1,
+        "max_attempts": 2,
+        "retry_mode": "standard",
+        "max_pool_connections": 10,
+    },
+}
+
+_overrides = {
+    "connect_timeout": ("AwsConnectTimeout", float),
+    "read_timeout": ("AwsReadTimeout", float),
+    "max_attempts": ("AwsMaxAttempts", int),
+    "retry_mode": ("AwsRetryMode", str),
+    "max_pool_connections": ("AwsMaxPoolConnections", int),
+}
+
+_lock = threading.Lock()
+_session = None
+_clients = {}
+_resources = {}
+
+
+def get_settings(profile: Optional[str] = None) -> dict:
+    profile = profile or os.environ.get("AwsConfigProfile", "default")
+    settings = dict(PROFILES.get(profile, PROFILES["default"]))
+    for name, (variable, type_) in _overrides.items():
+        if variable in os.environ:
+            settings[name] = type_(os.environ[variable])
+    return settings
+
+
+def max_call_duration(settings: dict) -> float:
+    """Upper bound of a call's duration in seconds: every attempt runs into the connect and the read timeout, with
+    botocore's longest retry backoff in between (up to 2 ** (n - 1) s after the n-th attempt)
+    """
+    attempts = settings["max_attempts"]
+    return attempts * (settings["connect_timeout"] + settings["read_timeout"]) + 2 ** (attempts - 1) - 1
+
+
+def get_config(profile: Optional[str] = None):
+    """Returns the botocore config of the profile (TCP keep-alive enabled)"""
+    import botocore.config
+    settings = get_settings(profile)
+    kwargs = dict(
+        connect_timeout=settings["connect_timeout"],
+        read_timeout=settings["read_timeout"],
+        retries={"max_attempts": settings["max_attempts"], "mode": settings["retry_mode"]},
+        max_pool_connections=settings["max_pool_connections"],
+    )
+    try:
+        return botocore.config.Config(tcp_keepalive=True, **kwargs)
+    except TypeError:  # botocore < 1.27.84
+        return botocore.config.Config(**kwargs)
+
+
+def get_session():
+    global _session
+    if _session is None:
+        with _lock:
+            if _session is None:
+                import boto3
+                _session = boto3.session.Session()
+    return _session
+
+
+def get_client(service_name: str, region_name: Optional[str] = None):
+    key = (service_name, region_name)
+    if key not in _clients:
+        session = get_session()
+        with _lock:
+            if key not in _clients:
+                _clients[key] = session.client(service_name, region_name=region_name, config=get_config())
+    return _clients[key]
+
+
+def get_resource(service_name: str, region_name: Optional[str] = None):
+    """Returns the shared resource
+
+    (the resource has its own client: boto3 registers the resource layer's (de)serialization on it)
+    """
+    key = (service_name, region_name)
+    if key not in _resources:
+        session = get_session()
+        with _lock:
+            if key not in _resources:
+                _resources[key] = session.resource(service_name, region_name=region_name, config=get_config())
+    return _resources[key]
@@ -0,0 +1,95 @@
+"""In-process read-through cache, shared by the invocations of a warm container
+
+A bounded LRU (size: the JSON-encoded size of the values in bytes) with a TTL per entry. Misses of the loader
+(None, e.g. an article that doesn't exist -> 404) are cached as well (negative caching).
+The TTL is the staleness window: admin edits (made by other containers) show up once the entries expired. An expired
+entry can be revalidated cheaply instead of being loaded again (e.g. by comparing the article's version attribute).
+Hits and misses are counted on the metrics recorder ("cache_hits", "cache_misses").
+Cached values are shared: treat them as read-only (copy before modifying).
+Configuration (environment variables):
+    CacheTtl: seconds (default 10, 0 disables the cache)
+    CacheNegativeTtl: seconds for cached misses (default: CacheTtl)
+    CacheMaxBytes: max. size (default 16 MiB)
+"""
+
+import collections
+import os
+import threading
+import time
+from typing import Any, Callable, Optional
+
+from . import codec, metrics
+
+
+def key(table_name: str, key_: dict, projection: Optional[str] = None, **params) -> str:
+    """Cache key of an item/ a listing: table, key (or start key), projection and further request parameters"""
+    return codec.dumps([table_name, sorted(key_.items()), projection, sorted(params.items())])
+
+
+class Cache:
+
+    def __init__(self, max_bytes: int, ttl: float, negative_ttl: Optional[float] = None):
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.negative_ttl = ttl if negative_ttl is None else negative_ttl
+        self.size = 0
+        self._entries = collections.OrderedDict()  # key -> (value, size, expires), least recently used first
+        self._lock = threading.Lock()
+
+    def get_or_load(self, key_: str, loader: Callable[[], Any],
+                    revalidate: Optional[Callable[[Any], bool]] = None) -> Any:
+        """Returns the cached value or the loader's (and caches it)
+
+        revalidate(value) is called for an expired (not negative) entry, if it returns True the value is still
+        current and its TTL starts again
+        """
+        if self.ttl <= 0:
+            return loader()
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key_)
+            if entry is not None:
+                self._entries.move_to_end(key_)
+        if entry is not None:
+            value, size, expires = entry
+            if now < expires:
+                metrics.count("cache_hits")
+                return value
+            if value is not None and revalidate is not None and revalidate(value):
+                metrics.count("cache_hits")
+                self._store(key_, value, size, now + self.ttl)
+                return value
+        metrics.count("cache_misses")
+        value = loader()
+        size = len(codec.dumps(value)) if value is not None else 0
+        if size <= self.max_bytes:
+            self._store(key_, value, size, now + (self.ttl if value is not None else self.negative_ttl))
+        return value
+
+    def invalidate(self, key_: Optional[str] = None):
+        """Removes the entry (all entries if key_ is None)"""
+        with self._lock:
+            if key_ is None:
+                self._entries.clear()
+                self.size = 0
+            elif key_ in self._entries:
+                self.size -= self._entries.pop(key_)[1]
+
+    def _store(self, key_: str, value: Any, size: int, expires: float):
+        with self._lock:
+            previous = self._entries.pop(key_, None)
+            if previous is not None:
+                self.size -= previous[1]
+            self._entries[key_] = (value, size, expires)
+            self.size += size
+            while self.size > self.max_bytes:
+                self.size -= self._entries.popitem(last=False)[1][1]
+
+
+cache = Cache(
+    max_bytes=int(os.environ.get("CacheMaxBytes", 16 * 1024 * 1024)),
+    ttl=float(os.environ.get("CacheTtl", 10)),
+    negative_ttl=float(os.environ["CacheNegativeTtl"]) if "CacheNegativeTtl" in os.environ else None,
+)
+get_or_load = cache.get_or_load
+invalidate = cache.invalidate
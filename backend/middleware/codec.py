@@ -0,0 +1,83 @@
+"""JSON codec used by the middleware (request bodies, responses)
+
+Uses orjson when it's installed, otherwise the stdlib json module. The codec can be forced with the
+"JsonCodec" environment variable ("orjson" or "json").
+DynamoDB types returned by the boto3 resource layer (Decimal, set) are converted while encoding.
+"""
+
+import json
+import os
+from decimal import Decimal
+from typing import Any, Union
+
+try:
+    import orjson
+except ImportError:  # optional dependency
+    orjson = None
+
+
+def _default(obj: Any):
+    """Converts types json can't encode natively (called by the encoder for those objects only)"""
+    if isinstance(obj, Decimal):
+        if obj == obj.to_integral_value():
+            return int(obj)
+        return float(obj)
+    if isinstance(obj, (set, frozenset)):
+        return list(obj)
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+class JSONCodec:
+    """Stdlib json"""
+
+    name = "json"
+    DecodeError = json.JSONDecodeError
+
+    def __init__(self):
+        self._encoder = json.JSONEncoder(separators=(",", ":"), ensure_ascii=False, default=_default)
+        self._decoder = json.JSONDecoder()
+
+    def dumps(self, obj: Any) -> str:
+        return self._encoder.encode(obj)
+
+    def loads(self, string: Union[str, bytes]) -> Any:
+        if type(string) is bytes:
+            string = string.decode()
+        return self._decoder.decode(string)
+
+
+class ORJSONCodec:
+    """orjson (much faster encoding of large responses)"""
+
+    name = "orjson"
+    DecodeError = json.JSONDecodeError  # orjson.JSONDecodeError is a subclass
+
+    def dumps(self, obj: Any) -> str:
+        return orjson.dumps(obj, default=_default).decode()
+
+    def loads(self, string: Union[str, bytes]) -> Any:
+        return orjson.loads(string)
+
+
+def get_codec(name: str = None):
+    """Returns the codec with that name, or the fastest installed codec if no name is given"""
+    if name is None:
+        name = "orjson" if orjson is not None else "json"
+    if name == "orjson":
+        if orjson is None:
+            raise ValueError("Codec 'orjson' requires the orjson package")
+        return ORJSONCodec()
+    if name == "json":
+        return JSONCodec()
+    raise ValueError(f"Unknown codec: '{name}'")
+
+
+codec = get_codec(os.environ.get("JsonCodec"))
+
+
+def dumps(obj: Any) -> str:
+    return codec.dumps(obj)
+
+
+def loads(string: Union[str, bytes]) -> Any:
+    return codec.loads(string)
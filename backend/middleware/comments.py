@@ -0,0 +1,62 @@
+"""Comment threads in the comment table
+
+Comments and their replies (resps) are items in the article's partition. A reply's sort key is its comment's id,
+the separator and its own id, so the replies follow their comment in key order:
+
+    {"articleUrlTitle": "my-article", "id": "2021-05-02T10:00:00.000000#<uuid>", "author": ..., "content": ...}
+    {"articleUrlTitle": "my-article", "id": "2021-05-02T10:00:00.000000#<uuid>#resp#2021-05-03T08:00:00.000000#<uuid>",
+     "author": ..., "content": ...}
+
+and a single query reads whole threads. Comments written before the migration (tools/migrate_comment_replies.py)
+may still hold their replies in a "resps" map, threads merge both.
+"""
+
+from typing import Iterable, List, Optional, Tuple
+
+REPLY_SEPARATOR = "#resp#"
+
+
+def reply_key(article_url_title: str, comment_id: str, resp_id: str) -> dict:
+    return {"articleUrlTitle": article_url_title, "id": f"{comment_id}{REPLY_SEPARATOR}{resp_id}"}
+
+
+def thread_end_id(comment_id: str) -> str:
+    """Returns a sort key after all replies of the comment (and before the next comment)"""
+    return f"{comment_id}{REPLY_SEPARATOR}\uffff"
+
+
+def split_id(id_: str) -> Tuple[str, Optional[str]]:
+    """Returns (comment id, resp id) of a sort key (resp id is None for comments)"""
+    comment_id, _, resp_id = id_.partition(REPLY_SEPARATOR)
+    return comment_id, resp_id or None
+
+
+def assemble(items: Iterable[dict], resp_limit: Optional[int] = None) -> List[dict]:
+    """Builds the comments (with their "resps" map: resp id -> {author, content}) from comment and reply items
+
+    Comments are returned in the order of the items, replies whose comment isn't among the items are left out.
+    With a resp_limit only the oldest resp_limit replies of a comment are included ("respsTruncated" is set)
+    """
+    comments = {}
+    replies = []
+    for item in items:
+        comment_id, resp_id = split_id(item["id"])
+        if resp_id is None:
+            comments[comment_id] = {
+                "id": comment_id,
+                "author": item.get("author"),
+                "content": item.get("content"),
+                "resps": dict(item.get("resps") or {}),
+            }
+        else:
+            replies.append((comment_id, resp_id, item))
+    for comment_id, resp_id, item in replies:
+        if comment_id in comments:
+            comments[comment_id]["resps"][resp_id] = {"author": item.get("author"), "content": item.get("content")}
+    if resp_limit is not None:
+        for comment in comments.values():
+            if len(comment["resps"]) > resp_limit:
+                kept = sorted(comment["resps"])[:resp_limit]
+                comment["resps"] = {resp_id: comment["resps"][resp_id] for resp_id in kept}
+                comment["respsTruncated"] = True
+    return list(comments.values())
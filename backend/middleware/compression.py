@@ -0,0 +1,71 @@
+"""Content-negotiated response compression (gzip, brotli when installed)
+
+Bodies smaller than "CompressionMinSize" bytes (environment variable, default 1024) are not compressed.
+"""
+
+import gzip
+import os
+from typing import Dict, Optional, Tuple
+
+try:
+    import brotli
+except ImportError:  # optional dependency
+    brotli = None
+
+
+min_size = int(os.environ.get("CompressionMinSize", 1024))
+
+_compressors = {
+    "gzip": lambda data: gzip.compress(data, compresslevel=6),
+}
+if brotli is not None:
+    _compressors["br"] = lambda data: brotli.compress(data, quality=5)
+
+_preference = ["br", "gzip"]
+
+
+def parse_accept_encoding(header: str) -> Dict[str, float]:
+    """Maps an Accept-Encoding header to {coding: q-value}"""
+    accepted = {}
+    for part in header.split(","):
+        coding, _, params = part.strip().partition(";")
+        coding = coding.strip().lower()
+        if not coding:
+            continue
+        q = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        accepted[coding] = q
+    return accepted
+
+
+def negotiate(accept_encoding: Optional[str]) -> Optional[str]:
+    """Returns the preferred content coding accepted by the client, None if no supported coding is accepted"""
+    if not accept_encoding:
+        return None
+    accepted = parse_accept_encoding(accept_encoding)
+    wildcard = accepted.get("*", 0.0)
+    for coding in _preference:
+        if coding in _compressors and accepted.get(coding, wildcard) > 0:
+            return coding
+    return None
+
+
+def compress(data: bytes, accept_encoding: Optional[str]) -> Optional[Tuple[bytes, str]]:
+    """Returns (compressed data, content coding), or None if the data shouldn't/ can't be compressed"""
+    coding = negotiate(accept_encoding)
+    if coding is None:
+        return None
+    compressed = encode(data, coding)
+    return (compressed, coding) if compressed is not None else None
+
+
+def encode(data: bytes, coding: str) -> Optional[bytes]:
+    """Returns the data compressed with the (negotiated) content coding, None if it's below the size threshold"""
+    if len(data) < min_size:
+        return None
+    return _compressors[coding](data)
@@ -1,74 +1,177 @@
-import json
 import functools
 from typing import Optional, Callable
 import urllib.parse
+import base64
+import hashlib
+import logging
+import math
+import time
 from typing import Dict, Any
+from . import codec, compression, metrics, validation
+
+
+_UNSET = object()
+
+
+class _section:
+    """Lazily mapped section of the raw API Gateway event, computed on first access and cached in a slot"""
+
+    def __init__(self, key: str, unquote: bool = False):
+        self.key = key
+        self.unquote = unquote
+
+    def __set_name__(self, owner, name):
+        self.slot = "_" + name
+
+    def __get__(self, instance, owner=None):
+        if instance is None:
+            return self
+        value = getattr(instance, self.slot, _UNSET)
+        if value is _UNSET:
+            value = instance._event.get(self.key)
+            if value is None:
+                value = {}
+            elif self.unquote:
+                value = _unquote_dict_items(value)
+            setattr(instance, self.slot, value)
+        return value
+
+    def __set__(self, instance, value):
+        setattr(instance, self.slot, value)
+
+
+def _unquote_dict_items(dict_: Dict[Any, Any]) -> dict:
+    unquote = urllib.parse.unquote
+    return {
+        key: [unquote(item) for item in value] if type(value) is list else unquote(value)
+        for key, value in dict_.items()
+    }
 
 
 class Event:
-    """Mapped API Gateway event"""
+    """Mapped API Gateway event
+
+    Sections (headers, parameters, body, ...) are mapped on first access only and then cached
+    """
+
+    __slots__ = (
+        "_event",
+        "_headers",
+        "_multi_value_headers",
+        "_query_string_parameters",
+        "_multi_value_query_string_parameters",
+        "_path_parameters",
+        "_stage_variables",
+        "_request_context",
+        "_body",
+    )
+
+    headers: dict = _section("headers")
+    multi_value_headers: dict = _section("multiValueHeaders")
+    query_string_parameters: dict = _section("queryStringParameters", unquote=True)
+    multi_value_query_string_parameters: dict = _section("multiValueQueryStringParameters", unquote=True)
+    path_parameters: dict = _section("pathParameters", unquote=True)
+    stage_variables: dict = _section("stageVariables")
+    request_context: dict = _section("requestContext")
 
     def __init__(self, event: dict):
-        self.ressource: str = event.get("resource")
+        self._event = event
 
-        self.path: str = event.get("path")
+    @property
+    def ressource(self) -> str:
+        return self._event.get("resource")
 
-        self.method: str = event.get("httpMethod")
+    @property
+    def path(self) -> str:
+        return self._event.get("path")
 
-        self.headers: dict = event.get("headers")
-        if self.headers is None:
-            self.headers = {}
+    @property
+    def method(self) -> str:
+        return self._event.get("httpMethod")
 
-        self.multi_value_headers: dict = event.get("multiValueHeaders")
-        if self.multi_value_headers is None:
-            self.multi_value_headers = {}
+    @property
+    def is_base_64_encoded(self) -> bool:
+        return self._event.get("isBase64Encoded")
 
-        self.query_string_parameters: dict = event.get("queryStringParameters")
-        if self.query_string_parameters is None:
-            self.query_string_parameters = {}
-        self._unquote_dict_items(self.query_string_parameters)
+    @property
+    def raw_body(self) -> Optional[str]:
+        return self._event.get("body")
 
-        self.multi_value_query_string_parameters: dict = event.get("multiValueQueryStringParameters")
-        if self.multi_value_query_string_parameters is None:
-            self.multi_value_query_string_parameters = {}
-        self._unquote_dict_items(self.multi_value_query_string_parameters)
+    @property
+    def body_size(self) -> int:
+        """Size of the (decoded) body in bytes, computed without decoding base64 bodies"""
+        raw = self._event.get("body")
+        if type(raw) is not str:
+            return 0
+        if self._event.get("isBase64Encoded"):
+            return len(raw) * 3 // 4 - raw[-2:].count("=")
+        return len(raw.encode())
 
-        self.path_parameters: dict = event.get("pathParameters")
-        if self.path_parameters is None:
-            self.path_parameters = {}
-        self._unquote_dict_items(self.path_parameters)
+    @property
+    def body(self):
+        body = getattr(self, "_body", _UNSET)
+        if body is _UNSET:
+            body = None
+            raw = self._event.get("body")
+            if type(raw) is str:
+                try:
+                    if self._event.get("isBase64Encoded"):  # binary media types are enabled on the RestApi
+                        raw = base64.b64decode(raw)
+                    body = codec.loads(raw)
+                except (codec.codec.DecodeError, ValueError):
+                    pass
+            self._body = body
+        return body
 
-        self.stage_variables: dict = event.get("stageVariables")
-        if self.stage_variables is None:
-            self.stage_variables = {}
+    @body.setter
+    def body(self, value):
+        self._body = value
 
-        self.request_context: dict = event.get("requestContext")
-        if self.request_context is None:
-            self.request_context = {}
+    def get_header(self, name: str, default: Optional[str] = None) -> Optional[str]:
+        """Returns the value of the header (case-insensitive name)"""
+        headers = self.headers
+        if name in headers:
+            return headers[name]
+        name = name.lower()
+        for key, value in headers.items():
+            if key.lower() == name:
+                return value
+        return default
 
-        if type(event.get("body")) is str:
-            try:
-                self.body = json.loads(event.get("body"))
-            except TypeError and json.decoder.JSONDecodeError:
-                self.body = None
-        else:
-            self.body = None
 
-        self.is_base_64_encoded: bool = event.get("isBase64Encoded")
+class Context:
+    """Mapped Lambda context (the unmodified context: "raw")
 
-    @staticmethod
-    def _unquote_dict_items(dict_: Dict[Any, str]):
-        for key in dict_:
-            dict_[key] = urllib.parse.unquote(dict_[key])
+    The context of the current invocation is available as Context.current (set by the middleware decorator)
+    """
 
+    __slots__ = ("raw", "request_id", "function_name", "deadline")
 
-# TODO mapping for Lambda context
+    current: Optional["Context"] = None
+
+    def __init__(self, context):
+        self.raw = context
+        self.request_id: Optional[str] = getattr(context, "aws_request_id", None)
+        self.function_name: Optional[str] = getattr(context, "function_name", None)
+        get_remaining_time_in_millis = getattr(context, "get_remaining_time_in_millis", None)
+        self.deadline: float = time.monotonic() + get_remaining_time_in_millis() / 1000 \
+            if get_remaining_time_in_millis is not None else math.inf
+
+    @property
+    def remaining_time(self) -> float:
+        """Remaining time budget in seconds (math.inf if unknown)"""
+        return self.deadline - time.monotonic()
+
+
+class DeadlineExceeded(Exception):
+    """Raised if the remaining time budget of the invocation is too small to continue (-> 503 response)"""
 
 
 class Response:
     """Response data (providing some utilities/ defaults) that can be mapped to the format expected by API Gateway
 
     CORS enabled by default (can be overwritten)
+    etag: precomputed version token of the body (e.g. an item version attribute), used instead of hashing the body
     """
 
     def __init__(self,
@@ -76,7 +179,8 @@ class Response:
                  headers: Optional[dict] = None,
                  multi_value_headers: Optional[dict] = None,
                  body: Optional[dict] = None,
-                 error_messages: Optional[list] = None):
+                 error_messages: Optional[list] = None,
+                 etag: Optional[str] = None):
         self.status_code = status_code
         self.headers = headers if headers else {}
         if "Access-Control-Allow-Origin" not in self.headers:
@@ -88,32 +192,145 @@ class Response:
         self.multi_value_headers = multi_value_headers if multi_value_headers else {}
         self.body = body if body else {}
         self.error_messages = error_messages if error_messages else []
+        self.etag = etag
 
-    def map(self):
-        """Maps the response to the format expected by API Gateway"""
-        body = {
-            **self.body
-        }
-        if self.error_messages:
-            body["errors"] = self.error_messages
+    def map(self, event: Optional[Event] = None, compress: bool = True, cache_control: Optional[str] = None):
+        """Maps the response to the format expected by API Gateway
+
+        If the event is given:
+        - and compress is true, the body is compressed according to the event's Accept-Encoding header
+          (if it exceeds the size threshold of the compression module)
+        - successful GET responses get an ETag (and the Cache-Control header, if given),
+          a 304 response without body is returned if the event's If-None-Match header matches the ETag
+        The content coding is negotiated first: the ETag names the representation the client gets (suffix "-gzip"/
+        "-br" if it accepts one), for 200 and 304 responses alike, both vary by Accept-Encoding.
+        """
         mapped = {
             "statusCode": self.status_code,
             "headers": self.headers,
             "multiValueHeaders": self.multi_value_headers,
         }
-        if body:
-            mapped["body"] = json.dumps(body)
+        compress = compress and event is not None
+        coding = compression.negotiate(event.get_header("Accept-Encoding")) if compress else None
+        conditional = event is not None and self.status_code == 200 and event.method in ("GET", "HEAD")
+        if conditional:
+            headers = mapped["headers"] = {**self.headers}
+            if cache_control and "Cache-Control" not in headers:
+                headers["Cache-Control"] = cache_control
+            if compress:
+                headers["Vary"] = "Accept-Encoding"
+            if self.etag is not None:
+                if self._set_etag(mapped, event, self.etag, coding):
+                    return mapped  # not modified, the body isn't serialized at all
+        body = {
+            **self.body
+        }
+        if self.error_messages:
+            body["errors"] = self.error_messages
+        if not body:
+            return mapped
+        data = codec.dumps(body)
+        if conditional and self.etag is None:
+            if self._set_etag(mapped, event, hashlib.blake2b(data.encode(), digest_size=16).hexdigest(), coding):
+                return mapped
+        mapped["body"] = data
+        if compress:
+            self._compress(mapped, coding)
         return mapped
 
+    @staticmethod
+    def _set_etag(mapped: dict, event: Event, tag: str, coding: Optional[str]) -> bool:
+        """Sets the ETag header (of the coding's representation), turns the response into a 304 response if
+        If-None-Match matches (returns True)
+        """
+        etag = f'"{tag}"'
+        mapped["headers"]["ETag"] = f'"{tag}-{coding}"' if coding else etag
+        if_none_match = event.get_header("If-None-Match")
+        if if_none_match and _etag_matches(if_none_match, etag):
+            mapped["statusCode"] = 304
+            return True
+        return False
 
-def middleware(handler: Callable):
+    @staticmethod
+    def _compress(mapped: dict, coding: Optional[str]):
+        headers = mapped["headers"] = {**mapped["headers"], "Vary": "Accept-Encoding"}
+        data = compression.encode(mapped["body"].encode(), coding) if coding else None
+        if data is None:
+            return
+        headers["Content-Encoding"] = coding
+        headers["Content-Type"] = "application/json"
+        mapped["body"] = base64.b64encode(data).decode()
+        mapped["isBase64Encoded"] = True
+
+
+def _etag_matches(if_none_match: str, etag: str) -> bool:
+    """Weak comparison (as required for If-None-Match), content coding suffixes are ignored"""
+    if if_none_match.strip() == "*":
+        return True
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate.startswith("W/"):
+            candidate = candidate[2:]
+        if candidate == etag:
+            return True
+        for coding in ("gzip", "br"):
+            if candidate == f'{etag[:-1]}-{coding}"':
+                return True
+    return False
+
+
+def _reject_large_body(event: Event) -> Optional[Response]:
+    try:
+        validation.check_body_size(event)
+    except validation.RequestValidationError as e:
+        return Response(status_code=e.status_code, error_messages=[["Request validation failed", e.errors]])
+    return None
+
+
+def middleware(handler: Optional[Callable] = None, *, compress: bool = True, cache_control: Optional[str] = None):
     """Middleware between API Gateway and a handler: maps event/ response
 
-    The handler gets a mapped event and an unmodified context; and has to return a Response"""
+    The handler gets a mapped event and a mapped context; and has to return a Response
+    If the handler raises DeadlineExceeded, a 503 response is returned
+    Warm-up events ({"warmUp": ...}) are answered without calling the handler (see warm_up module)
+    Phase timings of the invocation are recorded and emitted (see metrics module)
+    Requests whose body exceeds the route's size limit are answered with 413 before anything parses the body
+    Options (use as @middleware(compress=False, cache_control="public, max-age=60")):
+        compress: compress the response body if the client accepts it (see compression module)
+        cache_control: Cache-Control header of successful GET responses (route policy)
+    """
+
+    if handler is None:
+        return functools.partial(middleware, compress=compress, cache_control=cache_control)
 
     @functools.wraps(handler)
-    def wrapper(event: dict, context: dict):
-        event = Event(event)
-        response: Response = handler(event, context)
-        return response.map()
+    def wrapper(event: dict, context):
+        if "warmUp" in event:  # pre-warming, the handler isn't called (see warm_up module)
+            from . import warm_up
+            return warm_up.handle(event, context)
+        recorder = metrics.start(f"{event.get('httpMethod')} {event.get('resource')}")
+        try:
+            with metrics.timed("event"):
+                event = Event(event)
+                context = Context.current = Context(context)
+                rejected = _reject_large_body(event)
+            try:
+                with metrics.timed("handler"):
+                    response: Response = rejected or handler(event, context)
+            except DeadlineExceeded:
+                logging.warning("Deadline exceeded, return 503 resp. (request id: %s)", context.request_id)
+                response = Response(
+                    status_code=503,
+                    headers={"Retry-After": "1"},
+                    error_messages=["The request took too long, try again"])
+            finally:
+                Context.current = None
+            with metrics.timed("response"):
+                mapped = response.map(event, compress=compress, cache_control=cache_control)
+            if recorder is not None and metrics.server_timing:
+                mapped["headers"] = {**mapped["headers"], "Server-Timing": recorder.server_timing(),
+                                     "Timing-Allow-Origin": "*"}
+            return mapped
+        finally:
+            metrics.finish(getattr(context, "request_id", None))
     return wrapper
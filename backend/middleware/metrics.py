@@ -0,0 +1,146 @@
+"""Per-invocation phase timings, emitted as CloudWatch Embedded Metric Format (one line per invocation)
+
+Phases are recorded with "timed" (a no-op if the invocation isn't sampled) and accumulated per name (ms).
+Warm-up invocations aren't recorded ("skip"), they only end the container's cold start.
+Configuration (environment variables):
+    MetricsSampleRate: share of invocations that are recorded (0 - 1, default 1)
+    MetricsNamespace: CloudWatch namespace (default "BlogBackend")
+    ServerTiming: "1" to include the timings as Server-Timing response header
+"""
+
+import os
+import sys
+import json
+import time
+import random
+import threading
+from typing import Dict, Optional
+
+sample_rate = float(os.environ.get("MetricsSampleRate", 1))
+namespace = os.environ.get("MetricsNamespace", "BlogBackend")
+server_timing = os.environ.get("ServerTiming") == "1"
+
+
+class Recorder:
+    """Timings of the current invocation
+
+    Phases and counters can be added from worker threads (e.g. the DynamoDB calls of a parallel scan)
+    """
+
+    __slots__ = ("route", "cold_start", "phases", "counters", "start", "lock")
+
+    def __init__(self, route: str, cold_start: bool):
+        self.route = route
+        self.cold_start = cold_start
+        self.phases: Dict[str, float] = {}
+        self.counters: Dict[str, int] = {}
+        self.start = time.perf_counter()
+        self.lock = threading.Lock()
+
+    def add(self, name: str, seconds: float):
+        with self.lock:
+            self.phases[name] = self.phases.get(name, 0.0) + seconds * 1000
+
+    def count(self, name: str, n: int = 1):
+        with self.lock:
+            self.counters[name] = self.counters.get(name, 0) + n
+
+    def emf(self, request_id: Optional[str] = None) -> dict:
+        total = (time.perf_counter() - self.start) * 1000
+        with self.lock:
+            phases, counters = dict(self.phases), dict(self.counters)
+        values = {**phases, "total": total}
+        metrics = [{"Name": name, "Unit": "Milliseconds"} for name in values]
+        metrics += [{"Name": name, "Unit": "Count"} for name in counters]
+        return {
+            "_aws": {
+                "Timestamp": int(time.time() * 1000),
+                "CloudWatchMetrics": [{
+                    "Namespace": namespace,
+                    "Dimensions": [["Route", "ColdStart"]],
+                    "Metrics": metrics
+                }]
+            },
+            "Route": self.route,
+            "ColdStart": "true" if self.cold_start else "false",
+            "requestId": request_id,
+            **{name: round(value, 3) for name, value in values.items()},
+            **counters
+        }
+
+    def server_timing(self) -> str:
+        with self.lock:
+            phases = list(self.phases.items())
+        return ", ".join(f"{name};dur={value:.1f}" for name, value in phases)
+
+
+current: Optional[Recorder] = None
+_cold_start = True
+_pending: Dict[str, float] = {}  # phases (ms) that ran before the next invocation's recording started
+
+
+class timed:
+    """Context manager recording the duration of a phase on the current recorder"""
+
+    __slots__ = ("name", "start")
+
+    def __init__(self, name: str):
+        self.name = name
+        self.start = None
+
+    def __enter__(self):
+        if current is not None:
+            self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        if self.start is not None and current is not None:
+            current.add(self.name, time.perf_counter() - self.start)
+        return False
+
+
+def count(name: str, n: int = 1):
+    if current is not None:
+        current.count(name, n)
+
+
+def record_pending(name: str, seconds: float):
+    """Records a phase that ran before the invocation's recording started (e.g. the router importing the route's
+    handler), it's added to the next invocation (phases and total)
+    """
+    _pending[name] = _pending.get(name, 0.0) + seconds * 1000
+
+
+def skip() -> bool:
+    """Marks an invocation that isn't recorded (warm-up), returns whether it's the container's first one
+
+    Later invocations aren't cold starts, pending phases are dropped
+    """
+    global _cold_start
+    cold_start, _cold_start = _cold_start, False
+    _pending.clear()
+    return cold_start
+
+
+def start(route: str) -> Optional[Recorder]:
+    """Starts recording an invocation (if sampled), returns the recorder"""
+    global current, _cold_start
+    cold_start, _cold_start = _cold_start, False
+    if sample_rate < 1 and random.random() >= sample_rate:
+        current = None
+    else:
+        current = Recorder(route, cold_start)
+        for name, value in _pending.items():
+            current.phases[name] = value
+            current.start -= value / 1000
+    _pending.clear()
+    return current
+
+
+def finish(request_id: Optional[str] = None) -> Optional[Recorder]:
+    """Emits the EMF line of the current invocation and stops recording, returns the recorder"""
+    global current
+    recorder, current = current, None
+    if recorder is not None:
+        sys.stdout.write(json.dumps(recorder.emf(request_id)) + "\n")
+    return recorder
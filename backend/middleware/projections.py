@@ -0,0 +1,93 @@
+"""Derived read models maintained by the projection worker (DynamoDB Streams), stored in the catalog table
+
+Article activity, an item per article:
+
+    {"catalog": "article-activity", "name": <urlTitle>, "commentCount": 2, "replyCount": 3,
+     "lastActivity": "2021-05-01T10:00:00.000000", "computedAt": <microseconds since the epoch>}
+
+Projections are recomputed from the source tables (not incremented per stream record), so processing a record
+twice or out of order gives the same result.
+"""
+
+import os
+import time
+import logging
+from typing import Dict, Iterable, Optional
+from .comments import split_id
+
+ARTICLE_ACTIVITY = "article-activity"
+_activity_attributes = ("commentCount", "replyCount", "lastActivity")
+
+
+def _timestamp(id_: str) -> str:
+    """Comment/ reply ids start with the creation time: "<isoformat>#<uuid>" """
+    return id_.split("#", 1)[0]
+
+
+def compute_article_activity(article_table, comment_table, url_title: str) -> Optional[dict]:
+    """Returns the article's activity (None if the article doesn't exist), reads are strongly consistent"""
+    import boto3.dynamodb.conditions
+    article = article_table.get_item(
+        Key={"urlTitle": url_title}, ProjectionExpression="published", ConsistentRead=True).get("Item")
+    if article is None:
+        return None
+    comments = comment_table.iter_query(
+        KeyConditionExpression=boto3.dynamodb.conditions.Key("articleUrlTitle").eq(url_title),
+        ProjectionExpression="id, resps",
+        ConsistentRead=True
+    )
+    last_activity = article["published"]
+    comment_count = reply_count = 0
+    for item in comments:
+        comment_id, resp_id = split_id(item["id"])
+        if resp_id is not None:
+            reply_count += 1
+            last_activity = max(last_activity, _timestamp(resp_id))
+            continue
+        comment_count += 1
+        last_activity = max(last_activity, _timestamp(comment_id))
+        resps = item.get("resps") or {}  # not migrated yet
+        reply_count += len(resps)
+        for resp_id in resps:
+            last_activity = max(last_activity, _timestamp(resp_id))
+    return {"commentCount": comment_count, "replyCount": reply_count, "lastActivity": last_activity}
+
+
+def refresh_article_activity(article_table, comment_table, catalog_table, url_title: str) -> Optional[dict]:
+    """Recomputes and stores (deletes if the article doesn't exist anymore) the article's activity
+
+    The stored item holds when its computation started (computedAt, before the reads): the write only applies if
+    the stored projection was computed earlier, so a concurrent refresh that read older state can't overwrite it
+    """
+    import botocore.exceptions
+    key = {"catalog": ARTICLE_ACTIVITY, "name": url_title}
+    computed_at = time.time_ns() // 1000  # microseconds
+    activity = compute_article_activity(article_table, comment_table, url_title)
+    condition = {
+        "ConditionExpression": "attribute_not_exists(computedAt) OR computedAt < :computed_at",
+        "ExpressionAttributeValues": {":computed_at": computed_at},
+    }
+    try:
+        if activity is None:
+            catalog_table.delete_item(Key=key, **condition)
+        else:
+            catalog_table.put_item(Item={**key, **activity, "computedAt": computed_at}, **condition)
+    except botocore.exceptions.ClientError as e:
+        if e.response["Error"]["Code"] != "ConditionalCheckFailedException":
+            raise
+        logging.info("Activity of article '%s' not stored, a newer one is", url_title)
+    return activity
+
+
+def get_article_activity(url_titles: Iterable[str]) -> Dict[str, dict]:
+    """Returns the stored activity per article (urlTitle -> {commentCount, replyCount, lastActivity})
+
+    The activity is supplementary: articles whose activity wasn't read (keys left unprocessed) are left out
+    """
+    from .utils import batch_get
+    keys = [{"catalog": ARTICLE_ACTIVITY, "name": url_title} for url_title in set(url_titles)]
+    items, unprocessed = batch_get(os.environ.get("CatalogTableName"), keys,
+                                   projection=["name", *_activity_attributes])
+    if unprocessed:
+        logging.warning("Article activity of %d articles not read (unprocessed keys)", len(unprocessed))
+    return {item["name"]: {name: item[name] for name in _activity_attributes if name in item} for item in items}
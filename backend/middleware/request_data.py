@@ -0,0 +1,100 @@
+"""Handler data models and the "data" decorator (pydantic is only imported by this module)"""
+
+from . import Response, Event, metrics, validation
+import abc
+import functools
+import logging
+import typing
+from typing import Callable
+from pydantic import BaseModel, ValidationError
+
+
+@functools.lru_cache(maxsize=None)
+def _field_types(model) -> dict:
+    """The model's fields (name -> int/ float if the field is a number, else None)"""
+    names = getattr(model, "model_fields", None) or model.__fields__
+    hints = typing.get_type_hints(model)
+    types_ = {}
+    for name in names:
+        hint = hints.get(name)
+        if typing.get_origin(hint) is typing.Union:  # Optional[int]
+            args = [arg for arg in typing.get_args(hint) if arg is not type(None)]
+            hint = args[0] if len(args) == 1 else None
+        types_[name] = hint if hint in (int, float) else None
+    return types_
+
+
+class Model(BaseModel):
+    """Base class for handler data models
+
+    request_values maps the request to the model's fields (style: camelCase). If the route's request schema was
+    compiled from the api spec (see validation module), the request is validated by that validator and the model is
+    built by "build_validated" without pydantic's validation; otherwise "build" validates with pydantic
+    """
+
+    @classmethod
+    @abc.abstractmethod
+    def request_values(cls, event: Event, context) -> dict:
+        pass
+
+    @classmethod
+    def build(cls, event: Event, context):
+        return cls(**cls.request_values(event, context))
+
+    @classmethod
+    def build_validated(cls, event: Event, context):
+        """Builds the model from the already validated request: numbers are converted (path/ query parameters are
+        strings), missing fields get their defaults, values are not validated again
+        """
+        values = cls.request_values(event, context)
+        fields = {}
+        for name, type_ in _field_types(cls).items():
+            if name in values:
+                value = values[name]
+                if type_ is not None and value is not None and type(value) is not type_:
+                    value = type_(value)
+                fields[name] = value
+        return (getattr(cls, "model_construct", None) or cls.construct)(**fields)
+
+
+# handler decorator
+def data(model, compiled: bool = True):
+    """Parses Lambda event and context with the data model and passes it on to the handler
+
+    Models derived from "Model" are validated by the route's compiled validator (see validation module) if
+    available and compiled is true; pydantic is the fallback (any model with a "build" classmethod).
+    If validation fails a 400 status code is returned along with an error message
+    (including pydantic's error).
+    Style: model attributes in camelCase
+    """
+
+    def decorator(middleware_wrapped_handler: Callable):
+        use_compiled = compiled and isinstance(model, type) and issubclass(model, Model)
+
+        @functools.wraps(middleware_wrapped_handler)
+        def wrapper(*args, **kwargs):
+            event = args[0]
+            validator = validation.get_validator(f"{event.method} {event.ressource}") if use_compiled else None
+            try:
+                with metrics.timed("validation"):
+                    if validator is not None:
+                        validator(event)
+                        data_ = model.build_validated(event, args[1])
+                    else:
+                        data_ = model.build(event, args[1])
+            except validation.RequestValidationError as e:
+                return Response(
+                    status_code=e.status_code,
+                    error_messages=[["Request validation failed", e.errors]])
+            except ValidationError as e:
+                return Response(
+                    status_code=400,
+                    error_messages=[["Request validation failed (pydantic error)", e.json()]])
+            except:
+                logging.exception("Data Model failed to build, return 500 resp.")
+                return Response(
+                    status_code=500,
+                    error_messages=["Failed to load the request data. Make sure to check you request."])
+            return middleware_wrapped_handler(*args, data_, **kwargs)
+        return wrapper
+    return decorator
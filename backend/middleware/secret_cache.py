@@ -0,0 +1,65 @@
+"""TTL cache for secrets, with prefetching and refreshing in a background thread
+
+Prefetch during the Lambda init phase (module import), so that the first request doesn't wait for the secret.
+The value is refreshed in the background once it's older than ttl - refresh_margin; when a refresh fails, the
+cached value is served until it's expired (then it's loaded synchronously).
+"""
+
+import threading
+import time
+import logging
+from typing import Callable, Optional
+
+
+class SecretCache:
+
+    def __init__(self, loader: Callable[[], str], ttl: float = 300, refresh_margin: float = 60):
+        self._loader = loader
+        self.ttl = ttl
+        self.refresh_margin = min(refresh_margin, ttl)
+        self._value: Optional[str] = None
+        self._expires = 0.0
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+
+    def get(self) -> str:
+        thread = self._thread
+        if thread is not None and self._value is None:
+            thread.join()  # prefetch in progress, wait for it instead of loading again
+        value, now = self._value, time.monotonic()
+        if value is None or now >= self._expires:
+            return self._load()
+        if now >= self._expires - self.refresh_margin:
+            self.prefetch()
+        return value
+
+    def prefetch(self):
+        """Loads the value in a background thread (if there's no load in progress)"""
+        with self._lock:
+            if self._thread is not None:
+                return
+            self._thread = threading.Thread(target=self._load_in_background, daemon=True)
+            self._thread.start()
+
+    def warm(self):
+        """Prefetches the value unless it's cached and not due for a refresh (warm-up)"""
+        if self._value is None or time.monotonic() >= self._expires - self.refresh_margin:
+            self.prefetch()
+
+    def invalidate(self):
+        self._value = None
+        self._expires = 0.0
+
+    def _load(self) -> str:
+        value = self._loader()
+        self._value, self._expires = value, time.monotonic() + self.ttl
+        return value
+
+    def _load_in_background(self):
+        try:
+            self._load()
+        except Exception:
+            logging.warning("Failed to load secret in background", exc_info=True)
+        finally:
+            with self._lock:
+                self._thread = None
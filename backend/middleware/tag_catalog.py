@@ -0,0 +1,126 @@
+"""Materialized tag catalog: an item per tag in the catalog table
+
+    {"catalog": "tag", "name": "python", "articleCount": 3, "latestPublished": "2021-05-01"}
+
+The article handlers update the catalog in the same transaction as the article (see the transact items below), so
+GET /tag is a single query (partition "tag") instead of reading the whole tagIndex.
+Tags without articles keep an item with articleCount 0 (left out by "tags"). latestPublished is exact when
+articles are added to a tag; it isn't lowered when the latest article leaves a tag (delete, tag change), "rebuild"
+reconciles the catalog with the article table. Bulk imports (BatchWriteItem, no transactions) update the catalog
+once per batch ("apply_counts").
+"""
+
+import os
+from typing import Dict, List, Optional
+
+CATALOG = "tag"
+
+
+def _key(tag: str) -> dict:
+    return {"catalog": CATALOG, "name": tag}
+
+
+def add_article(tag: str, published: str, latest_published: Optional[str] = None) -> dict:
+    """Transact item: counts an article (published at "published") for the tag
+
+    latest_published: the tag's current latestPublished if the article may be older than today (tag change),
+    the item's condition then fails if the tag's latestPublished changed meanwhile
+    """
+    if latest_published is not None and latest_published >= published:
+        return {"Update": {
+            "TableName": os.environ.get("CatalogTableName"),
+            "Key": _key(tag),
+            "UpdateExpression": "ADD articleCount :one",
+            "ConditionExpression": "latestPublished = :latest",
+            "ExpressionAttributeValues": {":one": 1, ":latest": latest_published},
+        }}
+    return {"Update": {
+        "TableName": os.environ.get("CatalogTableName"),
+        "Key": _key(tag),
+        "UpdateExpression": "ADD articleCount :one SET latestPublished = :published",
+        "ConditionExpression": "attribute_not_exists(latestPublished) OR latestPublished <= :published",
+        "ExpressionAttributeValues": {":one": 1, ":published": published},
+    }}
+
+
+def remove_article(tag: str) -> dict:
+    """Transact item: uncounts an article of the tag"""
+    return {"Update": {
+        "TableName": os.environ.get("CatalogTableName"),
+        "Key": _key(tag),
+        "UpdateExpression": "ADD articleCount :minus_one",
+        "ExpressionAttributeValues": {":minus_one": -1},
+    }}
+
+
+def apply_counts(catalog_table, counts: Dict[str, int], latest_published: Dict[str, str]):
+    """Applies the article count changes of a batch (tag -> change), one update per tag
+
+    latest_published: tag -> latest published date of the batch's articles added to the tag (raises the tag's
+    latestPublished if it's later)
+    """
+    import botocore.exceptions
+    for tag in counts.keys() | latest_published.keys():
+        count = counts.get(tag, 0)
+        if tag in latest_published:
+            try:
+                catalog_table.update_item(
+                    Key=_key(tag),
+                    UpdateExpression="ADD articleCount :count SET latestPublished = :published",
+                    ConditionExpression="attribute_not_exists(latestPublished) OR latestPublished <= :published",
+                    ExpressionAttributeValues={":count": count, ":published": latest_published[tag]})
+                continue
+            except botocore.exceptions.ClientError as e:
+                if e.response["Error"]["Code"] != "ConditionalCheckFailedException":
+                    raise
+        if count:
+            catalog_table.update_item(
+                Key=_key(tag),
+                UpdateExpression="ADD articleCount :count",
+                ExpressionAttributeValues={":count": count})
+
+
+def get_entry(catalog_table, tag: str) -> Optional[dict]:
+    return catalog_table.get_item(Key=_key(tag), ConsistentRead=True).get("Item")
+
+
+def tags(catalog_table) -> List[dict]:
+    """Returns the catalog entries of the tags that have articles: [{"name", "articleCount", "latestPublished"}]"""
+    import boto3.dynamodb.conditions
+    items = catalog_table.query_paginate_items(
+        KeyConditionExpression=boto3.dynamodb.conditions.Key("catalog").eq(CATALOG),
+        ProjectionExpression="#name, articleCount, latestPublished",
+        ExpressionAttributeNames={"#name": "name"}
+    )
+    return [item for item in items if item.get("articleCount", 0) > 0]
+
+
+def rebuild(article_table, catalog_table, dry_run: bool = False, segments: int = 4) -> Dict[str, List[str]]:
+    """Recomputes the catalog from the article table (tagIndex, parallel scan of segments) and writes the differences
+
+    Returns the changed tags ({"updated": [...], "deleted": [...]}). Article writes during a rebuild can be lost
+    (run it when the blog isn't edited).
+    """
+    import boto3.dynamodb.conditions
+    expected = {}
+    for article in article_table.parallel_scan(
+            total_segments=segments, IndexName="tagIndex", ProjectionExpression="tag, published"):
+        entry = expected.setdefault(article["tag"], {"articleCount": 0, "latestPublished": article["published"]})
+        entry["articleCount"] += 1
+        entry["latestPublished"] = max(entry["latestPublished"], article["published"])
+    actual = {
+        item["name"]: {"articleCount": item.get("articleCount", 0), "latestPublished": item.get("latestPublished")}
+        for item in catalog_table.query_paginate_items(
+            KeyConditionExpression=boto3.dynamodb.conditions.Key("catalog").eq(CATALOG))
+    }
+    changes = {"updated": [], "deleted": []}
+    for tag, entry in expected.items():
+        if actual.get(tag) != entry:
+            changes["updated"].append(tag)
+            if not dry_run:
+                catalog_table.put_item(Item={**_key(tag), **entry})
+    for tag in actual.keys() - expected.keys():
+        changes["deleted"].append(tag)
+        if not dry_run:
+            catalog_table.delete_item(Key=_key(tag))
+    return changes
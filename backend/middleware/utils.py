@@ -1,35 +1,74 @@
-from . import Response, Event
+from . import Response, Context, DeadlineExceeded, aws, codec, metrics, warm_up
+from .secret_cache import SecretCache
 import functools
-from typing import Callable
-from pydantic import ValidationError
-import boto3
+from typing import Callable, Iterable, Iterator, List, Optional, Tuple
 import os
-import logging
 import json
+import hmac
+import time
+import queue
+import random
+import base64
+import threading
+from decimal import Decimal
+
+
+ADMIN_KEY_SECRET_ID = "blog-backend-admin-key"
+
+
+def load_admin_key() -> str:
+    """Loads the admin key from (in that order):
+
+    - the file at "AdminKeyFile" (environment variable), containing the secret string
+    - the AWS Parameters and Secrets Lambda Extension (if "PARAMETERS_SECRETS_EXTENSION_HTTP_PORT" is set)
+    - Secrets Manager
+    """
+    file_path = os.environ.get("AdminKeyFile")
+    extension_port = os.environ.get("PARAMETERS_SECRETS_EXTENSION_HTTP_PORT")
+    if file_path:
+        with open(file_path) as f:
+            string = f.read()
+    elif extension_port:
+        import urllib.request
+        request = urllib.request.Request(
+            f"http://localhost:{extension_port}/secretsmanager/get?secretId={ADMIN_KEY_SECRET_ID}",
+            headers={"X-Aws-Parameters-Secrets-Token": os.environ.get("AWS_SESSION_TOKEN", "")})
+        with urllib.request.urlopen(request, timeout=2) as response:
+            string = json.loads(response.read())["SecretString"]
+    else:
+        client = aws.get_client("secretsmanager", region_name="us-east-1")
+        string = client.get_secret_value(SecretId=ADMIN_KEY_SECRET_ID)['SecretString']
+    return json.loads(string)[ADMIN_KEY_SECRET_ID]
 
 
 class Authenticator:
-    """Loads the admin key once - compares against that key and stores the status of the current user
+    """Caches the admin key (TTL: "AdminKeyTtl" environment variable, seconds) - compares against that key and stores
+    the status of the current user
 
-    Used as a global instance, the user is registered by the "register_user" decorator
+    Used as a global instance, the user is registered by the "register_user" decorator (which also prefetches the key
+    during the init phase)
     """
 
     def __init__(self):
         self._current_user_is_admin = None
+        self._admin_key_cache = SecretCache(load_admin_key, ttl=float(os.environ.get("AdminKeyTtl", 300)))
+
+    @property
+    def _admin_key(self) -> str:
+        return self._admin_key_cache.get()
+
+    def prefetch(self):
+        """Loads the admin key in the background"""
+        self._admin_key_cache.prefetch()
 
-    @functools.cached_property
-    def _admin_key(self):
-        session = boto3.session.Session()
-        client = session.client(
-            service_name='secretsmanager',
-            region_name="us-east-1"
-        )
-        string = client.get_secret_value(SecretId="blog-backend-admin-key")['SecretString']
-        return json.loads(string)["blog-backend-admin-key"]
+    def warm(self):
+        """Prefetches the admin key unless it's cached (warm-up)"""
+        self._admin_key_cache.warm()
 
     def register(self, key):
-        """Sets the admin status (bool) of the current user by comparing the user's key"""
-        self._current_user_is_admin = key and key == self._admin_key
+        """Sets the admin status (bool) of the current user by comparing the user's key (constant-time)"""
+        self._current_user_is_admin = type(key) is str and len(key) > 0 and \
+            hmac.compare_digest(key.encode(), self._admin_key.encode())
         return self._current_user_is_admin
 
     @property
@@ -45,12 +84,16 @@ authenticator = Authenticator()
 # handler decorator
 def register_user(middleware_wrapped_handler: Callable):
     """Registers the user on the "authenticator" global"""
+    authenticator.prefetch()  # decorators are applied during the init phase
+    warm_up.register("admin_key", authenticator.warm)
+
     @functools.wraps(middleware_wrapped_handler)
     def wrapper(*args, **kwargs):
-        key = False
-        if type(args[0].body) == dict:
-            key = args[0].body.get("key", False)
-        authenticator.register(key)
+        with metrics.timed("auth"):
+            key = False
+            if type(args[0].body) == dict:
+                key = args[0].body.get("key", False)
+            authenticator.register(key)
         return middleware_wrapped_handler(*args, **kwargs)
     return wrapper
 
@@ -64,7 +107,9 @@ def admin_guard(middleware_wrapped_handler: Callable):
 
     @functools.wraps(middleware_wrapped_handler)
     def wrapper(*args, **kwargs):
-        if authenticator.current_user_is_admin:
+        with metrics.timed("auth"):
+            is_admin = authenticator.current_user_is_admin
+        if is_admin:
             return middleware_wrapped_handler(*args, **kwargs)
         return Response(
             status_code=401,
@@ -72,39 +117,301 @@ def admin_guard(middleware_wrapped_handler: Callable):
     return wrapper
 
 
+class Fields:
+    """The attributes a client selected with the "fields" query parameter (sparse fieldset), see "fields"
+
+    names is None if the client didn't select any (all attributes)
+    """
+
+    def __init__(self, allowed: Iterable[str], names: Optional[Iterable[str]] = None):
+        self.allowed = frozenset(allowed)
+        self.names = None if names is None else frozenset(names)
+
+    def __contains__(self, name: str) -> bool:
+        return self.names is None or name in self.names
+
+    def projection(self, *required: str) -> Optional[List[str]]:
+        """The attributes to read: the selected ones plus the required (keys, attributes the handler needs itself),
+        None if all attributes are selected
+        """
+        if self.names is None:
+            return None
+        return sorted(self.names.union(required))
+
+    def select(self, item: dict) -> dict:
+        """The item without the allowed attributes that weren't selected (other attributes, e.g. keys, are kept)"""
+        if self.names is None:
+            return item
+        return {name: value for name, value in item.items() if name in self.names or name not in self.allowed}
+
+
 # handler decorator
-def data(model):
-    """Parses Lambda event and context with the pydantic model and passes it on to the handler
+def fields(allowed: Iterable[str]):
+    """Sparse fieldsets: parses the "fields" query parameter (comma separated attribute names, e.g.
+    ?fields=title,description) and passes a Fields object on to the handler (keyword argument "fields")
 
-    If validation fails a 400 status code is returned along with an error message (including pydantic's error).
-    Style: model attributes in camelCase
+    The names have to be in the allow-list, otherwise a 400 status code is returned along with an error message.
+    The handler reads the projection (Fields.projection -> "projection" of the wrapped table calls) and responds with
+    the selected attributes (Fields.select). Apply it after "data"
     """
+    allowed = tuple(allowed)
 
     def decorator(middleware_wrapped_handler: Callable):
+
         @functools.wraps(middleware_wrapped_handler)
         def wrapper(*args, **kwargs):
-            try:
-                data_ = model.build(args[0], args[1])
-            except ValidationError as e:
-                return Response(
-                    status_code=400,
-                    error_messages=[["Request validation failed (pydantic error)", e.json()]])
-            except:
-                logging.exception("Data Model failed to build, return 500 resp.")
-                return Response(
-                    status_code=500,
-                    error_messages=["Failed to load the request data. Make sure to check you request."])
-            return middleware_wrapped_handler(*args, data_, **kwargs)
+            value = args[0].query_string_parameters.get("fields")
+            names = None
+            if value is not None:
+                names = [name.strip() for name in value.split(",") if name.strip()]
+                unknown = [name for name in names if name not in allowed]
+                if not names or unknown:
+                    return Response(
+                        status_code=400,
+                        error_messages=[["Request validation failed",
+                                         [f"fields: expected comma separated names of {list(allowed)}"]]])
+            return middleware_wrapped_handler(*args, fields=Fields(allowed, names), **kwargs)
         return wrapper
     return decorator
 
 
+# seconds the rest of the invocation needs after the last DynamoDB call (e.g. mapping the response)
+RESPONSE_RESERVE = 0.3
+
+
+def get_deadline_reserve(profile: Optional[str] = None) -> float:
+    """Seconds kept in reserve when calling DynamoDB: the longest the call can take with the client config
+    (aws.max_call_duration, all attempts) and then mapping the response ("DeadlineReserve" environment variable
+    overrides it)
+    """
+    if "DeadlineReserve" in os.environ:
+        return float(os.environ["DeadlineReserve"])
+    return aws.max_call_duration(aws.get_settings(profile)) + RESPONSE_RESERVE
+
+
+deadline_reserve = get_deadline_reserve()
+
+
+class Items(list):
+    """Items of a paginated scan/ query, last_evaluated_key is set if the result is partial (deadline)"""
+
+    last_evaluated_key: Optional[dict] = None
+
+    @property
+    def complete(self) -> bool:
+        return self.last_evaluated_key is None
+
+
+class ItemIterator:
+    """Lazily paginated items of a scan/ query (wrapped table's iter_scan/ iter_query)
+
+    A page is requested when the consumer reaches it, nothing is fetched after the consumer stops. max_items is passed
+    down as each request's Limit (capped by the caller's Limit), so the last page ends at max_items.
+    last_evaluated_key is the key to resume from: the LastEvaluatedKey of the last page the consumer got through
+    (items of a page left in the middle are read again when resuming). complete is True once the scan/ query
+    reached its end.
+    Before the deadline (see wrap_boto3_dynamodb_table) the iterator raises DeadlineExceeded, or with
+    allow_partial=True stops.
+    """
+
+    def __init__(self, fetch: Callable, kwargs: dict, max_items: Optional[int] = None, allow_partial: bool = False,
+                 exclusive_start_key: Optional[dict] = None):
+        self.last_evaluated_key = exclusive_start_key
+        self.complete = False
+        self._items = self._generate(fetch, kwargs, max_items, allow_partial)
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        return next(self._items)
+
+    def close(self):
+        self._items.close()
+
+    def _generate(self, fetch: Callable, kwargs: dict, max_items: Optional[int], allow_partial: bool):
+        remaining = max_items
+        context = Context.current
+        slowest_page = None
+        while remaining is None or remaining > 0:
+            if slowest_page is not None and context is not None and \
+                    context.remaining_time < deadline_reserve + slowest_page:
+                if not allow_partial:
+                    raise DeadlineExceeded()
+                return
+            if remaining is not None:
+                kwargs["Limit"] = min(remaining, kwargs.get("Limit", remaining))
+            start = time.monotonic()
+            response = fetch(**kwargs, ExclusiveStartKey=self.last_evaluated_key)
+            slowest_page = max(slowest_page or 0.0, time.monotonic() - start)
+            items = response.get("Items", [])
+            if remaining is not None:
+                remaining -= len(items)
+            yield from items
+            self.last_evaluated_key = response.get("LastEvaluatedKey")
+            if self.last_evaluated_key is None:
+                self.complete = True
+                return
+
+
+def encode_cursor(key: dict) -> str:
+    """Encodes a LastEvaluatedKey as an opaque (url safe) pagination cursor"""
+    return base64.urlsafe_b64encode(codec.dumps(key).encode()).decode()
+
+
+def decode_cursor(cursor: str) -> dict:
+    """Decodes a pagination cursor (raises ValueError if invalid)"""
+    try:
+        key = codec.loads(base64.urlsafe_b64decode(cursor.encode()))
+    except Exception as e:
+        raise ValueError("Invalid cursor") from e
+    if type(key) is not dict:
+        raise ValueError("Invalid cursor")
+    return key
+
+
+def add_projection(kwargs: dict, names: Iterable[str]) -> dict:
+    """Sets the ProjectionExpression of the attributes on the request kwargs (placeholders: names can be reserved
+    words, merged with the request's ExpressionAttributeNames)
+    """
+    names = list(names)
+    kwargs["ProjectionExpression"] = ", ".join(f"#p{i}" for i in range(len(names)))
+    kwargs["ExpressionAttributeNames"] = {
+        **kwargs.get("ExpressionAttributeNames", {}), **{f"#p{i}": name for i, name in enumerate(names)}}
+    return kwargs
+
+
+def _call_wrapper(fn):
+    """Makes a DynamoDB call deadline-aware (raises DeadlineExceeded if the reserve is reached), counts and times it"""
+    @functools.wraps(fn)
+    def wrapper(*args, **kwargs):
+        context = Context.current
+        if context is not None and context.remaining_time < deadline_reserve:
+            raise DeadlineExceeded()
+        metrics.count("dynamodb_calls")
+        with metrics.timed("dynamodb"):
+            return fn(*args, **kwargs)
+    return wrapper
+
+
+_throttling_errors = ("ProvisionedThroughputExceededException", "ThrottlingException", "RequestLimitExceeded")
+
+
+class _CapacityPacer:
+    """Paces requests so that the consumed capacity (units per second, measured over the scan) stays at the target"""
+
+    def __init__(self, capacity_per_second: Optional[float]):
+        self.capacity_per_second = capacity_per_second
+        self.consumed = 0.0
+        self.start = time.monotonic()
+        self.lock = threading.Lock()
+
+    def wait(self):
+        if self.capacity_per_second is None:
+            return
+        with self.lock:
+            ahead = self.consumed / self.capacity_per_second - (time.monotonic() - self.start)
+        if ahead > 0:
+            time.sleep(ahead)
+
+    def add(self, capacity_units: float):
+        with self.lock:
+            self.consumed += capacity_units
+
+
+def parallel_scan(scan: Callable, total_segments: int = 4, max_workers: Optional[int] = None,
+                  capacity_per_second: Optional[float] = None, max_attempts: int = 5, **kwargs) -> Iterator[dict]:
+    """Scans the segments (TotalSegments) concurrently, yields the items as the pages arrive (in no particular order)
+
+    scan is a (wrapped) table's scan, kwargs are passed on (e.g. IndexName, ProjectionExpression). The segments run
+    on a thread pool of max_workers (default: the client's max_pool_connections) that shares the table's client.
+    Backpressure: a bounded page queue blocks the segments while the consumer is busy, they stop when it stops
+    iterating. Throttled pages are retried with backoff (after botocore's retries, up to max_attempts), and with
+    capacity_per_second the segments are paced by the consumed capacity DynamoDB reports for each page.
+    """
+    import botocore.exceptions
+    from concurrent.futures import ThreadPoolExecutor
+
+    workers = min(total_segments, max_workers or aws.get_settings()["max_pool_connections"])
+    pages = queue.Queue(maxsize=2 * workers)
+    stop = threading.Event()
+    pacer = _CapacityPacer(capacity_per_second)
+    segment_done = object()
+
+    def put(value):
+        while not stop.is_set():
+            try:
+                pages.put(value, timeout=0.1)
+                return
+            except queue.Full:
+                continue
+
+    def scan_segment(segment: int):
+        key = None
+        attempt = 1
+        try:
+            while not stop.is_set():
+                pacer.wait()
+                try:
+                    response = scan(**kwargs, Segment=segment, TotalSegments=total_segments, ExclusiveStartKey=key,
+                                    ReturnConsumedCapacity="TOTAL")
+                except botocore.exceptions.ClientError as e:
+                    if e.response["Error"]["Code"] not in _throttling_errors or attempt >= max_attempts:
+                        raise
+                    time.sleep(random.uniform(0, min(0.05 * 2 ** attempt, 2)))
+                    attempt += 1
+                    continue
+                attempt = 1
+                pacer.add(response.get("ConsumedCapacity", {}).get("CapacityUnits", 0))
+                if response.get("Items"):
+                    put(response["Items"])
+                key = response.get("LastEvaluatedKey")
+                if key is None:
+                    break
+        except Exception as e:
+            put(e)
+        put(segment_done)
+
+    executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="parallel-scan")
+    try:
+        for segment in range(total_segments):
+            executor.submit(scan_segment, segment)
+        remaining = total_segments
+        while remaining:
+            page = pages.get()
+            if page is segment_done:
+                remaining -= 1
+            elif isinstance(page, Exception):
+                raise page
+            else:
+                yield from page
+    finally:
+        stop.set()
+        executor.shutdown(wait=True)
+
+
 def wrap_boto3_dynamodb_table(table):
     """Wraps a boto3 dynamodb table to provide some utils
 
     table = wrap_boto3_dynamodb_table(boto3.resource("dynamodb").Table("my-table"))
+
+    Calls are timed (metrics module) and deadline-aware: if the remaining time budget of the invocation (Context.current) falls below the
+    reserve, DeadlineExceeded is raised instead of calling DynamoDB.
+    iter_scan/ iter_query(max_items=None, allow_partial=False, **kwargs) return an ItemIterator (lazy pagination).
+    *_paginate_items collect them into a list and stop paginating before the deadline: they raise DeadlineExceeded,
+    or with allow_partial=True return the items read so far (Items.last_evaluated_key is set to continue from there)
+    parallel_scan(total_segments, ...) streams a segmented scan, see parallel_scan
+    get_item, scan and query (and the iterators) take projection=[attribute names], see add_projection
     """
 
+    def projection_wrapper(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, projection: Optional[Iterable[str]] = None, **kwargs):
+            if projection:
+                add_projection(kwargs, projection)
+            return fn(*args, **kwargs)
+        return wrapper
+
     def ignore_empty_pagination_key_wrapper(fn):
         @functools.wraps(fn)
         def wrapper(*args, **kwargs):
@@ -113,34 +420,307 @@ def wrap_boto3_dynamodb_table(table):
             return fn(*args, **kwargs)
         return wrapper
 
-    def paginate_items_wrapper(fn):
+    def iter_items_wrapper(fn):
         @functools.wraps(fn)
+        def wrapper(*args, max_items: Optional[int] = None, allow_partial: bool = False,
+                    ExclusiveStartKey: Optional[dict] = None, **kwargs):
+            return ItemIterator(functools.partial(fn, *args), kwargs, max_items, allow_partial, ExclusiveStartKey)
+        return wrapper
+
+    def paginate_items_wrapper(iter_items):
+        @functools.wraps(iter_items)
         def wrapper(*args, **kwargs):
-            items = []
-            key = None
-            while True:
-                response = fn(*args, **kwargs, ExclusiveStartKey=key)
-                if "Items" in response:
-                    items += response["Items"]
-                if "LastEvaluatedKey" in response:
-                    key = response["LastEvaluatedKey"]
-                    continue
-                break
+            iterator = iter_items(*args, **kwargs)
+            items = Items(iterator)
+            if not iterator.complete:
+                items.last_evaluated_key = iterator.last_evaluated_key
             return items
         return wrapper
 
-    table.scan = ignore_empty_pagination_key_wrapper(table.scan)
-    table.query = ignore_empty_pagination_key_wrapper(table.query)
-    table.scan_paginate_items = paginate_items_wrapper(table.scan)
-    table.query_paginate_items = paginate_items_wrapper(table.query)
+    for name in ("get_item", "put_item", "update_item", "delete_item"):
+        setattr(table, name, _call_wrapper(getattr(table, name)))
+    table.get_item = projection_wrapper(table.get_item)
+    table.scan = projection_wrapper(ignore_empty_pagination_key_wrapper(_call_wrapper(table.scan)))
+    table.query = projection_wrapper(ignore_empty_pagination_key_wrapper(_call_wrapper(table.query)))
+    table.iter_scan = iter_items_wrapper(table.scan)
+    table.iter_query = iter_items_wrapper(table.query)
+    table.scan_paginate_items = paginate_items_wrapper(table.iter_scan)
+    table.query_paginate_items = paginate_items_wrapper(table.iter_query)
+    table.parallel_scan = functools.partial(parallel_scan, table.scan)
     return table
 
 
-def get_article_table():
-    name = os.environ.get("ArticleTableName")
-    return wrap_boto3_dynamodb_table(boto3.resource("dynamodb").Table(name))
+def _number(string: str):
+    if "." in string or "e" in string or "E" in string:
+        return float(string)
+    return int(string)
+
+
+def deserialize(value: dict):
+    """Converts a DynamoDB attribute value into a JSON-ready Python value (numbers as int/ float, sets as lists)
+
+    The checks are ordered by the attribute types of our items (articles: S/N, comments: S and the "resps" map)
+    """
+    (type_, raw), = value.items()
+    if type_ == "S":
+        return raw
+    if type_ == "N":
+        return _number(raw)
+    if type_ == "M":
+        return {name: deserialize(item) for name, item in raw.items()}
+    if type_ == "L":
+        return [deserialize(item) for item in raw]
+    if type_ == "BOOL":
+        return raw
+    if type_ == "NULL":
+        return None
+    if type_ == "SS":
+        return list(raw)
+    if type_ == "NS":
+        return [_number(item) for item in raw]
+    if type_ == "B":
+        return raw
+    if type_ == "BS":
+        return list(raw)
+    raise TypeError(f"Unknown DynamoDB type '{type_}'")
+
+
+def deserialize_item(item: dict) -> dict:
+    return {name: deserialize(value) for name, value in item.items()}
+
+
+def serialize(value) -> dict:
+    """Converts a Python value into a DynamoDB attribute value"""
+    if isinstance(value, str):
+        return {"S": value}
+    if isinstance(value, bool):
+        return {"BOOL": value}
+    if isinstance(value, (int, float, Decimal)):
+        return {"N": str(value)}
+    if value is None:
+        return {"NULL": True}
+    if isinstance(value, dict):
+        return {"M": {name: serialize(item) for name, item in value.items()}}
+    if isinstance(value, (list, tuple)):
+        return {"L": [serialize(item) for item in value]}
+    if isinstance(value, (bytes, bytearray)):
+        return {"B": value}
+    if isinstance(value, (set, frozenset)) and value:
+        if all(isinstance(item, str) for item in value):
+            return {"SS": list(value)}
+        if all(isinstance(item, (bytes, bytearray)) for item in value):
+            return {"BS": list(value)}
+        return {"NS": [str(item) for item in value]}
+    raise TypeError(f"Can't serialize {type(value).__name__} to a DynamoDB attribute value")
+
+
+def serialize_item(item: dict) -> dict:
+    return {name: serialize(value) for name, value in item.items()}
+
+
+class LowLevelTable:
+    """Table-style API (get_item, put_item, update_item, delete_item, scan, query) on the low-level DynamoDB client
+
+    Skips the boto3 resource layer, values are (de)serialized with serialize/ deserialize: items are returned
+    JSON-ready (numbers as int/ float instead of Decimal).
+    Condition expressions can be strings or boto3.dynamodb.conditions objects, like with the Table resource.
+    """
+
+    _item_parameters = ("Key", "Item", "ExclusiveStartKey", "ExpressionAttributeValues")
+    _item_results = ("Item", "Attributes", "LastEvaluatedKey")
+    _condition_parameters = (("KeyConditionExpression", True), ("FilterExpression", False),
+                             ("ConditionExpression", False))
+
+    def __init__(self, client, name: str):
+        self.client = client
+        self.name = name
+
+    @property
+    def table_name(self) -> str:
+        return self.name
+
+    def _request(self, kwargs: dict) -> dict:
+        kwargs["TableName"] = self.name
+        builder = None
+        for parameter, is_key_condition in self._condition_parameters:
+            if parameter in kwargs and not isinstance(kwargs[parameter], str):
+                if builder is None:
+                    from boto3.dynamodb.conditions import ConditionExpressionBuilder
+                    builder = ConditionExpressionBuilder()
+                expression = builder.build_expression(kwargs[parameter], is_key_condition=is_key_condition)
+                kwargs[parameter] = expression.condition_expression
+                if expression.attribute_name_placeholders:
+                    kwargs["ExpressionAttributeNames"] = {
+                        **kwargs.get("ExpressionAttributeNames", {}), **expression.attribute_name_placeholders}
+                if expression.attribute_value_placeholders:
+                    kwargs["ExpressionAttributeValues"] = {
+                        **kwargs.get("ExpressionAttributeValues", {}), **expression.attribute_value_placeholders}
+        for parameter in self._item_parameters:
+            if parameter in kwargs:
+                kwargs[parameter] = serialize_item(kwargs[parameter])
+        return kwargs
+
+    def _response(self, response: dict) -> dict:
+        for name in self._item_results:
+            if name in response:
+                response[name] = deserialize_item(response[name])
+        if "Items" in response:
+            response["Items"] = [deserialize_item(item) for item in response["Items"]]
+        return response
+
+    def get_item(self, **kwargs):
+        return self._response(self.client.get_item(**self._request(kwargs)))
+
+    def put_item(self, **kwargs):
+        return self._response(self.client.put_item(**self._request(kwargs)))
+
+    def update_item(self, **kwargs):
+        return self._response(self.client.update_item(**self._request(kwargs)))
+
+    def delete_item(self, **kwargs):
+        return self._response(self.client.delete_item(**self._request(kwargs)))
+
+    def scan(self, **kwargs):
+        return self._response(self.client.scan(**self._request(kwargs)))
+
+    def query(self, **kwargs):
+        return self._response(self.client.query(**self._request(kwargs)))
+
+
+class TransactionCanceled(Exception):
+    """A write transaction was canceled, reasons holds the cancellation reason code per item ("None" if it was fine)"""
+
+    def __init__(self, reasons: List[str]):
+        super().__init__(reasons)
+        self.reasons = reasons
+
+    @property
+    def condition_failed(self) -> bool:
+        return "ConditionalCheckFailed" in self.reasons
+
+
+def transact_write_items(transact_items: List[dict]):
+    """TransactWriteItems with Table-style values (Key, Item, ExpressionAttributeValues are serialized)
+
+    transact_write_items([{"Put": {"TableName": table.name, "Item": {...}}}, {"Update": {...}}])
+    The call is deadline-aware and timed like the table calls, raises TransactionCanceled if the transaction was
+    canceled (e.g. a condition failed)
+    """
+    import botocore.exceptions
+    serialized = []
+    for transact_item in transact_items:
+        (operation, parameters), = transact_item.items()
+        parameters = dict(parameters)
+        for name in ("Key", "Item", "ExpressionAttributeValues"):
+            if name in parameters:
+                parameters[name] = serialize_item(parameters[name])
+        serialized.append({operation: parameters})
+    try:
+        return _call_wrapper(aws.get_client("dynamodb").transact_write_items)(TransactItems=serialized)
+    except botocore.exceptions.ClientError as e:
+        if e.response["Error"]["Code"] != "TransactionCanceledException":
+            raise
+        raise TransactionCanceled([reason.get("Code", "None")
+                                   for reason in e.response.get("CancellationReasons", [])]) from e
+
+
+def batch_get(table_name: str, keys: List[dict], projection: Optional[List[str]] = None,
+              max_workers: Optional[int] = None, max_attempts: int = 5,
+              **kwargs) -> Tuple[List[dict], List[dict]]:
+    """BatchGetItem with Table-style keys, returns the JSON-ready items found (in no particular order) and the keys
+    still unprocessed after max_attempts (e.g. throttled: the caller decides, like with batch_write's errors)
+
+    Keys are requested in chunks of 100 (the API's limit), the chunks run concurrently on a thread pool
+    (max_workers, default: the client's max_pool_connections) that shares the client. Unprocessed keys are retried
+    with jittered backoff. Each call is deadline-aware and timed like the table calls.
+    projection: the attributes to return (e.g. article summaries without "content"), kwargs are passed on per table
+    """
+    client = aws.get_client("dynamodb")
+    batch_get_item = _call_wrapper(client.batch_get_item)
+    if projection:
+        add_projection(kwargs, projection)
+
+    def get_chunk(chunk: List[dict]) -> Tuple[List[dict], List[dict]]:
+        items = []
+        request = {table_name: {"Keys": [serialize_item(key) for key in chunk], **kwargs}}
+        for attempt in range(max_attempts):
+            if attempt:
+                time.sleep(random.uniform(0, min(0.05 * 2 ** attempt, 1)))
+            response = batch_get_item(RequestItems=request)
+            items += [deserialize_item(item) for item in response["Responses"].get(table_name, [])]
+            request = response.get("UnprocessedKeys")
+            if not request:
+                return items, []
+        return items, [deserialize_item(key) for key in request[table_name]["Keys"]]
+
+    chunks = [keys[start:start + 100] for start in range(0, len(keys), 100)]
+    if len(chunks) <= 1:
+        return get_chunk(chunks[0]) if chunks else ([], [])
+    from concurrent.futures import ThreadPoolExecutor
+    workers = min(len(chunks), max_workers or aws.get_settings()["max_pool_connections"])
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="batch-get") as executor:
+        results = list(executor.map(get_chunk, chunks))
+    return [item for items, _ in results for item in items], [key for _, keys in results for key in keys]
+
+
+def batch_write(table_name: str, items: List[dict], max_workers: Optional[int] = None,
+                max_attempts: int = 5) -> List[Optional[str]]:
+    """BatchWriteItem puts of Table-style items, returns the error per item (None if the item was written)
+
+    Items are written in chunks of 25 (the API's limit) that run concurrently like batch_get's chunks, unprocessed
+    items are retried with jittered backoff. Puts are unconditional (upserts), a chunk must not hold the same key twice
+    """
+    import botocore.exceptions
+    client = aws.get_client("dynamodb")
+    batch_write_item = _call_wrapper(client.batch_write_item)
+
+    def write_chunk(chunk: List[dict]) -> List[Optional[str]]:
+        requests = [{"PutRequest": {"Item": serialize_item(item)}} for item in chunk]
+        pending = requests
+        try:
+            for attempt in range(max_attempts):
+                if attempt:
+                    time.sleep(random.uniform(0, min(0.05 * 2 ** attempt, 1)))
+                response = batch_write_item(RequestItems={table_name: pending})
+                pending = response.get("UnprocessedItems", {}).get(table_name, [])
+                if not pending:
+                    return [None] * len(chunk)
+        except botocore.exceptions.ClientError as e:
+            return [e.response["Error"].get("Message") or e.response["Error"]["Code"]] * len(chunk)
+        return [f"Unprocessed after {max_attempts} attempts" if request in pending else None for request in requests]
+
+    chunks = [items[start:start + 25] for start in range(0, len(items), 25)]
+    if len(chunks) <= 1:
+        return write_chunk(chunks[0]) if chunks else []
+    from concurrent.futures import ThreadPoolExecutor
+    workers = min(len(chunks), max_workers or aws.get_settings()["max_pool_connections"])
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="batch-write") as executor:
+        return [error for errors in executor.map(write_chunk, chunks) for error in errors]
+
+
+def _get_table(name: str, low_level: bool):
+    if low_level:
+        client = aws.get_client("dynamodb")
+        table = LowLevelTable(client, name)
+    else:
+        table = aws.get_resource("dynamodb").Table(name)
+        client = table.meta.client
+    # warm-up opens the client's connection (DescribeTable is part of the table's read/ write grants)
+    warm_up.register(f"dynamodb {name}{' low-level' if low_level else ''}",
+                     functools.partial(client.describe_table, TableName=name))
+    return wrap_boto3_dynamodb_table(table)
+
+
+def get_article_table(low_level: bool = False):
+    """Returns the (wrapped) article table, low_level=True: LowLevelTable instead of the boto3 Table resource"""
+    return _get_table(os.environ.get("ArticleTableName"), low_level)
+
+
+def get_comment_table(low_level: bool = False):
+    """Returns the (wrapped) comment table, low_level=True: LowLevelTable instead of the boto3 Table resource"""
+    return _get_table(os.environ.get("CommentTableName"), low_level)
 
 
-def get_comment_table():
-    name = os.environ.get("CommentTableName")
-    return wrap_boto3_dynamodb_table(boto3.resource("dynamodb").Table(name))
+def get_catalog_table(low_level: bool = False):
+    """Returns the (wrapped) catalog table (materialized read models, e.g. the tag catalog)"""
+    return _get_table(os.environ.get("CatalogTableName"), low_level)
@@ -0,0 +1,215 @@
+"""Request validators compiled from the api spec
+
+The request schemas are extracted from swagger/api_spec.yaml by tools/compile_validators.py (build step) into
+request_schemas.json. A validator is built per route (e.g. "POST /article") on first use and then cached.
+The body size limit of the route is checked by the middleware decorator before anything parses the body (see
+check_body_size). Validators support the subset of JSON schema used by the spec.
+"""
+
+import functools
+import json
+import os
+from typing import Any, Callable, List, Optional
+
+SCHEMAS_PATH = os.path.join(os.path.dirname(__file__), "request_schemas.json")
+
+_missing = object()
+
+_types = {
+    "string": (str,),
+    "integer": (int,),
+    "number": (int, float),
+    "boolean": (bool,),
+    "object": (dict,),
+    "array": (list,),
+}
+
+
+class RequestValidationError(Exception):
+
+    def __init__(self, status_code: int, errors: List[str]):
+        super().__init__(errors)
+        self.status_code = status_code
+        self.errors = errors
+
+
+@functools.lru_cache(maxsize=None)
+def load_routes() -> dict:
+    try:
+        with open(SCHEMAS_PATH) as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {}
+
+
+@functools.lru_cache(maxsize=None)
+def get_validator(route: str) -> Optional[Callable]:
+    """Returns the validator of the route (None if the spec doesn't contain the route)
+
+    The validator takes an Event and raises a RequestValidationError if the request is invalid
+    """
+    schema = load_routes().get(route)
+    if schema is None:
+        return None
+    return compile_route(schema)
+
+
+@functools.lru_cache(maxsize=None)
+def get_max_body_size(route: str) -> Optional[int]:
+    """Returns the body size limit of the route in bytes (None if the spec doesn't contain the route or a limit)"""
+    return load_routes().get(route, {}).get("maxBodySize")
+
+
+def check_body_size(event):
+    """Raises a RequestValidationError (413) if the (decoded) body of the Event exceeds the route's limit"""
+    max_body_size = get_max_body_size(f"{event.method} {event.ressource}")
+    if max_body_size is not None and event.body_size > max_body_size:
+        raise RequestValidationError(413, [f"Request body too large (max. {max_body_size} bytes)"])
+
+
+# path/ query parameters are strings, they are converted before validating numeric schemas
+_parameter_types = {"integer": int, "number": float}
+
+
+def compile_route(route: dict) -> Callable:
+    parameters = [
+        (location, name, parameter["required"], parameter["schema"].get("type"),
+         _parameter_types.get(parameter["schema"].get("type")), compile_schema(parameter["schema"], name))
+        for location, location_parameters in route.get("parameters", {}).items()
+        for name, parameter in location_parameters.items()
+    ]
+    body_validator = compile_schema(route["body"], "body") if "body" in route else None
+    body_required = route.get("bodyRequired", False)
+
+    def validator(event):
+        errors = []
+        for location, name, required, type_name, type_, validate in parameters:
+            values = event.path_parameters if location == "path" else event.query_string_parameters
+            if name in values and values[name] is not None:
+                value = values[name]
+                if type_ is not None:
+                    try:
+                        value = type_(value)
+                    except ValueError:
+                        errors.append(f"{name}: expected {type_name}")
+                        continue
+                validate(value, errors)
+            elif required:
+                errors.append(f"{name}: required {location} parameter missing")
+        if body_validator is not None:
+            body = event.body
+            if body is None:
+                if event.raw_body:
+                    errors.append("body: malformed JSON")
+                elif body_required:
+                    errors.append("body: required")
+            else:
+                body_validator(body, errors)
+        if errors:
+            raise RequestValidationError(400, errors)
+
+    return validator
+
+
+def compile_schema(schema: dict, path: str) -> Callable[[Any, List[str]], bool]:
+    """Compiles the schema into a function that appends errors to the given list (returns False if there were any)
+
+    The function's source is generated from the schema (no schema interpretation at validation time).
+    If the type check of a value fails, no further checks are run for that value
+    """
+    generator = _Generator()
+    generator.emit(schema, "value", path, 1)
+    source = "\n".join(["def validate(value, errors):", "    valid = True", *generator.lines, "    return valid"])
+    namespace = {"_missing": _missing, **generator.constants}
+    exec(compile(source, f"<validator {path}>", "exec"), namespace)
+    return namespace["validate"]
+
+
+class _Generator:
+
+    _limits = (
+        ("minLength", "len({}) < {}", "min. length"),
+        ("maxLength", "len({}) > {}", "max. length"),
+        ("minItems", "len({}) < {}", "min. items"),
+        ("maxItems", "len({}) > {}", "max. items"),
+        ("minimum", "{} < {}", "minimum"),
+        ("maximum", "{} > {}", "maximum"),
+    )
+
+    def __init__(self):
+        self.lines = []
+        self.constants = {}
+        self._counter = 0
+
+    def emit(self, schema: dict, var: str, path: str, indent: int):
+        if "type" in schema:
+            types = self.constant(_types[schema["type"]])
+            condition = f"not isinstance({var}, {types})"
+            if schema["type"] in ("integer", "number"):
+                condition += f" or type({var}) is bool"
+            self.line(indent, f"if {condition}:")
+            self.error(indent + 1, path, f"expected {schema['type']}")
+            self.line(indent, "else:")
+            indent += 1
+        start = len(self.lines)
+
+        if "enum" in schema:
+            self.line(indent, f"if {var} not in {self.constant(schema['enum'])}:")
+            self.error(indent + 1, path, f"must be one of {schema['enum']}")
+
+        for keyword, condition, message in self._limits:
+            if keyword in schema:
+                self.line(indent, f"if {condition.format(var, repr(schema[keyword]))}:")
+                self.error(indent + 1, path, f"{message} {schema[keyword]}")
+
+        for name in schema.get("required", []):
+            self.line(indent, f"if {name!r} not in {var}:")
+            self.error(indent + 1, f"{path}.{name}", "required")
+
+        for name, sub_schema in schema.get("properties", {}).items():
+            sub_var = self.variable()
+            self.line(indent, f"{sub_var} = {var}.get({name!r}, _missing)")
+            self.line(indent, f"if {sub_var} is not _missing:")
+            self.emit_block(sub_schema, sub_var, f"{path}.{name}", indent + 1)
+
+        additional = schema.get("additionalProperties")
+        if isinstance(additional, dict) or additional is False:
+            known = self.constant(frozenset(schema.get("properties", {})))
+            key_var, sub_var = self.variable(), self.variable()
+            self.line(indent, f"for {key_var}, {sub_var} in {var}.items():")
+            self.line(indent + 1, f"if {key_var} not in {known}:")
+            if additional is False:
+                self.line(indent + 2, f"errors.append({path!r} + '.' + {key_var} + ': not allowed')")
+                self.line(indent + 2, "valid = False")
+            else:
+                self.emit_block(additional, sub_var, f"{path}.*", indent + 2)
+
+        if "items" in schema:
+            sub_var = self.variable()
+            self.line(indent, f"for {sub_var} in {var}:")
+            self.emit_block(schema["items"], sub_var, f"{path}[]", indent + 1)
+
+        if len(self.lines) == start:
+            self.line(indent, "pass")
+
+    def emit_block(self, schema: dict, var: str, path: str, indent: int):
+        start = len(self.lines)
+        self.emit(schema, var, path, indent)
+        if len(self.lines) == start:
+            self.line(indent, "pass")
+
+    def line(self, indent: int, code: str):
+        self.lines.append("    " * indent + code)
+
+    def error(self, indent: int, path: str, message: str):
+        self.line(indent, f"errors.append({path + ': ' + message!r})")
+        self.line(indent, "valid = False")
+
+    def variable(self) -> str:
+        self._counter += 1
+        return f"v{self._counter}"
+
+    def constant(self, value) -> str:
+        name = f"_c{len(self.constants)}"
+        self.constants[name] = value
+        return name
@@ -0,0 +1,82 @@
+"""Warm-up (pre-warming) invocations
+
+A scheduled rule (see stacks/constructs/api.py) invokes the functions with
+
+    {"warmUp": {"concurrency": 3}}
+
+The middleware decorator answers it without calling the handler (no application logic runs) and without recording
+metrics: the init work already ran on import (handler modules, table handles, secret prefetch), the registered hooks
+do the rest (e.g. refreshing the admin key, opening the DynamoDB connections). With a concurrency n > 1 the function
+invokes itself n - 1 times concurrently, each invocation holds its container for "hold" ms, so that n containers
+are warm.
+"""
+
+import logging
+import time
+from typing import Callable, Dict
+from . import codec, metrics
+
+EVENT_KEY = "warmUp"
+MAX_CONCURRENCY = 20
+DEFAULT_HOLD = 100  # ms
+
+_hooks: Dict[str, Callable[[], None]] = {}
+_lambda_client = None
+
+
+def register(name: str, hook: Callable[[], None]):
+    """Registers init work that runs on every warm-up (once per name)"""
+    _hooks.setdefault(name, hook)
+
+
+def is_warm_up(event) -> bool:
+    return isinstance(event, dict) and EVENT_KEY in event
+
+
+def handle(event: dict, context) -> dict:
+    """Runs the hooks and the fan-out, returns {"warmUp": {"coldStart": bool, "containers": warm containers}}"""
+    options = event[EVENT_KEY] if isinstance(event[EVENT_KEY], dict) else {}
+    cold_start = metrics.skip()
+    start = time.monotonic()
+    for name, hook in list(_hooks.items()):
+        try:
+            hook()
+        except Exception:
+            logging.warning("Warm-up hook '%s' failed", name, exc_info=True)
+    concurrency = max(1, min(int(options.get("concurrency", 1)), MAX_CONCURRENCY))
+    hold = float(options.get("hold", DEFAULT_HOLD)) / 1000
+    containers = 1
+    if concurrency > 1 and context is not None:
+        containers += fan_out(context.invoked_function_arn, concurrency - 1, hold)
+    time.sleep(max(0.0, hold - (time.monotonic() - start)))
+    return {EVENT_KEY: {"coldStart": cold_start, "containers": containers}}
+
+
+def fan_out(function_arn: str, n: int, hold: float) -> int:
+    """Invokes the function n times concurrently (warm-up events), returns the number of successful invocations"""
+    from concurrent.futures import ThreadPoolExecutor
+    client = _get_lambda_client(n)
+    payload = codec.dumps({EVENT_KEY: {"concurrency": 1, "hold": hold * 1000}}).encode()
+
+    def invoke(_) -> bool:
+        try:
+            response = client.invoke(FunctionName=function_arn, Payload=payload)
+        except Exception:
+            logging.warning("Warm-up invocation failed", exc_info=True)
+            return False
+        return "FunctionError" not in response
+
+    with ThreadPoolExecutor(max_workers=n, thread_name_prefix="warm-up") as executor:
+        return sum(executor.map(invoke, range(n)))
+
+
+def _get_lambda_client(max_pool_connections: int):
+    """Lambda client for the fan-out: cold invocations take longer than the default read timeout, no retries"""
+    global _lambda_client
+    if _lambda_client is None:
+        import botocore.config
+        from . import aws
+        _lambda_client = aws.get_session().client("lambda", config=botocore.config.Config(
+            connect_timeout=1, read_timeout=30, retries={"max_attempts": 1},
+            max_pool_connections=max(MAX_CONCURRENCY, max_pool_connections)))
+    return _lambda_client
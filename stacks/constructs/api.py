@@ -1,11 +1,18 @@
 import aws_cdk.core
 import aws_cdk.aws_apigateway as apigw
 import aws_cdk.aws_lambda as lambda_
+import aws_cdk.aws_lambda_event_sources as lambda_event_sources
+import aws_cdk.aws_sqs as sqs
 import aws_cdk.aws_dynamodb as dynamodb
+import aws_cdk.aws_events as events
+import aws_cdk.aws_events_targets as events_targets
+import aws_cdk.aws_iam as iam
 import aws_cdk.aws_secretsmanager as sm
 import aws_cdk.aws_logs as logs
 from .. import Environment
 from stacks.stack_utils import to_camel_case
+from backend.middleware.aws import API_FUNCTION_TIMEOUT
+from typing import Optional
 
 
 class Api(aws_cdk.core.Construct):
@@ -13,7 +20,20 @@ class Api(aws_cdk.core.Construct):
     def __init__(
             self, scope: aws_cdk.core.Construct,
             construct_id: str,
-            environment: object = Environment.PRODUCTION):
+            environment: object = Environment.PRODUCTION,
+            article_collection_legacy_scan: bool = False,
+            single_function: bool = False,
+            warm_up_schedule: Optional[aws_cdk.core.Duration] = None,
+            warm_up_concurrency: int = 1):
+        """article_collection_legacy_scan: GET /article scans the table (unpaginated) instead of querying the
+        publishedIndex, keep it enabled until existing articles are backfilled (tools/backfill_published_index.py)
+        single_function: serve all routes from one function (backend/lambda_functions/router) instead of a function
+        per route - one pool of warm containers for all traffic; the function has the permissions, environment and
+        the largest timeout/ memory size of all routes
+        warm_up_schedule: invoke every API function with a warm-up event at this rate (e.g. 5 minutes), keeping
+        warm_up_concurrency containers per function warm (backend/middleware/warm_up.py: the handlers aren't called,
+        the invocations aren't recorded in the metrics)
+        """
         super().__init__(scope, construct_id)
 
         # Integration dependencies
@@ -24,6 +44,17 @@ class Api(aws_cdk.core.Construct):
 
         self.table_article_name = construct_id + "Article"
         self.table_comment_name = construct_id + "Comment"
+        self.table_catalog_name = construct_id + "Catalog"
+        self.aws_config_profile = "production" if environment is Environment.PRODUCTION else "testing"
+        self.lambda_environment = {
+            "ArticleTableName": self.table_article_name,
+            "CommentTableName": self.table_comment_name,
+            "CatalogTableName": self.table_catalog_name,
+            "AwsConfigProfile": self.aws_config_profile,
+            # in-process read cache (backend/middleware/cache.py): staleness window in seconds,
+            # disabled for testing (the functional tests read their writes immediately)
+            "CacheTtl": "10" if environment is Environment.PRODUCTION else "0"
+        }
 
         self.lambda_layers = [
             lambda_.LayerVersion(
@@ -40,6 +71,20 @@ class Api(aws_cdk.core.Construct):
             )
         ]
 
+        self.api_functions = []  # (shared in single function mode)
+        self.router_function = lambda_.Function(
+            self,
+            "RouterFn",
+            runtime=lambda_.Runtime.PYTHON_3_8,
+            handler="router.lambda_function.handler",
+            code=lambda_.Code.from_asset("backend/lambda_functions", exclude=["projection_worker", "**/__pycache__"]),
+            environment=dict(self.lambda_environment),
+            timeout=aws_cdk.core.Duration.seconds(29),  # API Gateway's integration timeout (article_import)
+            memory_size=1024,
+            log_retention=logs.RetentionDays.FIVE_DAYS,
+            layers=self.lambda_layers
+        ) if single_function else None
+
         self.secret_admin_key = sm.Secret.from_secret_arn(  # read access granted in integration construct
             self,
             "blog-backend-admin-key",
@@ -54,6 +99,7 @@ class Api(aws_cdk.core.Construct):
             table_name=self.table_article_name,
             partition_key=dynamodb.Attribute(name="urlTitle", type=dynamodb.AttributeType.STRING),
             billing_mode=dynamodb.BillingMode.PAY_PER_REQUEST,
+            stream=dynamodb.StreamViewType.KEYS_ONLY,  # projection worker
             removal_policy=aws_cdk.core.RemovalPolicy.RETAIN if environment is Environment.PRODUCTION
             else aws_cdk.core.RemovalPolicy.DESTROY,
             point_in_time_recovery=environment is Environment.PRODUCTION
@@ -67,6 +113,15 @@ class Api(aws_cdk.core.Construct):
             non_key_attributes=["urlTitle", "title", "description"]
         )
 
+        # all articles, newest first (GET /article); every article has collection="article"
+        table_article.add_global_secondary_index(
+            index_name="publishedIndex",
+            partition_key=dynamodb.Attribute(name="collection", type=dynamodb.AttributeType.STRING),
+            sort_key=dynamodb.Attribute(name="published", type=dynamodb.AttributeType.STRING),
+            projection_type=dynamodb.ProjectionType.INCLUDE,
+            non_key_attributes=["urlTitle", "title", "description", "tag"]
+        )
+
         table_comment = dynamodb.Table(
             self,
             "CommentTable",
@@ -74,10 +129,58 @@ class Api(aws_cdk.core.Construct):
             partition_key=dynamodb.Attribute(name="articleUrlTitle", type=dynamodb.AttributeType.STRING),
             sort_key=dynamodb.Attribute(name="id", type=dynamodb.AttributeType.STRING),
             billing_mode=dynamodb.BillingMode.PAY_PER_REQUEST,
+            stream=dynamodb.StreamViewType.KEYS_ONLY,  # projection worker
             removal_policy=aws_cdk.core.RemovalPolicy.RETAIN if environment is Environment.PRODUCTION
             else aws_cdk.core.RemovalPolicy.DESTROY,
         )
 
+        # materialized read models (e.g. the tag catalog: catalog="tag", name=<tag>)
+        table_catalog = dynamodb.Table(
+            self,
+            "CatalogTable",
+            table_name=self.table_catalog_name,
+            partition_key=dynamodb.Attribute(name="catalog", type=dynamodb.AttributeType.STRING),
+            sort_key=dynamodb.Attribute(name="name", type=dynamodb.AttributeType.STRING),
+            billing_mode=dynamodb.BillingMode.PAY_PER_REQUEST,
+            removal_policy=aws_cdk.core.RemovalPolicy.RETAIN if environment is Environment.PRODUCTION
+            else aws_cdk.core.RemovalPolicy.DESTROY,
+        )
+
+        # Projection worker
+        # maintains derived read models (catalog table) from the article and comment table streams
+
+        projection_worker_dlq = sqs.Queue(
+            self,
+            "ProjectionWorkerDLQ",
+            retention_period=aws_cdk.core.Duration.days(14)
+        )
+
+        projection_worker = lambda_.Function(
+            self,
+            "ProjectionWorkerFn",
+            runtime=lambda_.Runtime.PYTHON_3_8,
+            handler="lambda_function.handler",
+            code=lambda_.Code.from_asset("backend/lambda_functions/projection_worker"),
+            environment=self.lambda_environment,
+            memory_size=256,
+            timeout=aws_cdk.core.Duration.seconds(60),
+            log_retention=logs.RetentionDays.FIVE_DAYS,
+            layers=self.lambda_layers
+        )
+        table_catalog.grant_read_write_data(projection_worker)
+        for table in (table_article, table_comment):
+            table.grant_read_data(projection_worker)
+            projection_worker.add_event_source(lambda_event_sources.DynamoEventSource(
+                table,
+                starting_position=lambda_.StartingPosition.TRIM_HORIZON,
+                batch_size=100,
+                max_batching_window=aws_cdk.core.Duration.seconds(5),
+                bisect_batch_on_error=True,
+                report_batch_item_failures=True,  # checkpoint up to the first failed record
+                retry_attempts=5,
+                on_failure=lambda_event_sources.SqsDlq(projection_worker_dlq)
+            ))
+
         # RestApi
 
         self.instance = apigw.RestApi(
@@ -93,6 +196,9 @@ class Api(aws_cdk.core.Construct):
                 throttling_burst_limit=64,  # concurrent
             ),
             endpoint_configuration=apigw.EndpointConfiguration(types=[apigw.EndpointType.REGIONAL]),
+            # compressed (base64 encoded) Lambda responses are passed on as binary
+            # (request bodies are base64 encoded as well, the middleware decodes them)
+            binary_media_types=["*/*"],
         )
 
         # Endpoints
@@ -102,14 +208,33 @@ class Api(aws_cdk.core.Construct):
         # /article
         resource_article_collection = self.instance.root.add_resource(path_part="article")
 
-        integration_article_get_collection = APIIntegration(self, "article_get_collection")
+        integration_article_get_collection = APIIntegration(
+            self,
+            "article_get_collection",
+            environment={"ArticleCollectionLegacyScan": str(article_collection_legacy_scan).lower()}
+        )
         table_article.grant_read_data(integration_article_get_collection.lambda_function)
+        table_catalog.grant_read_data(integration_article_get_collection.lambda_function)
         resource_article_collection.add_method("GET", integration=integration_article_get_collection)
 
         integration_article_create = APIIntegration(self, "article_create")
         table_article.grant_read_write_data(integration_article_create.lambda_function)
+        table_catalog.grant_read_write_data(integration_article_create.lambda_function)
         resource_article_collection.add_method("POST", integration=integration_article_create)
 
+        # /article-import
+        resource_article_import = self.instance.root.add_resource(path_part="article-import")
+
+        integration_article_import = APIIntegration(
+            self,
+            "article_import",
+            timeout=aws_cdk.core.Duration.seconds(29),  # API Gateway's integration timeout
+            memory_size=1024
+        )
+        table_article.grant_read_write_data(integration_article_import.lambda_function)
+        table_catalog.grant_read_write_data(integration_article_import.lambda_function)
+        resource_article_import.add_method("POST", integration=integration_article_import)
+
         # /article/{}
         resource_article = resource_article_collection.add_resource(path_part="{articleUrlTitle}")
 
@@ -119,10 +244,12 @@ class Api(aws_cdk.core.Construct):
 
         integration_article_update = APIIntegration(self, "article_update")
         table_article.grant_read_write_data(integration_article_update.lambda_function)
+        table_catalog.grant_read_write_data(integration_article_update.lambda_function)
         resource_article.add_method("PATCH", integration=integration_article_update)
 
         integration_article_delete = APIIntegration(self, "article_delete")
         table_article.grant_read_write_data(integration_article_delete.lambda_function)
+        table_catalog.grant_read_write_data(integration_article_delete.lambda_function)
         resource_article.add_method("DELETE", integration=integration_article_delete)
 
         # /article/{}/comments
@@ -161,7 +288,7 @@ class Api(aws_cdk.core.Construct):
         resource_tag_collection = self.instance.root.add_resource(path_part="tag")
 
         integration_tag_get_collection = APIIntegration(self, "tag_get_collection")
-        table_article.grant_read_data(integration_tag_get_collection.lambda_function)
+        table_catalog.grant_read_data(integration_tag_get_collection.lambda_function)
         resource_tag_collection.add_method("GET", integration=integration_tag_get_collection)
 
         # /tag/{}
@@ -177,24 +304,60 @@ class Api(aws_cdk.core.Construct):
         integration_admin_login = APIIntegration(self, "admin_login")
         resource_admin_login.add_method("POST", integration=integration_admin_login)
 
+        # CORS preflight: with the binary media type "*/*" the MOCK integrations would get the request as binary,
+        # their request template (the status code) wouldn't apply and the preflight failed with 500
+        for method in self.instance.methods:
+            if method.http_method == "OPTIONS":
+                method.node.default_child.add_property_override("Integration.ContentHandling", "CONVERT_TO_TEXT")
+
+        # Pre-warming
+
+        if warm_up_schedule is not None:
+            for function in self.api_functions:
+                events.Rule(
+                    function,
+                    "WarmUpRule",
+                    schedule=events.Schedule.rate(warm_up_schedule),
+                    targets=[events_targets.LambdaFunction(
+                        function,
+                        event=events.RuleTargetInput.from_object({"warmUp": {"concurrency": warm_up_concurrency}})
+                    )]
+                )
+                if warm_up_concurrency > 1:  # fan-out: the function invokes itself
+                    # (separate policy, the function depends on its role's default policy)
+                    iam.Policy(
+                        function,
+                        "WarmUpPolicy",
+                        statements=[iam.PolicyStatement(actions=["lambda:InvokeFunction"],
+                                                        resources=[function.function_arn])],
+                        roles=[function.role]
+                    )
+
 
 class APIIntegration(apigw.LambdaIntegration):
 
-    def __init__(self, scope: Api, name: str):
-        self.lambda_function = lambda_.Function(
-            scope,
-            f"{to_camel_case(name)}Fn",
-            runtime=lambda_.Runtime.PYTHON_3_8,
-            handler=f"lambda_function.handler",
-            code=lambda_.Code.from_asset(f"backend/lambda_functions/{name}"),
-            environment={
-                "ArticleTableName": scope.table_article_name,
-                "CommentTableName": scope.table_comment_name
-            },
-            memory_size=256,
-            log_retention=logs.RetentionDays.FIVE_DAYS,
-            layers=scope.lambda_layers
-        )
+    def __init__(self, scope: Api, name: str, environment: Optional[dict] = None,
+                 timeout: Optional[aws_cdk.core.Duration] = None, memory_size: int = 256):
+        if scope.router_function is not None:  # single function mode: the routes share the router function
+            self.lambda_function = scope.router_function
+            for key, value in (environment or {}).items():
+                self.lambda_function.add_environment(key, value)
+        else:
+            self.lambda_function = lambda_.Function(
+                scope,
+                f"{to_camel_case(name)}Fn",
+                runtime=lambda_.Runtime.PYTHON_3_8,
+                handler=f"lambda_function.handler",
+                code=lambda_.Code.from_asset(f"backend/lambda_functions/{name}"),
+                environment={**scope.lambda_environment, **(environment or {})},
+                # the DynamoDB calls' deadline reserve (backend/middleware/aws.py) is sized for this timeout
+                timeout=timeout or aws_cdk.core.Duration.seconds(API_FUNCTION_TIMEOUT),
+                memory_size=memory_size,
+                log_retention=logs.RetentionDays.FIVE_DAYS,
+                layers=scope.lambda_layers
+            )
+        if self.lambda_function not in scope.api_functions:
+            scope.api_functions.append(self.lambda_function)
         super().__init__(
             handler=self.lambda_function
         )
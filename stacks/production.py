@@ -15,7 +15,13 @@ class Production(core.Stack):
         core.Tags.of(self).add("Project", "JuliusKrahnBlogBackend")
         core.Tags.of(self).add("Environment", "Production")
 
-        api = Api(self, f"{construct_id}Api", environment=Environment.PRODUCTION)
+        api = Api(
+            self,
+            f"{construct_id}Api",
+            environment=Environment.PRODUCTION,
+            article_collection_legacy_scan=True,  # until tools/backfill_published_index.py has been run
+            warm_up_schedule=core.Duration.minutes(5)
+        )
 
         api_domain_name = apigw.DomainName(
             self,
@@ -13,6 +13,12 @@ class Testing(core.Stack):
         core.Tags.of(self).add("Project", "JuliusKrahnBlogBackend")
         core.Tags.of(self).add("Environment", "Testing")
 
-        api = Api(self, f"{construct_id}Api", environment=Environment.TESTING)
+        api = Api(
+            self,
+            f"{construct_id}Api",
+            environment=Environment.TESTING,
+            # tools/deploy_testing.sh -c singleFunction=true
+            single_function=self.node.try_get_context("singleFunction") == "true"
+        )
 
         core.CfnOutput(self, "ApiIEndpoint", value=api.instance.url)  # I -> Instance
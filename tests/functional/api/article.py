@@ -82,6 +82,12 @@ class TestArticle(unittest.TestCase):
                                                              data=json.dumps({"key": "test"}))
         self.assertEqual(401, delete_article_with_wrong_key_resp.status_code)
 
+    def test_create_existing_article(self):
+        article = {**generate_article_data(), "key": get_admin_key()}
+        self.assertEqual(201, requests.post(base_url + "/article", data=json.dumps(article)).status_code)
+        self.assertEqual(409, requests.post(base_url + "/article", data=json.dumps(article)).status_code)
+        requests.delete(base_url + "/article/" + article["urlTitle"], data=json.dumps({"key": get_admin_key()}))
+
     def test_delete_non_existing_article(self):
         delete_article_resp = requests.delete(base_url + "/article/" + uuid4().hex,
                                               data=json.dumps({"key": get_admin_key()}))
@@ -93,3 +99,42 @@ class TestArticle(unittest.TestCase):
             "key": get_admin_key()
         }))
         self.assertEqual(404, update_article_resp.status_code)
+
+    def test_import(self):
+        articles = [generate_article_data() for _ in range(3)]
+        articles[1]["published"] = "2020-01-01"
+        invalid = {"urlTitle": uuid4().hex, "title": 1}
+        resp = requests.post(base_url + "/article-import", data=json.dumps({
+            "articles": [*articles, invalid, articles[0]],
+            "key": get_admin_key()
+        }))
+        self.assertEqual(200, resp.status_code)
+        self.assertEqual([201, 201, 201, 400, 409], [result["status"] for result in resp.json()["results"]])
+        self.assertEqual("2020-01-01",
+                         requests.get(base_url + "/article/" + articles[1]["urlTitle"]).json()["article"]["published"])
+
+        # NDJSON, overwrites
+        articles[0]["title"] = "Imported again"
+        lines = [json.dumps({"key": get_admin_key()}), *map(json.dumps, articles), "{not json"]
+        resp = requests.post(base_url + "/article-import", data="\n".join(lines),
+                             headers={"Content-Type": "application/x-ndjson"})
+        self.assertEqual(200, resp.status_code)
+        self.assertEqual([200, 200, 200, 400], [result["status"] for result in resp.json()["results"]])
+        self.assertEqual("Imported again",
+                         requests.get(base_url + "/article/" + articles[0]["urlTitle"]).json()["article"]["title"])
+
+        self.assertEqual(401, requests.post(base_url + "/article-import", data=json.dumps({
+            "articles": articles, "key": "test"})).status_code)
+        for article in articles:
+            requests.delete(base_url + "/article/" + article["urlTitle"], data=json.dumps({"key": get_admin_key()}))
+
+    def test_fields(self):
+        article = {**generate_article_data(), "key": get_admin_key()}
+        requests.post(base_url + "/article", data=json.dumps(article))
+        resp = requests.get(base_url + "/article/" + article["urlTitle"], params={"fields": "title,description"})
+        self.assertEqual(200, resp.status_code)
+        self.assertEqual({"urlTitle": article["urlTitle"], "title": article["title"],
+                          "description": article["description"]}, resp.json()["article"])
+        resp = requests.get(base_url + "/article/" + article["urlTitle"], params={"fields": "title,collection"})
+        self.assertEqual(400, resp.status_code)
+        requests.delete(base_url + "/article/" + article["urlTitle"], data=json.dumps({"key": get_admin_key()}))
@@ -1,4 +1,6 @@
 import unittest
+import base64
+import json
 from tests.functional.api.testing_utils import base_url, create_articles, delete_articles
 import requests
 
@@ -6,8 +8,14 @@ import requests
 class TestArticleCollection(unittest.TestCase):
 
     def test(self):
-        resp = requests.get(base_url+"/article")
-        resp_articles = resp.json()["articles"]
+        resp_articles = []
+        params = {}
+        while True:
+            resp = requests.get(base_url+"/article", params=params)
+            resp_articles += resp.json()["articles"]
+            if "cursor" not in resp.json():
+                break
+            params = {"cursor": resp.json()["cursor"]}
         self.assertTrue(self.articles)
         for article in resp_articles:
             i = 0
@@ -17,6 +25,35 @@ class TestArticleCollection(unittest.TestCase):
                     break
                 i += 1
         self.assertFalse(self.articles)
+        published = [article["published"] for article in resp_articles]
+        self.assertEqual(published, sorted(published, reverse=True))
+
+    def test_pagination(self):
+        resp = requests.get(base_url+"/article", params={"limit": 2})
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual(len(resp.json()["articles"]), 2)
+        next_resp = requests.get(base_url+"/article", params={"limit": 2, "cursor": resp.json()["cursor"]})
+        self.assertEqual(next_resp.status_code, 200)
+        self.assertNotIn(resp.json()["articles"][1]["urlTitle"],
+                         [article["urlTitle"] for article in next_resp.json()["articles"]])
+        self.assertEqual(requests.get(base_url+"/article", params={"limit": 0}).status_code, 400)
+        self.assertEqual(requests.get(base_url+"/article", params={"cursor": "invalid"}).status_code, 400)
+        forged = base64.urlsafe_b64encode(json.dumps({"collection": "article", "tag": "news"}).encode()).decode()
+        self.assertEqual(requests.get(base_url+"/article", params={"cursor": forged}).status_code, 400)
+
+    def test_batch(self):
+        url_titles = [article["urlTitle"] for article in self.articles][::-1]
+        resp = requests.get(base_url+"/article", params={"urlTitles": ",".join(url_titles + ["does-not-exist"])})
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual([article["urlTitle"] for article in resp.json()["articles"]], url_titles)
+        self.assertNotIn("content", resp.json()["articles"][0])
+        self.assertEqual(resp.json()["missing"], ["does-not-exist"])
+        resp = requests.get(base_url+"/article", params={"urlTitles": url_titles[0], "view": "full"})
+        self.assertEqual(resp.status_code, 200)
+        self.assertIn("content", resp.json()["articles"][0])
+        self.assertNotIn("missing", resp.json())
+        too_many = ",".join(f"article-{i}" for i in range(101))
+        self.assertEqual(requests.get(base_url+"/article", params={"urlTitles": too_many}).status_code, 400)
 
     def setUp(self):
         self.articles = create_articles()
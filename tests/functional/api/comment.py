@@ -78,6 +78,42 @@ class TestComment(unittest.TestCase):
             if comment["id"] == comment_id and resp_id in comment["resps"]:
                 self.fail("Deleted resp returned")
 
+    def test_pagination(self):
+        comment_ids = [self.create_comment().json()["id"] for _ in range(3)]
+        for content in ("first", "second", "third"):
+            requests.post(
+                f"{base_url}/article/{self.article['urlTitle']}/comments/{urllib.parse.quote(comment_ids[1])}/resps",
+                data=json.dumps({"author": "responding-test-user", "content": content}))
+        url = f"{base_url}/article/{self.article['urlTitle']}/comments"
+
+        for order, expected_ids in (("oldest", comment_ids), ("newest", comment_ids[::-1])):
+            for limit in (1, 2, 3):
+                pages = []
+                params = {"limit": limit, "order": order}
+                while True:
+                    resp = requests.get(url, params=params)
+                    self.assertEqual(200, resp.status_code)
+                    pages.append(resp.json()["comments"])
+                    if "cursor" not in resp.json():
+                        break
+                    params = {"limit": limit, "order": order, "cursor": resp.json()["cursor"]}
+                for page in pages:
+                    self.assertLessEqual(len(page), limit)
+                comments = [comment for page in pages for comment in page]
+                self.assertEqual(expected_ids, [comment["id"] for comment in comments])
+                # a page holds whole threads: the comment with all its resps
+                self.assertEqual([0, 3, 0], [len(comments[expected_ids.index(id_)]["resps"]) for id_ in comment_ids])
+
+        resp = requests.get(url, params={"respLimit": 1})
+        self.assertEqual(200, resp.status_code)
+        comment = next(comment for comment in resp.json()["comments"] if comment["id"] == comment_ids[1])
+        self.assertEqual(["first"], [reply["content"] for reply in comment["resps"].values()])
+        self.assertTrue(comment["respsTruncated"])
+
+        self.assertEqual(400, requests.get(url, params={"limit": 0}).status_code)
+        self.assertEqual(400, requests.get(url, params={"order": "random"}).status_code)
+        self.assertEqual(400, requests.get(url, params={"cursor": "invalid"}).status_code)
+
     def create_comment(self):
         return requests.post(f"{base_url}/article/{self.article['urlTitle']}/comments", data=json.dumps({
             "author": "test-user",
@@ -23,6 +23,8 @@ class TestTag(unittest.TestCase):
         resp = requests.get(base_url + "/tag/")
         resp_tags = resp.json()["tags"]
         self.assertIn(self.tag, resp_tags)
+        entry = [entry for entry in resp.json()["catalog"] if entry["name"] == self.tag][0]
+        self.assertEqual(entry["articleCount"], len(self.articles))
 
     def setUp(self):
         self.tag = uuid4().hex
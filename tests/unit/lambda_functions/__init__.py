@@ -0,0 +1,7 @@
+from tests.unit.lambda_functions.import_time import TestImportTime
+from tests.unit.lambda_functions.projection_worker import TestProjectionWorker
+from tests.unit.lambda_functions.router import TestRouter
+from tests.unit.lambda_functions.article_update import TestArticleUpdate
+from tests.unit.lambda_functions.comment_get_collection import TestCommentGetCollection
+from tests.unit.lambda_functions.article_import import TestArticleImport
+from tests.unit.lambda_functions.article_get_collection import TestArticleGetCollection
@@ -0,0 +1,56 @@
+import json
+from tests.unit.lambda_functions.testing_utils import StubTestCase
+from tests.unit.middleware.testing_data import middleware_raw_event
+import backend.middleware as middleware
+
+
+class TestArticleGetCollection(StubTestCase):
+    """Article pages (publishedIndex) and their cursors against the local DynamoDB stand-in"""
+
+    tables = {"Article": ("urlTitle", None), "Catalog": ("catalog", "name")}
+    indexes = {"publishedIndex": ("Article", "collection", "published")}
+    function_name = "article_get_collection"
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.stub.load("Article", [{
+            "urlTitle": {"S": f"article-{day}"}, "title": {"S": f"Article {day}"}, "description": {"S": "-"},
+            "tag": {"S": "news"}, "published": {"S": f"2021-05-0{day}"}, "collection": {"S": "article"},
+        } for day in range(1, 6)])
+
+    def get(self, **parameters) -> dict:
+        event = {
+            **middleware_raw_event,
+            "resource": "/article",
+            "httpMethod": "GET",
+            "headers": {},
+            "multiValueHeaders": {},
+            "pathParameters": {},
+            "queryStringParameters": {name: str(value) for name, value in parameters.items()},
+            "body": None,
+        }
+        return self.invoke(event)
+
+    def test_pages(self):
+        url_titles, cursor = [], None
+        while True:
+            response = self.get(limit=2, **({"cursor": cursor} if cursor else {}))
+            self.assertEqual(response["statusCode"], 200)
+            body = json.loads(response["body"])
+            url_titles += [article["urlTitle"] for article in body["articles"]]
+            cursor = body.get("cursor")
+            if cursor is None:
+                break
+        self.assertEqual(url_titles, [f"article-{day}" for day in range(5, 0, -1)])
+
+    def test_invalid_cursor(self):
+        key = {"collection": "article", "published": "2021-05-04", "urlTitle": "article-4"}
+        for cursor in ("invalid", middleware.encode_cursor({**key, "collection": "other"}),
+                       middleware.encode_cursor({**key, "tag": "news"}),  # not a publishedIndex key
+                       middleware.encode_cursor({"collection": "article", "urlTitle": "article-4"}),
+                       middleware.encode_cursor({**key, "published": 20210504}),
+                       middleware.encode_cursor({**key, "urlTitle": {"S": "article-4"}})):
+            with self.subTest(cursor=cursor):
+                self.assertEqual(self.get(cursor=cursor)["statusCode"], 400)
+        self.assertEqual(self.get(cursor=middleware.encode_cursor(key))["statusCode"], 200)
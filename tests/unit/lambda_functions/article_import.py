@@ -0,0 +1,67 @@
+import unittest.mock
+import json
+from tests.unit.lambda_functions.testing_utils import StubTestCase
+from tests.unit.middleware.testing_data import middleware_raw_event
+import backend.middleware as middleware
+
+
+def article(url_title: str) -> dict:
+    return {"urlTitle": url_title, "title": "Title", "description": "Description", "tag": "news",
+            "content": "Content"}
+
+
+class TestArticleImport(StubTestCase):
+    """The bulk import against the local DynamoDB stand-in"""
+
+    tables = {"Article": ("urlTitle", None), "Catalog": ("catalog", "name")}
+    function_name = "article_import"
+    admin_key = "admin-key"
+
+    def setUp(self):
+        self.stub.tables["Article"].items.clear()
+        self.stub.load("Article", [{
+            "urlTitle": {"S": "old-article"}, "title": {"S": "Old"}, "description": {"S": "Old"},
+            "tag": {"S": "news"}, "content": {"S": "Old"}, "published": {"S": "2021-05-01"},
+            "version": {"S": "1"}, "collection": {"S": "article"},
+        }])
+
+    def post(self, articles: list) -> list:
+        event = {
+            **middleware_raw_event,
+            "resource": "/article-import",
+            "httpMethod": "POST",
+            "pathParameters": {},
+            "body": json.dumps({"key": "admin-key", "articles": articles}),
+        }
+        response = self.invoke(event)
+        self.assertEqual(response["statusCode"], 200)
+        return json.loads(response["body"])["results"]
+
+    def test_import(self):
+        results = self.post([article("old-article"), article("new-article"), {"urlTitle": "invalid"}])
+        self.assertEqual([result["status"] for result in results], [200, 201, 400])
+        items = self.stub.tables["Article"].items
+        self.assertEqual(items[("old-article",)]["published"], {"S": "2021-05-01"})  # kept
+        self.assertEqual(items[("new-article",)]["title"], {"S": "Title"})
+
+    def test_unprocessed_keys(self):
+        # the existing article lookup of "throttled-article" stays unprocessed: only that article gets a 503
+        client = middleware.aws.get_client("dynamodb")
+        batch_get_item = client.batch_get_item
+
+        def throttled(RequestItems):
+            request = RequestItems["Article"]
+            keys = [key for key in request["Keys"] if key["urlTitle"]["S"] != "throttled-article"]
+            response = batch_get_item(RequestItems={"Article": {**request, "Keys": keys}}) if keys else {
+                "Responses": {"Article": []}}
+            if len(keys) < len(request["Keys"]):
+                response["UnprocessedKeys"] = {
+                    "Article": {**request, "Keys": [{"urlTitle": {"S": "throttled-article"}}]}}
+            return response
+
+        with unittest.mock.patch.object(client, "batch_get_item", throttled):
+            results = self.post([article("old-article"), article("throttled-article"), article("new-article")])
+        self.assertEqual([result["status"] for result in results], [200, 503, 201])
+        self.assertEqual(results[1]["urlTitle"], "throttled-article")
+        self.assertNotIn(("throttled-article",), self.stub.tables["Article"].items)
+        self.assertIn(("new-article",), self.stub.tables["Article"].items)
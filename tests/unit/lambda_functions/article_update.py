@@ -0,0 +1,52 @@
+import unittest.mock
+import json
+from tests.unit.lambda_functions.testing_utils import StubTestCase
+from tests.unit.middleware.testing_data import middleware_raw_event
+
+
+class TestArticleUpdate(StubTestCase):
+    """The article update against the local DynamoDB stand-in (which rejects reserved words in expressions)"""
+
+    tables = {"Article": ("urlTitle", None), "Catalog": ("catalog", "name")}
+    function_name = "article_update"
+    admin_key = "admin-key"
+
+    def setUp(self):
+        self.stub.tables["Article"].items.clear()
+        self.stub.load("Article", [{
+            "urlTitle": {"S": "my-article"}, "title": {"S": "Old"}, "description": {"S": "Old"},
+            "tag": {"S": "news"}, "content": {"S": "Old"}, "published": {"S": "2021-05-01"},
+            "version": {"S": "1"}, "contentEncoding": {"S": "zlib"},
+        }])
+
+    def update(self, **body) -> dict:
+        event = {
+            **middleware_raw_event,
+            "resource": "/article/{articleUrlTitle}",
+            "httpMethod": "PATCH",
+            "pathParameters": {"articleUrlTitle": "my-article"},
+            "body": json.dumps({"key": "admin-key", "title": "New", "description": "New", "tag": "news",
+                                "content": "New", **body}),
+        }
+        return self.invoke(event)
+
+    def test_update(self):
+        self.assertEqual(self.update()["statusCode"], 200)
+        item = self.stub.tables["Article"].items[("my-article",)]
+        self.assertEqual(item["title"], {"S": "New"})
+        self.assertEqual(item["content"], {"S": "New"})
+        self.assertEqual(item["collection"], {"S": "article"})  # (re)indexed by the publishedIndex
+        self.assertNotIn("contentEncoding", item)
+        self.assertNotEqual(item["version"], {"S": "1"})
+
+    def test_conflict(self):
+        # the tag was changed concurrently (after the handler read the article)
+        get_item = self.function.article_table.get_item
+
+        def get_item_then_change_tag(**kwargs):
+            response = get_item(**kwargs)
+            self.stub.tables["Article"].items[("my-article",)]["tag"] = {"S": "other"}
+            return response
+
+        with unittest.mock.patch.object(self.function.article_table, "get_item", get_item_then_change_tag):
+            self.assertEqual(self.update()["statusCode"], 409)
@@ -0,0 +1,98 @@
+import unittest.mock
+import json
+from tests.unit.lambda_functions.testing_utils import StubTestCase
+from tests.unit.middleware.testing_data import middleware_raw_event
+import backend.middleware as middleware
+
+
+def comment_id(day: int) -> str:
+    return f"2021-05-0{day}T10:00:00.000000#comment{day}"
+
+
+class TestCommentGetCollection(StubTestCase):
+    """Comment pages (whole threads) and respLimit against the local DynamoDB stand-in
+
+    Five comments, the second one with 100 replies, the fourth one with 2
+    """
+
+    tables = {"Comment": ("articleUrlTitle", "id")}
+    function_name = "comment_get_collection"
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        items = []
+        for day in range(1, 6):
+            items.append({"articleUrlTitle": {"S": "my-article"}, "id": {"S": comment_id(day)},
+                          "author": {"S": "Lea"}, "content": {"S": f"Comment {day}"}})
+            for i in range({2: 100, 4: 2}.get(day, 0)):
+                key = middleware.comments.reply_key("my-article", comment_id(day), f"2021-06-01T10:{i:04}.000000#r")
+                items.append({"articleUrlTitle": {"S": "my-article"}, "id": {"S": key["id"]},
+                              "author": {"S": "Steve"}, "content": {"S": f"Reply {i}"}})
+        cls.stub.load("Comment", items)
+
+    def setUp(self):
+        self.queries = []  # (Limit, number of items read)
+        query = self.function.comment_table.query
+
+        def counting_query(**kwargs):
+            response = query(**kwargs)
+            self.queries.append((kwargs.get("Limit"), len(response["Items"])))
+            return response
+
+        patch = unittest.mock.patch.object(self.function.comment_table, "query", counting_query)
+        patch.start()
+        self.addCleanup(patch.stop)
+
+    def get(self, **parameters) -> dict:
+        event = {
+            **middleware_raw_event,
+            "resource": "/article/{articleUrlTitle}/comments",
+            "httpMethod": "GET",
+            "headers": {},
+            "multiValueHeaders": {},
+            "pathParameters": {"articleUrlTitle": "my-article"},
+            "queryStringParameters": {name: str(value) for name, value in parameters.items()},
+            "body": None,
+        }
+        response = self.invoke(event)
+        self.assertEqual(response["statusCode"], 200)
+        return json.loads(response["body"])
+
+    def get_all(self, **parameters) -> list:
+        comments, cursor = [], None
+        while True:
+            body = self.get(**parameters, **({"cursor": cursor} if cursor else {}))
+            comments.extend(body["comments"])
+            cursor = body.get("cursor")
+            if cursor is None:
+                return comments
+
+    def test_pages(self):
+        for order, days in (("oldest", range(1, 6)), ("newest", range(5, 0, -1))):
+            comments = self.get_all(limit=2, order=order)
+            self.assertEqual([comment["id"] for comment in comments], [comment_id(day) for day in days])
+            self.assertEqual({comment["id"]: len(comment["resps"]) for comment in comments},
+                             {comment_id(day): {2: 100, 4: 2}.get(day, 0) for day in range(1, 6)})
+
+    def test_query_limit(self):
+        # a page of one comment: the thread's replies aren't read one item per query
+        body = self.get(limit=1, cursor=middleware.encode_cursor({"articleUrlTitle": "my-article",
+                                                                  "id": comment_id(1)}))
+        self.assertEqual(len(body["comments"][0]["resps"]), 100)
+        self.assertTrue(all(limit >= self.function.DEFAULT_LIMIT for limit, _ in self.queries))
+        self.assertLessEqual(len(self.queries), 6)
+
+    def test_resp_limit(self):
+        for order in ("oldest", "newest"):
+            self.queries.clear()
+            comments = {comment["id"]: comment for comment in self.get_all(respLimit=3, order=order)}
+            self.assertEqual(len(comments), 5)
+            long_thread = comments[comment_id(2)]
+            self.assertEqual([reply["content"] for reply in long_thread["resps"].values()],
+                             ["Reply 0", "Reply 1", "Reply 2"])  # the oldest ones
+            self.assertTrue(long_thread["respsTruncated"])
+            self.assertEqual(len(comments[comment_id(4)]["resps"]), 2)
+            self.assertNotIn("respsTruncated", comments[comment_id(4)])
+            # the long thread isn't read beyond the query page it starts in (plus its bounded query newest first)
+            self.assertLess(sum(read for _, read in self.queries), 2 * self.function.DEFAULT_LIMIT + 3 + 2)
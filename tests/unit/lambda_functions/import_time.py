@@ -0,0 +1,28 @@
+import unittest
+import os
+from tools.benchmarks.import_time import get_lambda_functions, profile
+
+
+class TestImportTime(unittest.TestCase):
+    """Cold start import time budgets (ms) per Lambda function, can be overwritten by environment variables"""
+
+    # functions that don't access DynamoDB/ validate request data -> no boto3/ pydantic import
+    # (the router imports the handler of a route on its first request)
+    light_functions = ["default", "admin_login", "router"]
+    light_budget = float(os.environ.get("ImportTimeBudgetLight", 250))
+    budget = float(os.environ.get("ImportTimeBudget", 1500))
+
+    def test_light_functions(self):
+        for name in self.light_functions:
+            with self.subTest(name):
+                result = profile(name)
+                self.assertNotIn("boto3", result["modules"])
+                self.assertNotIn("pydantic", result["modules"])
+                self.assertLess(result["seconds"] * 1000, self.light_budget)
+
+    def test_budget(self):
+        for name in get_lambda_functions():
+            if name in self.light_functions:
+                continue
+            with self.subTest(name):
+                self.assertLess(profile(name)["seconds"] * 1000, self.budget)
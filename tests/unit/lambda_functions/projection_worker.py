@@ -0,0 +1,80 @@
+import unittest.mock
+import os
+import json
+from tests.unit.lambda_functions.testing_utils import StubTestCase
+import backend.middleware as middleware
+
+RECORDS_PATH = os.path.join(os.path.dirname(__file__), "stream_records.json")
+
+
+class TestProjectionWorker(StubTestCase):
+    """Local harness: feeds recorded stream records (stream_records.json) into the projection worker
+
+    The tables are served by the local DynamoDB stand-in, seeded with the recorded items
+    """
+
+    tables = {"Article": ("urlTitle", None), "Comment": ("articleUrlTitle", "id"), "Catalog": ("catalog", "name")}
+    function_name = "projection_worker"
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        with open(RECORDS_PATH) as f:
+            cls.recorded = json.load(f)
+        for table_name, items in cls.recorded["tables"].items():
+            cls.stub.load(table_name, items)
+
+    def setUp(self):
+        self.stub.tables["Catalog"].items.clear()
+
+    def activity(self):
+        return middleware.projections.get_article_activity(["my-article", "quiet-article", "deleted-article"])
+
+    def test_replay(self):
+        self.assertEqual(self.function.handler({"Records": self.recorded["records"]}, None), {"batchItemFailures": []})
+        activity = self.activity()
+        self.assertEqual(set(activity), {"my-article", "quiet-article"})
+        self.assertEqual(activity["my-article"]["commentCount"], 2)
+        self.assertEqual(activity["my-article"]["replyCount"], 2)  # one in the (not migrated) resps map
+        self.assertEqual(activity["my-article"]["lastActivity"], "2021-05-04T09:00:00.000000")
+        self.assertEqual(activity["quiet-article"]["commentCount"], 0)
+        self.assertEqual(activity["quiet-article"]["lastActivity"], "2021-04-01")
+
+        # redelivered (and reordered) records give the same projections
+        self.function.handler({"Records": self.recorded["records"][::-1]}, None)
+        self.assertEqual(self.activity(), activity)
+
+    def test_partial_failure(self):
+        refresh = middleware.projections.refresh_article_activity
+
+        def fail_my_article(article_table, comment_table, catalog_table, url_title):
+            if url_title == "my-article":
+                raise RuntimeError("Test")
+            return refresh(article_table, comment_table, catalog_table, url_title)
+
+        with unittest.mock.patch.object(middleware.projections, "refresh_article_activity", fail_my_article), \
+                self.assertLogs(level="ERROR"):
+            response = self.function.handler({"Records": self.recorded["records"]}, None)
+        first_failed = self.recorded["records"][0]["dynamodb"]["SequenceNumber"]
+        self.assertEqual(response, {"batchItemFailures": [{"itemIdentifier": first_failed}]})
+        self.assertEqual(set(self.activity()), {"quiet-article"})
+
+    def test_concurrent_refresh(self):
+        # a refresh that read older state doesn't overwrite the projection stored meanwhile by a later one
+        compute = middleware.projections.compute_article_activity
+        later = []
+
+        def compute_stale(article_table, comment_table, url_title):
+            activity = compute(article_table, comment_table, url_title)
+            if url_title != "my-article" or later:
+                return activity
+            later.append(None)
+            later[0] = middleware.projections.refresh_article_activity(
+                article_table, comment_table, self.function.catalog_table, url_title)
+            return {**activity, "commentCount": 0}
+
+        with unittest.mock.patch.object(middleware.projections, "compute_article_activity", compute_stale):
+            response = self.function.handler({"Records": self.recorded["records"]}, None)
+        self.assertEqual(response, {"batchItemFailures": []})
+        self.assertEqual(self.activity()["my-article"], later[0])
+        self.assertEqual(later[0]["commentCount"], 2)
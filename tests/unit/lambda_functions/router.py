@@ -0,0 +1,31 @@
+import unittest
+import unittest.mock
+import io
+import os
+import json
+import importlib
+import backend.middleware as middleware
+
+
+class TestRouter(unittest.TestCase):
+    """Single-function router mode (backend/lambda_functions/router)"""
+
+    router = importlib.import_module("backend.lambda_functions.router.lambda_function")
+
+    def test_routes(self):
+        # every route of the api spec is served, by an existing handler
+        self.assertEqual(set(self.router.ROUTES), set(middleware.validation.load_routes()))
+        for name in {*self.router.ROUTES.values(), self.router.DEFAULT}:
+            self.assertTrue(os.path.isfile(os.path.join("backend/lambda_functions", name, "lambda_function.py")))
+
+    def test_dispatch(self):
+        event = {"resource": "/{proxy+}", "path": "/unknown", "httpMethod": "GET"}
+        with unittest.mock.patch.dict(self.router._handlers, clear=True), \
+                unittest.mock.patch("sys.stdout", new_callable=io.StringIO) as stdout:
+            response = self.router.handler(event, None)
+            self.router.handler(event, None)
+        self.assertEqual(response["statusCode"], 404)
+        first, second = map(json.loads, stdout.getvalue().splitlines())
+        self.assertGreater(first["init"], 0)  # the import of the default handler
+        self.assertNotIn("init", second)
+        self.assertGreaterEqual(first["total"], first["init"])
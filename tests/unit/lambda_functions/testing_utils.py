@@ -0,0 +1,51 @@
+import unittest
+import unittest.mock
+import contextlib
+import io
+import os
+import importlib
+from typing import Dict, Optional, Tuple
+from tools.benchmarks.dynamodb_stub import DynamoDBStub
+import backend.middleware as middleware
+
+
+class StubTestCase(unittest.TestCase):
+    """Base class of handler tests against the local DynamoDB stand-in (tools/benchmarks/dynamodb_stub.py)
+
+    Per test class the stand-in serves "tables" (and "indexes"), the environment points the middleware at it (with
+    fresh clients/ resources) and the handler module of "function_name" is imported as cls.function.
+    Everything is undone by a class cleanup
+    """
+
+    tables: Dict[str, Tuple[str, Optional[str]]] = {}
+    indexes: Dict[str, Tuple[str, str, str]] = {}
+    function_name: Optional[str] = None
+    admin_key: Optional[str] = None  # the admin key the authenticator gets (None: not patched)
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        stack = contextlib.ExitStack()
+        cls.addClassCleanup(stack.close)
+        cls.stub = stack.enter_context(DynamoDBStub(cls.tables, cls.indexes))
+        stack.enter_context(unittest.mock.patch.dict(os.environ, {
+            "AWS_DEFAULT_REGION": "us-east-1",
+            "AWS_ACCESS_KEY_ID": "testing",
+            "AWS_SECRET_ACCESS_KEY": "testing",
+            "AWS_ENDPOINT_URL_DYNAMODB": cls.stub.endpoint_url,
+            "ArticleTableName": "Article",
+            "CommentTableName": "Comment",
+            "CatalogTableName": "Catalog",
+        }))
+        stack.enter_context(unittest.mock.patch.dict(middleware.aws._clients, clear=True))
+        stack.enter_context(unittest.mock.patch.dict(middleware.aws._resources, clear=True))
+        if cls.admin_key is not None:
+            stack.enter_context(unittest.mock.patch.object(
+                middleware.utils.authenticator._admin_key_cache, "get", return_value=cls.admin_key))
+        if cls.function_name is not None:
+            cls.function = importlib.import_module(f"backend.lambda_functions.{cls.function_name}.lambda_function")
+
+    def invoke(self, event: dict):
+        """Calls the handler (metrics output suppressed)"""
+        with unittest.mock.patch("sys.stdout", new_callable=io.StringIO):
+            return self.function.handler(event, None)
@@ -1,2 +1,6 @@
 from tests.unit.middleware.middleware import \
-    TestMiddlewareCore, TestMiddlewareAuthentication, TestMiddlewareDataDecorator
+    TestMiddlewareCore, TestMiddlewareAuthentication, TestMiddlewareDataDecorator, TestMiddlewareValidation, \
+    TestMiddlewareSecretCache, TestMiddlewareDeadline, TestMiddlewareMetrics, TestMiddlewareAws, \
+    TestMiddlewareLowLevelTable, TestMiddlewareTagCatalog, TestMiddlewareComments, TestMiddlewareParallelScan, \
+    TestMiddlewarePagination, TestMiddlewareCache, TestMiddlewareArticleContent, TestMiddlewareFields, \
+    TestMiddlewareWarmUp
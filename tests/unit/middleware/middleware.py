@@ -4,10 +4,29 @@ import tests.unit.middleware.testing_data as data
 from tests.utils import get_admin_key
 import pydantic
 import json
+import io
+import os
+import time
+import tempfile
+import threading
+import itertools
+import types
+import unittest.mock
+import gzip
+import base64
+from decimal import Decimal
+from typing import Optional
 
 
 class TestMiddlewareCore(unittest.TestCase):
 
+    def setUp(self):
+        self.metrics_patcher = unittest.mock.patch.object(middleware.metrics, "sample_rate", 0)
+        self.metrics_patcher.start()
+
+    def tearDown(self):
+        self.metrics_patcher.stop()
+
     def test_event(self):
         event = middleware.Event(data.middleware_raw_event)
         self.assertEqual(event.ressource, data.middleware_raw_event["resource"])
@@ -28,6 +47,21 @@ class TestMiddlewareCore(unittest.TestCase):
         event_body_was_invalid = middleware.Event({"body": "fsdfsdf"})
         self.assertEqual(event_body_was_invalid.body, None)
 
+    def test_event_lazy(self):
+        raw_event = {
+            **data.middleware_raw_event,
+            "queryStringParameters": {"q": "a%20b"},
+            "multiValueQueryStringParameters": {"q": ["a%20b", "c%2Fd"]},
+            "pathParameters": {"commentId": "2021-01-01%231234"}
+        }
+        event = middleware.Event(raw_event)
+        self.assertFalse(hasattr(event, "__dict__"))
+        self.assertEqual(event.query_string_parameters, {"q": "a b"})
+        self.assertEqual(event.multi_value_query_string_parameters, {"q": ["a b", "c/d"]})
+        self.assertEqual(event.path_parameters, {"commentId": "2021-01-01#1234"})
+        self.assertEqual(raw_event["pathParameters"], {"commentId": "2021-01-01%231234"})  # raw event not modified
+        self.assertIs(event.body, event.body)  # decoded once
+
     def test_response(self):
         default_response = middleware.Response()
         self.assertEqual(default_response.body, {})
@@ -56,18 +90,106 @@ class TestMiddlewareCore(unittest.TestCase):
         self.assertEqual(customized_response.body, {"here": "is something else"})
         self.assertEqual(customized_response.status_code, 404)
         self.assertEqual(customized_response.error_messages, ["Not found"])
-        self.assertEqual(customized_response.map(), {
+        customized_response_mapped = customized_response.map()
+        self.assertEqual(json.loads(customized_response_mapped.pop("body")), {
+            "here": "is something else",
+            "errors": ["Not found"]
+        })
+        self.assertEqual(customized_response_mapped, {
             "statusCode": 404,
             "headers": {
                 "Access-Control-Allow-Origin": "*",
                 "Access-Control-Allow-Methods": "*",
                 "Access-Control-Allow-Headers": "*"},
-            "multiValueHeaders": {},
-            "body": json.dumps({
-                "here": "is something else",
-                "errors": ["Not found"]
-            })
+            "multiValueHeaders": {}
+        })
+
+    def test_response_dynamodb_types(self):
+        response = middleware.Response(body={"article": {"views": Decimal("12"), "rating": Decimal("4.5"),
+                                                         "tags": {"cool"}}})
+        self.assertEqual(json.loads(response.map()["body"]), {"article": {"views": 12, "rating": 4.5,
+                                                                          "tags": ["cool"]}})
+
+    def test_codecs(self):
+        value = {"a": [1, Decimal("2"), "ä"], "b": None}
+        for name in ("json", "orjson"):
+            try:
+                codec = middleware.codec.get_codec(name)
+            except ValueError:
+                continue  # not installed
+            self.assertEqual(codec.loads(codec.dumps(value)), {"a": [1, 2, "ä"], "b": None})
+            with self.assertRaises(middleware.codec.JSONCodec.DecodeError):
+                codec.loads("fsdfsdf")
+
+    def test_response_compression(self):
+        event = middleware.Event(data.middleware_raw_event)  # accept-encoding: gzip, deflate, br
+        body = {"content": "a" * middleware.compression.min_size}
+        mapped = middleware.Response(body=body).map(event)
+        self.assertTrue(mapped["isBase64Encoded"])
+        self.assertIn(mapped["headers"]["Content-Encoding"], ("gzip", "br"))
+        self.assertEqual(mapped["headers"]["Vary"], "Accept-Encoding")
+        if mapped["headers"]["Content-Encoding"] == "gzip":
+            self.assertEqual(json.loads(gzip.decompress(base64.b64decode(mapped["body"]))), body)
+
+        not_accepted = middleware.Event({"headers": {"Accept-Encoding": "gzip;q=0, identity"}})
+        self.assertNotIn("isBase64Encoded", middleware.Response(body=body).map(not_accepted))
+        small = middleware.Response(body={"content": "a"}).map(event)
+        self.assertNotIn("isBase64Encoded", small)
+        opted_out = middleware.Response(body=body).map(event, compress=False)
+        self.assertNotIn("isBase64Encoded", opted_out)
+
+    def test_response_etag(self):
+        event = middleware.Event(data.middleware_raw_event)  # GET
+        mapped = middleware.Response(body={"a": "b"}).map(event, cache_control="public, max-age=60")
+        etag = mapped["headers"]["ETag"]
+        self.assertEqual(mapped["headers"]["Cache-Control"], "public, max-age=60")
+        self.assertEqual(middleware.Response(body={"a": "b"}).map(event)["headers"]["ETag"], etag)  # stable
+        self.assertNotEqual(middleware.Response(body={"a": "c"}).map(event)["headers"]["ETag"], etag)
+
+        conditional_event = middleware.Event({
+            **data.middleware_raw_event,
+            "headers": {**data.middleware_raw_event["headers"], "If-None-Match": f'"other", W/{etag}'}
         })
+        not_modified = middleware.Response(body={"a": "b"}).map(conditional_event)
+        self.assertEqual(not_modified["statusCode"], 304)
+        self.assertEqual(not_modified["headers"]["ETag"], etag)
+        self.assertNotIn("body", not_modified)
+        modified = middleware.Response(body={"a": "c"}).map(conditional_event)
+        self.assertEqual(modified["statusCode"], 200)
+
+        version_event = middleware.Event({**data.middleware_raw_event, "headers": {"If-None-Match": '"v1"'}})
+        self.assertEqual(middleware.Response(body={"a": "b"}, etag="v1").map(version_event)["statusCode"], 304)
+        self.assertEqual(middleware.Response(body={"a": "b"}, etag="v2").map(version_event)["statusCode"], 200)
+
+        post_event = middleware.Event({**data.middleware_raw_event, "httpMethod": "POST"})
+        self.assertNotIn("ETag", middleware.Response(body={"a": "b"}).map(post_event)["headers"])
+
+    def test_response_etag_compressed(self):
+        # the 304 after a compressed 200 names the same (compressed) representation
+        event = middleware.Event(data.middleware_raw_event)  # accept-encoding: gzip, deflate, br
+        body = {"content": "a" * middleware.compression.min_size}
+        for etag in (None, "v1"):
+            ok = middleware.Response(body=body, etag=etag).map(event)
+            coding = ok["headers"]["Content-Encoding"]
+            self.assertTrue(ok["headers"]["ETag"].endswith(f'-{coding}"'))
+            not_modified = middleware.Response(body=body, etag=etag).map(middleware.Event({
+                **data.middleware_raw_event,
+                "headers": {**data.middleware_raw_event["headers"], "If-None-Match": ok["headers"]["ETag"]}
+            }))
+            self.assertEqual(not_modified["statusCode"], 304)
+            self.assertEqual(not_modified["headers"]["ETag"], ok["headers"]["ETag"])
+            self.assertEqual(not_modified["headers"]["Vary"], "Accept-Encoding")
+            # a client without gzip/ br gets the uncompressed representation's tag
+            identity = middleware.Response(body=body, etag=etag).map(middleware.Event({
+                **data.middleware_raw_event,
+                "headers": {"If-None-Match": ok["headers"]["ETag"]}
+            }))
+            self.assertEqual(identity["statusCode"], 304)
+            self.assertEqual(identity["headers"]["ETag"], ok["headers"]["ETag"].replace(f"-{coding}", ""))
+
+    def test_event_base64_body(self):
+        event = middleware.Event({"body": base64.b64encode(b'{"key": "1234"}').decode(), "isBase64Encoded": True})
+        self.assertEqual(event.body, {"key": "1234"})
 
     def test_middleware_decorator(self):
         dummy = 2
@@ -76,12 +198,19 @@ class TestMiddlewareCore(unittest.TestCase):
         def handler(event: middleware.Event, context):
             nonlocal self, dummy
             self.assertEqual(event.path, data.middleware_raw_event["path"])
-            self.assertEqual(context, dummy)
+            self.assertEqual(context.raw, dummy)
             return middleware.Response()
 
         response = handler(data.middleware_raw_event, dummy)
         self.assertEqual(response["statusCode"], 200)
 
+        @middleware.middleware(compress=False)
+        def handler_not_compressed(event: middleware.Event, context):
+            return middleware.Response(body={"content": "a" * middleware.compression.min_size})
+
+        response = handler_not_compressed(data.middleware_raw_event, dummy)
+        self.assertNotIn("isBase64Encoded", response)
+
 
 class TestMiddlewareAuthentication(unittest.TestCase):
 
@@ -180,3 +309,944 @@ class TestMiddlewareDataDecorator(unittest.TestCase):
         @classmethod
         def build(cls, event: middleware.Event, context):
             return cls(key=event.body.get("key"), profile=event.body.get("profile"))
+
+
+class TestMiddlewareValidation(unittest.TestCase):
+
+    def test_compiled_validator(self):
+        validator = middleware.validation.get_validator("POST /article/{articleUrlTitle}/comments")
+        self.assertIs(validator, middleware.validation.get_validator("POST /article/{articleUrlTitle}/comments"))
+        validator(middleware.Event(self.comment_create_event))
+
+        with self.assertRaises(middleware.validation.RequestValidationError) as cm:
+            validator(middleware.Event({**self.comment_create_event, "body": '{"author": 1}'}))
+        self.assertEqual(cm.exception.status_code, 400)
+        self.assertEqual(cm.exception.errors, ["body.content: required", "body.author: expected string"])
+
+        with self.assertRaises(middleware.validation.RequestValidationError) as cm:
+            validator(middleware.Event({**self.comment_create_event, "body": "{"}))
+        self.assertEqual(cm.exception.errors, ["body: malformed JSON"])
+
+        with self.assertRaises(middleware.validation.RequestValidationError) as cm:
+            validator(middleware.Event({**self.comment_create_event, "pathParameters": None}))
+        self.assertEqual(cm.exception.errors, ["articleUrlTitle: required path parameter missing"])
+
+        self.assertIsNone(middleware.validation.get_validator("GET /does-not-exist"))
+
+    def test_body_size(self):
+        max_body_size = middleware.validation.get_max_body_size("POST /article/{articleUrlTitle}/comments")
+        middleware.validation.check_body_size(middleware.Event({**self.comment_create_event,
+                                                                "body": "ü" * (max_body_size // 2)}))
+        with self.assertRaises(middleware.validation.RequestValidationError) as cm:
+            middleware.validation.check_body_size(middleware.Event({**self.comment_create_event,
+                                                                    "body": "ü" * (max_body_size // 2 + 1)}))
+        self.assertEqual(cm.exception.status_code, 413)
+        # base64 encoded bodies: the decoded size counts
+        for size in (max_body_size - 1, max_body_size):
+            event = middleware.Event({**self.comment_create_event, "isBase64Encoded": True,
+                                      "body": base64.b64encode(b"x" * size).decode()})
+            self.assertEqual(event.body_size, size)
+            middleware.validation.check_body_size(event)
+        with self.assertRaises(middleware.validation.RequestValidationError):
+            middleware.validation.check_body_size(middleware.Event({
+                **self.comment_create_event, "isBase64Encoded": True,
+                "body": base64.b64encode(b"x" * (max_body_size + 1)).decode()}))
+
+        # the middleware decorator answers before the handler (and its decorators, e.g. the admin guard) parses it
+        @middleware.middleware
+        def handler(event: middleware.Event, context):
+            self.fail("Handler executed")
+
+        with unittest.mock.patch.object(middleware.metrics, "sample_rate", 0):
+            response = handler({**self.comment_create_event, "body": " " * (max_body_size + 1)}, None)
+        self.assertEqual(response["statusCode"], 413)
+
+    def test_query_parameters(self):
+        validator = middleware.validation.get_validator("GET /article")
+        event = {**data.middleware_raw_event, "resource": "/article", "httpMethod": "GET"}
+        validator(middleware.Event({**event, "queryStringParameters": {"limit": "10", "cursor": "abc"}}))
+        for limit, error in (("ten", "limit: expected integer"), ("0", "limit: minimum 1")):
+            with self.assertRaises(middleware.validation.RequestValidationError) as cm:
+                validator(middleware.Event({**event, "queryStringParameters": {"limit": limit}}))
+            self.assertEqual(cm.exception.errors, [error])
+
+    def test_compile_schema(self):
+        validate = middleware.validation.compile_schema({
+            "type": "object",
+            "required": ["tags"],
+            "properties": {"tags": {"type": "array", "items": {"type": "string", "maxLength": 3}}},
+            "additionalProperties": {"type": "integer"}
+        }, "body")
+        errors = []
+        self.assertTrue(validate({"tags": ["a", "abc"], "n": 1}, errors))
+        self.assertFalse(validate({"tags": ["abcd"], "n": True}, errors))
+        self.assertEqual(errors, ["body.tags[]: max. length 3", "body.*: expected integer"])
+
+    def test_data_decorator_compiled(self):
+        @middleware.data(self.Model)
+        def handler(event: middleware.Event, context, event_data):
+            self.assertEqual(event_data.articleUrlTitle, "my-article")
+            self.assertEqual(event_data.author, "Lea")
+            return context
+
+        self.assertEqual(handler(middleware.Event(self.comment_create_event), 2), 2)
+        response = handler(middleware.Event({**self.comment_create_event, "body": "{}"}), 2)
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.error_messages[0][0], "Request validation failed")
+
+        @middleware.data(self.Model, compiled=False)
+        def handler_pydantic(event: middleware.Event, context, event_data):
+            self.fail("Handler executed")
+
+        response = handler_pydantic(middleware.Event({**self.comment_create_event, "body": "{}"}), 2)
+        self.assertEqual(response.error_messages[0][0], "Request validation failed (pydantic error)")
+
+    def test_build_validated(self):
+        # the compiled path builds the same typed model as pydantic: numbers converted, defaults set
+        class Model(middleware.Model):
+            limit: Optional[int] = None
+            cursor: Optional[str] = None
+            rating: float = 1.0
+
+            @classmethod
+            def request_values(cls, event: middleware.Event, context):
+                return {"limit": event.query_string_parameters.get("limit"),
+                        "cursor": event.query_string_parameters.get("cursor"), "other": "ignored"}
+
+        for parameters in ({"limit": "10", "cursor": "abc"}, {}):
+            event = middleware.Event({**data.middleware_raw_event, "queryStringParameters": parameters})
+            built = Model.build_validated(event, None)
+            self.assertIsInstance(built, Model)
+            self.assertEqual(built, Model.build(event, None))
+        self.assertEqual((built.limit, built.cursor, built.rating), (None, None, 1.0))
+        built = Model.build_validated(middleware.Event({**data.middleware_raw_event,
+                                                        "queryStringParameters": {"limit": "10"}}), None)
+        self.assertEqual(built.limit, 10)
+
+        class Incomplete(middleware.Model):
+            name: str
+
+        with self.assertRaises(TypeError):  # request_values is abstract
+            Incomplete(name="name")
+
+    comment_create_event = {
+        **data.middleware_raw_event,
+        "resource": "/article/{articleUrlTitle}/comments",
+        "httpMethod": "POST",
+        "pathParameters": {"articleUrlTitle": "my-article"},
+        "body": '{"author": "Lea", "content": "Wow"}'
+    }
+
+    class Model(middleware.Model):
+        articleUrlTitle: str
+        author: str
+        content: str
+
+        @classmethod
+        def request_values(cls, event: middleware.Event, context):
+            return {**event.body, "articleUrlTitle": event.path_parameters.get("articleUrlTitle")}
+
+
+class TestMiddlewareSecretCache(unittest.TestCase):
+
+    def test_ttl(self):
+        values = iter(["a", "b", "c"])
+        cache = middleware.secret_cache.SecretCache(lambda: next(values), ttl=60, refresh_margin=10)
+        self.assertEqual(cache.get(), "a")
+        self.assertEqual(cache.get(), "a")
+        cache._expires = time.monotonic() - 1  # expired -> loaded synchronously
+        self.assertEqual(cache.get(), "b")
+        cache._expires = time.monotonic() + 5  # within the refresh margin -> refreshed in the background
+        self.assertEqual(cache.get(), "b")
+        self.join_background_load(cache)
+        self.assertEqual(cache.get(), "c")
+
+    def test_prefetch(self):
+        loaded = threading.Event()
+
+        def loader():
+            loaded.wait(5)
+            return "key"
+
+        calls = []
+        cache = middleware.secret_cache.SecretCache(lambda: calls.append(1) or loader())
+        cache.prefetch()
+        cache.prefetch()
+        loaded.set()
+        self.assertEqual(cache.get(), "key")  # waits for the prefetch
+        self.assertEqual(len(calls), 1)
+
+    def test_failed_refresh_serves_cached_value(self):
+        def loader():
+            if cache._value is not None:
+                raise ConnectionError()
+            return "key"
+
+        cache = middleware.secret_cache.SecretCache(loader, ttl=60, refresh_margin=10)
+        self.assertEqual(cache.get(), "key")
+        cache._expires = time.monotonic() + 5
+        with self.assertLogs(level="WARNING"):
+            self.assertEqual(cache.get(), "key")
+            self.join_background_load(cache)
+        self.assertEqual(cache._value, "key")  # still cached
+
+    @staticmethod
+    def join_background_load(cache):
+        thread = cache._thread
+        if thread is not None:
+            thread.join()
+
+    def test_authenticator_admin_key_file(self):
+        with tempfile.NamedTemporaryFile("w", suffix=".json") as f:
+            json.dump({"blog-backend-admin-key": "1234"}, f)
+            f.flush()
+            with unittest.mock.patch.dict(os.environ, {"AdminKeyFile": f.name}):
+                authenticator = middleware.utils.Authenticator()
+                self.assertFalse(authenticator.register("123"))
+                self.assertFalse(authenticator.register({"key": "1234"}))
+                self.assertTrue(authenticator.register("1234"))
+
+
+class TestMiddlewareDeadline(unittest.TestCase):
+
+    setUp = TestMiddlewareCore.setUp
+    tearDown = TestMiddlewareCore.tearDown
+
+    def test_context(self):
+        context = middleware.Context(self.LambdaContext(remaining_millis=2000))
+        self.assertEqual(context.request_id, "1234")
+        self.assertTrue(1.9 < context.remaining_time <= 2)
+        self.assertEqual(middleware.Context(None).remaining_time, float("inf"))
+
+    def test_paginate_partial(self):
+        table = middleware.utils.wrap_boto3_dynamodb_table(self.Table(pages=3))
+        middleware.Context.current = middleware.Context(self.LambdaContext(remaining_millis=10_000))
+        try:
+            self.assertEqual(table.scan_paginate_items(), [0, 1, 2])
+            self.assertTrue(table.scan_paginate_items().complete)
+            middleware.Context.current.deadline = time.monotonic() + middleware.utils.deadline_reserve + 0.05
+            table.delay = 0.1  # the next page would exceed the deadline
+            items = table.scan_paginate_items(allow_partial=True)
+            self.assertEqual(items, [0])
+            self.assertEqual(items.last_evaluated_key, {"page": 1})
+            with self.assertRaises(middleware.DeadlineExceeded):
+                table.scan_paginate_items()
+            middleware.Context.current.deadline = time.monotonic()
+            with self.assertRaises(middleware.DeadlineExceeded):
+                table.get_item(Key={})
+        finally:
+            middleware.Context.current = None
+
+    def test_deadline_reserve(self):
+        with unittest.mock.patch.dict(os.environ, {"AwsConnectTimeout": "0.25", "AwsReadTimeout": "0.5",
+                                                   "AwsMaxAttempts": "3"}):
+            # 3 attempts of 0.75 s, backoff up to 1 s + 2 s
+            self.assertEqual(middleware.utils.get_deadline_reserve(), 3 * 0.75 + 3 + middleware.utils.RESPONSE_RESERVE)
+            with unittest.mock.patch.dict(os.environ, {"DeadlineReserve": "0.1"}):
+                self.assertEqual(middleware.utils.get_deadline_reserve(), 0.1)
+
+    def test_deadline_reserve_profiles(self):
+        # with every profile a call, retries included, ends before the API functions' timeout and leaves the
+        # handler most of it
+        for profile, settings in middleware.aws.PROFILES.items():
+            with self.subTest(profile=profile):
+                reserve = middleware.utils.get_deadline_reserve(profile)
+                self.assertGreaterEqual(reserve, settings["max_attempts"] * (
+                    settings["connect_timeout"] + settings["read_timeout"]) + middleware.utils.RESPONSE_RESERVE)
+                self.assertLessEqual(reserve, middleware.aws.API_FUNCTION_TIMEOUT / 2)
+
+    def test_middleware_decorator_deadline(self):
+        @middleware.middleware
+        def handler(event: middleware.Event, context: middleware.Context):
+            raise middleware.DeadlineExceeded()
+
+        with self.assertLogs(level="WARNING"):
+            response = handler(data.middleware_raw_event, self.LambdaContext(remaining_millis=0))
+        self.assertEqual(response["statusCode"], 503)
+        self.assertIsNone(middleware.Context.current)
+
+    def test_cursor(self):
+        key = {"articleUrlTitle": "my-article", "id": "2021-01-01#1234"}
+        self.assertEqual(middleware.decode_cursor(middleware.encode_cursor(key)), key)
+        with self.assertRaises(ValueError):
+            middleware.decode_cursor("fsdfsdf")
+
+    class LambdaContext:
+
+        def __init__(self, remaining_millis):
+            self.aws_request_id = "1234"
+            self.function_name = "test"
+            self._deadline = time.monotonic() + remaining_millis / 1000
+
+        def get_remaining_time_in_millis(self):
+            return int((self._deadline - time.monotonic()) * 1000)
+
+    class Table:
+        """Fake boto3 table, one item per page"""
+
+        def __init__(self, pages):
+            self.pages = pages
+            self.delay = 0
+
+        def scan(self, ExclusiveStartKey=None, **kwargs):
+            page = ExclusiveStartKey["page"] if ExclusiveStartKey else 0
+            time.sleep(self.delay)
+            response = {"Items": [page]}
+            if page + 1 < self.pages:
+                response["LastEvaluatedKey"] = {"page": page + 1}
+            return response
+
+        query = scan
+
+        def get_item(self, **kwargs):
+            return {}
+
+        put_item = update_item = delete_item = get_item
+
+
+
+class TestMiddlewarePagination(unittest.TestCase):
+
+    class Table:
+        """Fake boto3 table of n items, the pages (Limit items, max. 1000: the 1 MB limit) are generated on request"""
+
+        def __init__(self, n):
+            self.n = n
+            self.requests = []
+
+        def scan(self, ExclusiveStartKey=None, Limit=None, **kwargs):
+            self.requests.append({**kwargs, "Limit": Limit, "ExclusiveStartKey": ExclusiveStartKey})
+            start = ExclusiveStartKey["i"] if ExclusiveStartKey else 0
+            end = min(start + min(Limit or 1000, 1000), self.n)
+            response = {"Items": [{"i": i, "content": f"item {i} " * 10} for i in range(start, end)]}
+            if end < self.n:
+                response["LastEvaluatedKey"] = {"i": end}
+            return response
+
+        query = scan
+
+        def get_item(self, **kwargs):
+            return {}
+
+        put_item = update_item = delete_item = get_item
+
+    def test_max_items(self):
+        table = middleware.utils.wrap_boto3_dynamodb_table(self.Table(3000))
+        items = table.iter_query(max_items=2500, KeyConditionExpression="pk = :pk")
+        self.assertEqual([item["i"] for item in items], list(range(2500)))
+        self.assertEqual([request["Limit"] for request in table.requests], [2500, 1500, 500])
+        self.assertEqual(table.requests[0]["KeyConditionExpression"], "pk = :pk")
+        self.assertEqual(items.last_evaluated_key, {"i": 2500})
+        self.assertFalse(items.complete)
+        rest = table.iter_query(ExclusiveStartKey=items.last_evaluated_key, Limit=400)
+        self.assertEqual([item["i"] for item in rest], list(range(2500, 3000)))
+        self.assertTrue(rest.complete)
+        self.assertIsNone(rest.last_evaluated_key)
+        partial = table.query_paginate_items(max_items=10)
+        self.assertEqual(len(partial), 10)
+        self.assertEqual(partial.last_evaluated_key, {"i": 10})
+
+    def test_early_stop(self):
+        table = middleware.utils.wrap_boto3_dynamodb_table(self.Table(3000))
+        items = table.iter_scan()
+        self.assertEqual(table.requests, [])
+        self.assertEqual(len(list(itertools.islice(items, 1500))), 1500)
+        items.close()
+        self.assertEqual(len(table.requests), 2)
+        self.assertEqual(items.last_evaluated_key, {"i": 1000})  # the second page wasn't finished
+
+    def test_memory(self):
+        import tracemalloc
+
+        def peak(consume, n):
+            table = middleware.utils.wrap_boto3_dynamodb_table(self.Table(n))
+            tracemalloc.start()
+            try:
+                consume(table)
+                return tracemalloc.get_traced_memory()[1]
+            finally:
+                tracemalloc.stop()
+
+        def iterate(table):
+            for _ in table.iter_scan():
+                pass
+
+        def collect(table):
+            table.scan_paginate_items()
+
+        self.assertLess(peak(iterate, 50_000), 1.5 * peak(iterate, 5_000))  # flat: one page at a time
+        self.assertGreater(peak(collect, 50_000), 5 * peak(collect, 5_000))
+
+class TestMiddlewareMetrics(unittest.TestCase):
+
+    def test_emf(self):
+        @middleware.middleware
+        def handler(event: middleware.Event, context: middleware.Context):
+            with middleware.metrics.timed("dynamodb"):
+                middleware.metrics.count("dynamodb_calls")
+            return middleware.Response(body={"a": "b"})
+
+        with unittest.mock.patch.object(middleware.metrics, "server_timing", True), \
+                unittest.mock.patch("sys.stdout", new_callable=io.StringIO) as stdout:
+            response = handler(data.middleware_raw_event, None)
+        emf = json.loads(stdout.getvalue())
+        self.assertEqual(emf["Route"], "GET /")
+        self.assertIn(emf["ColdStart"], ("true", "false"))
+        self.assertEqual(emf["dynamodb_calls"], 1)
+        metric_names = [metric["Name"] for metric in emf["_aws"]["CloudWatchMetrics"][0]["Metrics"]]
+        for name in ("event", "handler", "dynamodb", "response", "total", "dynamodb_calls"):
+            self.assertIn(name, metric_names)
+            self.assertIn(name, emf)
+        self.assertIn("dynamodb;dur=", response["headers"]["Server-Timing"])
+        self.assertIsNone(middleware.metrics.current)
+
+    def test_worker_threads(self):
+        # phases and counters added concurrently (e.g. a parallel scan's calls) aren't lost
+        recorder = middleware.metrics.Recorder("GET /", False)
+
+        def record():
+            for _ in range(10_000):
+                recorder.add("dynamodb", 0.001)
+                recorder.count("dynamodb_calls")
+
+        threads = [threading.Thread(target=record) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(recorder.counters["dynamodb_calls"], 80_000)
+        self.assertAlmostEqual(recorder.phases["dynamodb"], 80_000, places=3)
+
+    def test_not_sampled(self):
+        with unittest.mock.patch.object(middleware.metrics, "sample_rate", 0):
+            self.assertIsNone(middleware.metrics.start("GET /"))
+            with middleware.metrics.timed("dynamodb"):
+                pass
+            self.assertIsNone(middleware.metrics.finish())
+
+
+class TestMiddlewareAws(unittest.TestCase):
+
+    def test_settings(self):
+        with unittest.mock.patch.dict(os.environ, {"AwsConfigProfile": "production", "AwsReadTimeout": "0.5"}):
+            settings = middleware.aws.get_settings()
+        self.assertEqual(settings["retry_mode"], "adaptive")
+        self.assertEqual(settings["read_timeout"], 0.5)
+        self.assertEqual(middleware.aws.get_settings("unknown"), middleware.aws.PROFILES["default"])
+
+    def test_config(self):
+        config = middleware.aws.get_config("testing")
+        self.assertEqual(config.retries, {"max_attempts": 2, "mode": "standard"})
+        self.assertEqual(config.connect_timeout, 0.75)
+
+
+class TestMiddlewareLowLevelTable(unittest.TestCase):
+
+    comment = {
+        "articleUrlTitle": "my-article",
+        "id": "2021-01-01#1234",
+        "likes": 3,
+        "rating": 4.5,
+        "hidden": False,
+        "removed": None,
+        "tags": ["a", 1],
+        "resps": {"2021-01-02#5678": {"author": "Julius", "content": "Hi"}},
+    }
+
+    class Client:
+
+        def __init__(self, response):
+            self.response = response
+            self.calls = []
+
+        def query(self, **kwargs):
+            self.calls.append(kwargs)
+            return self.response
+
+    def test_serialization(self):
+        item = middleware.utils.serialize_item(self.comment)
+        self.assertEqual(item["likes"], {"N": "3"})
+        self.assertEqual(item["resps"]["M"]["2021-01-02#5678"]["M"]["author"], {"S": "Julius"})
+        self.assertEqual(middleware.utils.deserialize_item(item), self.comment)
+        self.assertEqual(middleware.utils.serialize(Decimal("1.5")), {"N": "1.5"})
+        self.assertEqual(middleware.utils.deserialize({"B": b"data"}), b"data")
+        self.assertEqual(middleware.utils.deserialize({"NS": ["1", "2.5"]}), [1, 2.5])
+
+    def test_query(self):
+        import boto3.dynamodb.conditions
+        client = self.Client({"Items": [middleware.utils.serialize_item(self.comment)],
+                              "LastEvaluatedKey": {"id": {"S": "1"}}})
+        table = middleware.utils.LowLevelTable(client, "Comment")
+        response = table.query(KeyConditionExpression=boto3.dynamodb.conditions.Key("articleUrlTitle").eq("a"),
+                               ExclusiveStartKey={"id": "0"})
+        self.assertEqual(response["Items"], [self.comment])
+        self.assertEqual(response["LastEvaluatedKey"], {"id": "1"})
+        request = client.calls[0]
+        self.assertEqual(request["TableName"], "Comment")
+        self.assertEqual(request["KeyConditionExpression"], "#n0 = :v0")
+        self.assertEqual(request["ExpressionAttributeNames"], {"#n0": "articleUrlTitle"})
+        self.assertEqual(request["ExpressionAttributeValues"], {":v0": {"S": "a"}})
+        self.assertEqual(request["ExclusiveStartKey"], {"id": {"S": "0"}})
+
+    def test_batch_get(self):
+        class Client:
+            """Leaves the first key of each request unprocessed once"""
+
+            def __init__(self):
+                self.requests = []
+                self.retried = set()
+                self.lock = threading.Lock()
+
+            def batch_get_item(self, RequestItems):
+                request = RequestItems["Article"]
+                with self.lock:
+                    self.requests.append(request)
+                    first = request["Keys"][0]["urlTitle"]["S"]
+                    retry = first not in self.retried
+                    self.retried.add(first)
+                keys = request["Keys"][1:] if retry else request["Keys"]
+                response = {"Responses": {"Article": [{**key, "title": {"S": "Title"}} for key in keys]}}
+                if retry:
+                    response["UnprocessedKeys"] = {"Article": {**request, "Keys": request["Keys"][:1]}}
+                return response
+
+        client = Client()
+        keys = [{"urlTitle": f"article-{i}"} for i in range(250)]
+        with unittest.mock.patch.object(middleware.aws, "get_client", return_value=client):
+            items, unprocessed = middleware.utils.batch_get("Article", keys, projection=["urlTitle", "title"])
+            self.assertEqual(middleware.utils.batch_get("Article", []), ([], []))
+        self.assertEqual(sorted(item["urlTitle"] for item in items), sorted(key["urlTitle"] for key in keys))
+        self.assertEqual(unprocessed, [])
+        self.assertEqual(len(client.requests), 3 * 2)  # 3 chunks, each retried once
+        self.assertEqual(sorted(len(request["Keys"]) for request in client.requests), [1, 1, 1, 50, 100, 100])
+        self.assertEqual(client.requests[0]["ProjectionExpression"], "#p0, #p1")
+        self.assertEqual(client.requests[0]["ExpressionAttributeNames"], {"#p0": "urlTitle", "#p1": "title"})
+
+        # keys still unprocessed after the last attempt are returned (Table-style)
+        client = Client()
+        with unittest.mock.patch.object(middleware.aws, "get_client", return_value=client):
+            items, unprocessed = middleware.utils.batch_get("Article", keys, max_attempts=1)
+        self.assertEqual(len(items), 247)
+        self.assertEqual(sorted(key["urlTitle"] for key in unprocessed), ["article-0", "article-100", "article-200"])
+
+    def test_batch_write(self):
+        import botocore.exceptions
+
+        class Client:
+            """Leaves the last item of each request unprocessed, fails chunks holding "invalid" items"""
+
+            def __init__(self):
+                self.requests = []
+                self.lock = threading.Lock()
+
+            def batch_write_item(self, RequestItems):
+                requests = RequestItems["Article"]
+                with self.lock:
+                    self.requests.append(requests)
+                if any(request["PutRequest"]["Item"]["urlTitle"]["S"] == "invalid" for request in requests):
+                    raise botocore.exceptions.ClientError(
+                        {"Error": {"Code": "ValidationException", "Message": "Item too large"}}, "BatchWriteItem")
+                return {"UnprocessedItems": {"Article": requests[-1:]}}
+
+        client = Client()
+        items = [{"urlTitle": f"article-{i}", "version": i} for i in range(60)]
+        items[55]["urlTitle"] = "invalid"
+        with unittest.mock.patch.object(middleware.aws, "get_client", return_value=client):
+            errors = middleware.utils.batch_write("Article", items, max_attempts=3)
+        self.assertEqual(len(errors), 60)
+        self.assertEqual(errors[50:], ["Item too large"] * 10)
+        self.assertEqual([i for i, error in enumerate(errors[:50]) if error], [24, 49])  # unprocessed
+        self.assertEqual(sorted(len(requests) for requests in client.requests), [1, 1, 1, 1, 10, 25, 25])
+        self.assertEqual(client.requests[0][0]["PutRequest"]["Item"]["version"]["N"], "0")
+
+    def test_binary_values(self):
+        # B values come back as bytes on the shared client, retried UnprocessedKeys are sent again as parsed
+        from tools.benchmarks.dynamodb_stub import DynamoDBStub
+        with DynamoDBStub({"Blob": ("id", None)}) as stub, \
+                unittest.mock.patch.dict(os.environ, {"AWS_DEFAULT_REGION": "us-east-1", "AWS_ACCESS_KEY_ID": "testing",
+                                                      "AWS_SECRET_ACCESS_KEY": "testing",
+                                                      "AWS_ENDPOINT_URL_DYNAMODB": stub.endpoint_url}), \
+                unittest.mock.patch.dict(middleware.aws._clients, clear=True):
+            client = middleware.aws.get_client("dynamodb")
+            table = middleware.utils.LowLevelTable(client, "Blob")
+            for i in range(3):
+                table.put_item(Item={"id": bytes([i, 255]), "data": b"\x00data", "parts": {b"a", b"b"}})
+            item = table.get_item(Key={"id": bytes([0, 255])})["Item"]
+            self.assertEqual(item["data"], b"\x00data")
+            self.assertEqual(sorted(item["parts"]), [b"a", b"b"])
+
+            batch_get_item, requests = client.batch_get_item, []
+
+            def unprocessed_once(RequestItems):
+                keys = RequestItems["Blob"]["Keys"]
+                requests.append(keys)
+                response = batch_get_item(RequestItems={"Blob": {"Keys": keys[:1]}})
+                if len(keys) > 1:
+                    response["UnprocessedKeys"] = {"Blob": {"Keys": keys[1:]}}
+                return response
+
+            with unittest.mock.patch.object(client, "batch_get_item", unprocessed_once):
+                items, _ = middleware.utils.batch_get("Blob", [{"id": bytes([i, 255])} for i in range(3)])
+        self.assertEqual(sorted(item["id"] for item in items), [bytes([i, 255]) for i in range(3)])
+        self.assertTrue(all(item["data"] == b"\x00data" for item in items))
+        self.assertEqual([len(keys) for keys in requests], [3, 2, 1])
+
+
+class TestMiddlewareTagCatalog(unittest.TestCase):
+
+    class Table:
+
+        def __init__(self, items):
+            self.items = items
+            self.written = []
+
+        def scan_paginate_items(self, **kwargs):
+            return self.items
+
+        query_paginate_items = parallel_scan = scan_paginate_items
+
+        def put_item(self, Item):
+            self.written.append(("put", Item))
+
+        def delete_item(self, Key):
+            self.written.append(("delete", Key))
+
+    def test_transact_items(self):
+        update = middleware.tag_catalog.add_article("python", "2021-05-01")["Update"]
+        self.assertIn("SET latestPublished = :published", update["UpdateExpression"])
+        self.assertEqual(update["Key"], {"catalog": "tag", "name": "python"})
+        update = middleware.tag_catalog.add_article("python", "2021-05-01", latest_published="2021-06-01")["Update"]
+        self.assertEqual(update["UpdateExpression"], "ADD articleCount :one")
+        update = middleware.tag_catalog.remove_article("python")["Update"]
+        self.assertEqual(update["ExpressionAttributeValues"], {":minus_one": -1})
+
+    def test_rebuild(self):
+        article_table = self.Table([{"tag": "python", "published": "2021-01-01"},
+                                    {"tag": "python", "published": "2021-03-01"},
+                                    {"tag": "aws", "published": "2021-02-01"}])
+        catalog_table = self.Table([
+            {"name": "aws", "articleCount": Decimal(1), "latestPublished": "2021-02-01"},
+            {"name": "python", "articleCount": Decimal(1), "latestPublished": "2021-01-01"},
+            {"name": "old", "articleCount": Decimal(0), "latestPublished": "2020-01-01"}])
+        changes = middleware.tag_catalog.rebuild(article_table, catalog_table)
+        self.assertEqual(changes, {"updated": ["python"], "deleted": ["old"]})
+        self.assertEqual(catalog_table.written, [
+            ("put", {"catalog": "tag", "name": "python", "articleCount": 2, "latestPublished": "2021-03-01"}),
+            ("delete", {"catalog": "tag", "name": "old"})])
+        self.assertEqual([entry["name"] for entry in middleware.tag_catalog.tags(catalog_table)], ["aws", "python"])
+
+    def test_apply_counts(self):
+        import botocore.exceptions
+
+        class Table:
+            def __init__(self):
+                self.updates = []
+
+            def update_item(self, **kwargs):
+                self.updates.append(kwargs)
+                if kwargs["Key"]["name"] == "aws" and "ConditionExpression" in kwargs:  # has a later article
+                    raise botocore.exceptions.ClientError(
+                        {"Error": {"Code": "ConditionalCheckFailedException", "Message": ""}}, "UpdateItem")
+
+        table = Table()
+        middleware.tag_catalog.apply_counts(
+            table, {"python": 2, "aws": 1, "old": -1}, {"python": "2021-05-01", "aws": "2021-01-01"})
+        updates = {(update["Key"]["name"], update["UpdateExpression"]): update["ExpressionAttributeValues"]
+                   for update in table.updates}
+        self.assertEqual(updates, {
+            ("python", "ADD articleCount :count SET latestPublished = :published"):
+                {":count": 2, ":published": "2021-05-01"},
+            ("aws", "ADD articleCount :count SET latestPublished = :published"):
+                {":count": 1, ":published": "2021-01-01"},
+            ("aws", "ADD articleCount :count"): {":count": 1},
+            ("old", "ADD articleCount :count"): {":count": -1},
+        })
+
+    def test_transact_write_items(self):
+        import botocore.exceptions
+
+        class Client:
+            def transact_write_items(self, TransactItems):
+                self.transact_items = TransactItems
+                raise botocore.exceptions.ClientError({
+                    "Error": {"Code": "TransactionCanceledException", "Message": ""},
+                    "CancellationReasons": [{"Code": "ConditionalCheckFailed"}, {"Code": "None"}]
+                }, "TransactWriteItems")
+
+        client = Client()
+        with unittest.mock.patch.object(middleware.aws, "get_client", return_value=client):
+            with self.assertRaises(middleware.TransactionCanceled) as cm:
+                middleware.transact_write_items([
+                    {"Put": {"TableName": "Article", "Item": {"urlTitle": "a"}}},
+                    middleware.tag_catalog.add_article("python", "2021-05-01")])
+        self.assertTrue(cm.exception.condition_failed)
+        self.assertEqual(client.transact_items[0]["Put"]["Item"], {"urlTitle": {"S": "a"}})
+        self.assertEqual(client.transact_items[1]["Update"]["ExpressionAttributeValues"][":one"], {"N": "1"})
+
+
+class TestMiddlewareComments(unittest.TestCase):
+
+    def test_ids(self):
+        key = middleware.comments.reply_key("my-article", "2021-05-02T10:00:00#1", "2021-05-03T08:00:00#2")
+        self.assertEqual(key["id"], "2021-05-02T10:00:00#1#resp#2021-05-03T08:00:00#2")
+        self.assertEqual(middleware.comments.split_id(key["id"]), ("2021-05-02T10:00:00#1", "2021-05-03T08:00:00#2"))
+        self.assertEqual(middleware.comments.split_id("2021-05-02T10:00:00#1"), ("2021-05-02T10:00:00#1", None))
+        # replies follow their comment, before the next comment
+        self.assertLess(key["id"], "2021-05-02T10:00:00#2")
+
+    def test_assemble(self):
+        comments = middleware.comments.assemble([
+            {"id": "2021#0#resp#2021#9", "author": "Orphan", "content": "Left out"},
+            {"id": "2021#1", "author": "Lea", "content": "Wow", "resps": {"2021#2": {"author": "Tom", "content": "Hi"}}},
+            {"id": "2021#1#resp#2021#3", "author": "Julius", "content": "Thanks"},
+            {"id": "2021#4", "author": "Tom", "content": "Nice"},
+        ])
+        self.assertEqual(comments, [
+            {"id": "2021#1", "author": "Lea", "content": "Wow", "resps": {
+                "2021#2": {"author": "Tom", "content": "Hi"}, "2021#3": {"author": "Julius", "content": "Thanks"}}},
+            {"id": "2021#4", "author": "Tom", "content": "Nice", "resps": {}},
+        ])
+
+    def test_assemble_resp_limit(self):
+        items = [{"id": "2021#1", "author": "Lea", "content": "Wow"}] + [
+            {"id": f"2021#1#resp#2021#{i}", "author": "Tom", "content": str(i)} for i in (4, 2, 3)]
+        comment, = middleware.comments.assemble(items, resp_limit=2)
+        self.assertEqual(list(comment["resps"]), ["2021#2", "2021#3"])
+        self.assertTrue(comment["respsTruncated"])
+        comment, = middleware.comments.assemble(items, resp_limit=3)
+        self.assertEqual(len(comment["resps"]), 3)
+        self.assertNotIn("respsTruncated", comment)
+
+
+class TestMiddlewareParallelScan(unittest.TestCase):
+
+    class Scan:
+        """Fake scan: segment -> pages of 10 items, throttles the first request of each segment"""
+
+        def __init__(self, total_segments, pages_per_segment, throttle=True):
+            self.pages = pages_per_segment
+            self.throttled = set() if throttle else set(range(total_segments))
+            self.calls = []
+            self.lock = threading.Lock()
+
+        def __call__(self, Segment, TotalSegments, ExclusiveStartKey, **kwargs):
+            import botocore.exceptions
+            with self.lock:
+                self.calls.append((Segment, ExclusiveStartKey, kwargs))
+                if Segment not in self.throttled:
+                    self.throttled.add(Segment)
+                    raise botocore.exceptions.ClientError(
+                        {"Error": {"Code": "ProvisionedThroughputExceededException", "Message": ""}}, "Scan")
+            page = ExclusiveStartKey["page"] + 1 if ExclusiveStartKey else 0
+            response = {"Items": [{"id": f"{Segment}-{page}-{i}"} for i in range(10)],
+                        "ConsumedCapacity": {"CapacityUnits": 0.5}}
+            if page < self.pages - 1:
+                response["LastEvaluatedKey"] = {"page": page}
+            return response
+
+    def test_scan(self):
+        scan = self.Scan(4, 3)
+        items = middleware.utils.parallel_scan(scan, total_segments=4, max_workers=2, ProjectionExpression="id")
+        self.assertIsInstance(items, types.GeneratorType)
+        ids = [item["id"] for item in items]
+        self.assertEqual(len(ids), 4 * 3 * 10)
+        self.assertEqual(set(ids), {f"{s}-{p}-{i}" for s in range(4) for p in range(3) for i in range(10)})
+        self.assertEqual(len(scan.calls), 4 * 4)  # 3 pages + 1 throttled request per segment
+        self.assertTrue(all(kwargs == {"ProjectionExpression": "id", "ReturnConsumedCapacity": "TOTAL"}
+                            for _, _, kwargs in scan.calls))
+
+    def test_early_stop(self):
+        scan = self.Scan(2, 1000, throttle=False)
+        items = middleware.utils.parallel_scan(scan, total_segments=2)
+        self.assertEqual(len(list(itertools.islice(items, 15))), 15)
+        items.close()
+        calls = len(scan.calls)
+        time.sleep(0.05)
+        self.assertEqual(len(scan.calls), calls)
+        self.assertLess(calls, 20)  # bounded by the page queue
+
+    def test_capacity(self):
+        scan = self.Scan(2, 3, throttle=False)
+        start = time.monotonic()
+        self.assertEqual(len(list(middleware.utils.parallel_scan(scan, total_segments=2, capacity_per_second=20))), 60)
+        self.assertGreater(time.monotonic() - start, 2.5 / 20)  # 6 pages of 0.5 units, 5 before the last request
+
+    def test_error(self):
+        def scan(**kwargs):
+            raise ValueError("failed")
+        with self.assertRaises(ValueError):
+            list(middleware.utils.parallel_scan(scan, total_segments=3))
+
+
+class TestMiddlewareCache(unittest.TestCase):
+
+    def setUp(self):
+        self.recorder = middleware.metrics.Recorder("GET /article/{articleUrlTitle}", cold_start=False)
+        self.metrics_patcher = unittest.mock.patch.object(middleware.metrics, "current", self.recorder)
+        self.metrics_patcher.start()
+        self.time = 1000.0
+        self.time_patcher = unittest.mock.patch.object(middleware.cache.time, "monotonic", lambda: self.time)
+        self.time_patcher.start()
+
+    def tearDown(self):
+        self.time_patcher.stop()
+        self.metrics_patcher.stop()
+
+    def test_ttl(self):
+        cache = middleware.cache.Cache(max_bytes=1024, ttl=10, negative_ttl=2)
+        loads = []
+
+        def loader(value):
+            return lambda: loads.append(value) or value
+
+        key = middleware.cache.key("Article", {"urlTitle": "my-article"}, "title")
+        self.assertEqual(cache.get_or_load(key, loader({"title": "A"})), {"title": "A"})
+        self.assertEqual(cache.get_or_load(key, loader({"title": "B"})), {"title": "A"})
+        self.time += 10
+        self.assertEqual(cache.get_or_load(key, loader({"title": "B"})), {"title": "B"})
+        self.assertIsNone(cache.get_or_load("missing", loader(None)))
+        self.assertIsNone(cache.get_or_load("missing", loader({"title": "C"})))  # negative entry
+        self.time += 2
+        self.assertEqual(cache.get_or_load("missing", loader({"title": "C"})), {"title": "C"})
+        self.assertEqual(loads, [{"title": "A"}, {"title": "B"}, None, {"title": "C"}])
+        self.assertEqual(self.recorder.counters, {"cache_hits": 2, "cache_misses": 4})
+        cache.invalidate(key)
+        self.assertEqual(cache.get_or_load(key, loader({"title": "D"})), {"title": "D"})
+        self.assertEqual(middleware.cache.Cache(max_bytes=1024, ttl=0).get_or_load(key, loader(1)), 1)
+
+    def test_revalidate(self):
+        cache = middleware.cache.Cache(max_bytes=1024, ttl=10)
+        article = {"urlTitle": "my-article", "version": "1"}
+        cache.get_or_load("article", lambda: article)
+        self.time += 10
+        self.assertIs(cache.get_or_load("article", lambda: None, revalidate=lambda value: value["version"] == "1"),
+                      article)
+        self.time += 5
+        self.assertIs(cache.get_or_load("article", lambda: None), article)  # TTL restarted
+        self.time += 5
+        self.assertEqual(cache.get_or_load("article", lambda: {"version": "2"}, revalidate=lambda value: False),
+                         {"version": "2"})
+
+    def test_lru(self):
+        cache = middleware.cache.Cache(max_bytes=100, ttl=10)
+        for i in range(3):
+            cache.get_or_load(str(i), lambda: "x" * 38)  # 40 bytes (encoded)
+        self.assertEqual(cache.size, 80)  # "0" evicted
+        cache.get_or_load("1", lambda: None)  # "1" is the most recently used now
+        cache.get_or_load("3", lambda: "y" * 38)
+        self.assertEqual(cache.get_or_load("1", lambda: "reloaded"), "x" * 38)
+        self.assertEqual(cache.get_or_load("2", lambda: "reloaded"), "reloaded")
+        cache.get_or_load("large", lambda: "z" * 200)  # larger than the cache, not cached
+        self.assertLessEqual(cache.size, 100)
+        cache.invalidate()
+        self.assertEqual(cache.size, 0)
+
+
+class TestMiddlewareArticleContent(unittest.TestCase):
+
+    def test_round_trip(self):
+        content = "## My article\n\n" + "Some words about the topic, and some more words. " * 100
+        attributes = middleware.article_content.attributes(content)
+        self.assertEqual(attributes["contentEncoding"], "zlib")
+        self.assertLess(len(attributes["content"]), len(content) / 4)
+        item = {"urlTitle": "my-article", **attributes}
+        self.assertEqual(middleware.article_content.decode(item), {"urlTitle": "my-article", "content": content})
+        # as returned by the boto3 Table resource
+        from boto3.dynamodb.types import Binary
+        item = {"content": Binary(attributes["content"]), "contentEncoding": "zlib"}
+        self.assertEqual(middleware.article_content.decode(item)["content"], content)
+
+    def test_plain(self):
+        self.assertEqual(middleware.article_content.attributes("Short"), {"content": "Short"})
+        self.assertEqual(middleware.article_content.encode(os.urandom(2048).hex()[:2048])[1], "zlib")
+        item = {"urlTitle": "my-article", "content": "Written before"}
+        self.assertEqual(middleware.article_content.decode(dict(item)), item)
+        with self.assertRaises(ValueError):
+            middleware.article_content.decode({"content": b"", "contentEncoding": "lz4"})
+
+
+class TestMiddlewareFields(unittest.TestCase):
+
+    def test_fields_decorator(self):
+        @middleware.fields(("title", "content", "version"))
+        def handler(event: middleware.Event, context, fields: middleware.Fields):
+            return fields
+
+        def request(fields_):
+            return handler(middleware.Event({"queryStringParameters": {"fields": fields_}}), None)
+
+        fields = request("title, version")
+        self.assertEqual(fields.projection("urlTitle", "version"), ["title", "urlTitle", "version"])
+        self.assertIn("title", fields)
+        self.assertNotIn("content", fields)
+        self.assertEqual(fields.select({"urlTitle": "my-article", "title": "T", "content": "C", "version": "1"}),
+                         {"urlTitle": "my-article", "title": "T", "version": "1"})
+        for invalid in ("title,collection", ""):
+            response = request(invalid)
+            self.assertEqual(response.status_code, 400)
+            self.assertEqual(response.error_messages[0][0], "Request validation failed")
+        fields = handler(middleware.Event({"queryStringParameters": None}), None)
+        self.assertIsNone(fields.projection("urlTitle"))
+        self.assertIn("content", fields)
+        self.assertEqual(fields.select({"content": "C"}), {"content": "C"})
+
+    def test_table_projection(self):
+        table = middleware.utils.wrap_boto3_dynamodb_table(TestMiddlewarePagination.Table(3))
+        list(table.iter_scan(projection=["name", "content"], FilterExpression="#n0 = :v0",
+                             ExpressionAttributeNames={"#n0": "tag"}))
+        request = table.requests[0]
+        self.assertEqual(request["ProjectionExpression"], "#p0, #p1")
+        self.assertEqual(request["ExpressionAttributeNames"], {"#n0": "tag", "#p0": "name", "#p1": "content"})
+        table.scan(projection=None)
+        self.assertNotIn("ProjectionExpression", table.requests[1])
+
+
+class TestMiddlewareWarmUp(unittest.TestCase):
+
+    class Client:
+
+        def __init__(self):
+            self.payloads = []
+            self.lock = threading.Lock()
+
+        def invoke(self, FunctionName, Payload):
+            with self.lock:
+                self.payloads.append(json.loads(Payload))
+                if len(self.payloads) == 3:
+                    raise RuntimeError("Test")
+            return {"StatusCode": 200}
+
+    def test_warm_up(self):
+        @middleware.middleware
+        def handler(event: middleware.Event, context):
+            self.fail("Handler executed")
+
+        calls = []
+
+        def failing_hook():
+            raise RuntimeError("Test")
+
+        with unittest.mock.patch.dict(middleware.warm_up._hooks, clear=True), \
+                unittest.mock.patch.object(middleware.metrics, "_cold_start", True), \
+                unittest.mock.patch("sys.stdout", new_callable=io.StringIO) as stdout, \
+                self.assertLogs(level="WARNING"):
+            middleware.warm_up.register("count", lambda: calls.append(1))
+            middleware.warm_up.register("count", lambda: self.fail("Registered twice"))
+            middleware.warm_up.register("fail", failing_hook)
+            response = handler({"warmUp": {"concurrency": 1, "hold": 0}}, None)
+            self.assertFalse(middleware.metrics.start("GET /").cold_start)  # the warm-up was the cold start
+            middleware.metrics.current = None
+        self.assertEqual(response, {"warmUp": {"coldStart": True, "containers": 1}})
+        self.assertEqual(calls, [1])
+        self.assertEqual(stdout.getvalue(), "")  # not recorded
+
+    def test_fan_out(self):
+        client = self.Client()
+        context = types.SimpleNamespace(invoked_function_arn="arn:aws:lambda:eu-central-1:1:function:f")
+        with unittest.mock.patch.object(middleware.warm_up, "_get_lambda_client", lambda n: client), \
+                self.assertLogs(level="WARNING"):
+            response = middleware.warm_up.handle({"warmUp": {"concurrency": 4, "hold": 10}}, context)
+            self.assertEqual(response["warmUp"]["containers"], 3)  # one invocation failed
+            self.assertEqual(client.payloads, [{"warmUp": {"concurrency": 1, "hold": 10}}] * 3)
+            response = middleware.warm_up.handle({"warmUp": {"concurrency": 1000, "hold": 0}}, context)
+        self.assertEqual(response["warmUp"]["containers"], middleware.warm_up.MAX_CONCURRENCY)
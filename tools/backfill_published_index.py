@@ -0,0 +1,49 @@
+"""Sets the publishedIndex partition key (collection="article") on articles created before the index existed
+
+Idempotent (conditional updates), afterwards disable article_collection_legacy_scan (stacks/production.py).
+run in project root dir: python tools/backfill_published_index.py TABLE_NAME [--dry-run]
+"""
+
+import sys
+import argparse
+import boto3
+import botocore.exceptions
+
+
+def backfill(table, dry_run: bool = False) -> int:
+    updated = 0
+    kwargs = {"ProjectionExpression": "urlTitle", "FilterExpression": "attribute_not_exists(#collection)",
+              "ExpressionAttributeNames": {"#collection": "collection"}}
+    while True:
+        response = table.scan(**kwargs)
+        for item in response["Items"]:
+            if not dry_run:
+                try:
+                    table.update_item(
+                        Key={"urlTitle": item["urlTitle"]},
+                        UpdateExpression="SET #collection=:collection",
+                        ConditionExpression="attribute_exists(urlTitle)",
+                        ExpressionAttributeNames={"#collection": "collection"},
+                        ExpressionAttributeValues={":collection": "article"}
+                    )
+                except botocore.exceptions.ClientError as e:
+                    if e.response["Error"]["Code"] != "ConditionalCheckFailedException":  # deleted meanwhile
+                        raise
+                    continue
+            updated += 1
+        if "LastEvaluatedKey" not in response:
+            return updated
+        kwargs["ExclusiveStartKey"] = response["LastEvaluatedKey"]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("table_name", help="Name of the article table")
+    parser.add_argument("--dry-run", action="store_true", help="Only count the articles to update")
+    args = parser.parse_args()
+    updated = backfill(boto3.resource("dynamodb").Table(args.table_name), args.dry_run)
+    sys.stdout.write(f"{'Would update' if args.dry_run else 'Updated'} {updated} articles\n")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,97 @@
+"""Benchmark: consumed capacity units of article reads/ writes with plain vs. compressed content (200 articles)
+
+The corpus resembles blog posts: markdown prose (Zipf distributed vocabulary, headings, lists) with code blocks taken
+from this repository's sources, lognormal sizes around 8 KB. Capacity units follow DynamoDB's item size rules
+(attribute names + values, binary by its raw size): reads in 4 KB units (eventually consistent: half), writes in 1 KB
+units - the same numbers DynamoDB reports as ConsumedCapacity for GetItem/ PutItem.
+run in project root dir: python -m tools.benchmarks.article_content
+"""
+
+import glob
+import math
+import random
+import sys
+import timeit
+from uuid import uuid4
+import backend.middleware as middleware
+
+N = 200
+
+
+def generate_corpus(n=N, seed=1):
+    rng = random.Random(seed)
+    syllables = ["ta", "ke", "ri", "on", "al", "de", "si", "mo", "ver", "lan", "pro", "ex", "ing", "tion", "er"]
+    vocabulary = ["".join(rng.choice(syllables) for _ in range(rng.randint(1, 4))) for _ in range(3000)]
+    weights = [1 / (rank + 1) for rank in range(len(vocabulary))]
+    code_samples = []
+    for path in sorted(glob.glob("backend/**/*.py", recursive=True)):
+        with open(path) as f:
+            lines = f.read().splitlines()
+        code_samples += ["\n".join(lines[i:i + 20]) for i in range(0, len(lines), 20)]
+
+    def sentence():
+        words = rng.choices(vocabulary, weights, k=rng.randint(6, 24))
+        return " ".join(words).capitalize() + rng.choice([".", ".", ".", "?", "!"])
+
+    articles = []
+    for i in range(n):
+        target = int(rng.lognormvariate(math.log(8000), 0.6))
+        parts = []
+        while sum(map(len, parts)) < target:
+            kind = rng.random()
+            if kind < 0.1:
+                parts.append("## " + sentence()[:-1])
+            elif kind < 0.25:
+                parts.append("```python\n" + rng.choice(code_samples) + "\n```")
+            elif kind < 0.35:
+                parts.append("\n".join("- " + sentence() for _ in range(rng.randint(2, 5))))
+            else:
+                parts.append(" ".join(sentence() for _ in range(rng.randint(2, 6))))
+        articles.append({
+            "urlTitle": f"my-article-{i}",
+            "title": sentence()[:60],
+            "tag": rng.choice(["python", "aws", "web", "misc"]),
+            "description": sentence(),
+            "content": "\n\n".join(parts),
+            "published": f"2021-{i % 12 + 1:02d}-{i % 28 + 1:02d}",
+            "collection": "article",
+            "version": uuid4().hex,
+        })
+    return articles
+
+
+def item_size(item: dict) -> int:
+    size = 0
+    for name, value in item.items():
+        size += len(name.encode())
+        size += len(value.encode()) if isinstance(value, str) else len(value)
+    return size
+
+
+def capacity(items):
+    """(read units eventually consistent, read units strongly consistent, write units) per item, summed"""
+    sizes = [item_size(item) for item in items]
+    strong = sum(math.ceil(size / 4096) for size in sizes)
+    return sum(math.ceil(size / 4096) / 2 for size in sizes), strong, sum(math.ceil(size / 1024) for size in sizes)
+
+
+def main():
+    articles = generate_corpus()
+    compressed = [{**article, **middleware.article_content.attributes(article["content"])} for article in articles]
+    sizes = sorted(item_size(article) for article in articles)
+    sys.stdout.write(f"corpus: {N} articles, item size median {sizes[N // 2]} B, max {sizes[-1]} B, "
+                     f"{sum(1 for item in compressed if 'contentEncoding' in item)} compressed\n")
+    for name, items in (("plain", articles), ("compressed", compressed)):
+        reads, strong_reads, writes = capacity(items)
+        sys.stdout.write(f"{name:<11} {sum(map(item_size, items)) / 1024:9.1f} KB  RCU (eventual) {reads:7.1f}  "
+                         f"RCU (strong) {strong_reads:5d}  WCU {writes:5d}\n")
+    encode = min(timeit.repeat(
+        lambda: [middleware.article_content.attributes(article["content"]) for article in articles],
+        number=1, repeat=3)) / N
+    decode = min(timeit.repeat(
+        lambda: [middleware.article_content.decode(dict(item)) for item in compressed], number=1, repeat=3)) / N
+    sys.stdout.write(f"per article: encode {encode * 1e3:.3f} ms, decode {decode * 1e3:.3f} ms\n")
+
+
+if __name__ == '__main__':
+    main()
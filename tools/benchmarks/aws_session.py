@@ -0,0 +1,70 @@
+"""Benchmark: per-table boto3 resources with the default config vs. the shared, tuned session/ resource
+
+Runs against a local DynamoDB stand-in (tools/benchmarks/dynamodb_stub.py), alternating GetItem calls on the article
+and comment table like a request touching both would.
+run in project root dir: python -m tools.benchmarks.aws_session
+"""
+
+import os
+import sys
+import time
+import statistics
+
+os.environ.setdefault("AWS_DEFAULT_REGION", "us-east-1")
+os.environ.setdefault("AWS_ACCESS_KEY_ID", "benchmark")
+os.environ.setdefault("AWS_SECRET_ACCESS_KEY", "benchmark")
+os.environ.setdefault("ArticleTableName", "Article")
+os.environ.setdefault("CommentTableName", "Comment")
+
+from tools.benchmarks.dynamodb_stub import DynamoDBStub  # noqa: E402
+
+N = 2000
+
+
+def before():
+    """What the table accessors did before: a new resource (own session, client, pool) per table"""
+    import boto3
+    return (boto3.resource("dynamodb").Table(os.environ["ArticleTableName"]),
+            boto3.resource("dynamodb").Table(os.environ["CommentTableName"]))
+
+
+def after():
+    import backend.middleware as middleware
+    return middleware.get_article_table(), middleware.get_comment_table()
+
+
+def run(setup):
+    start = time.perf_counter()
+    article_table, comment_table = setup()
+    setup_seconds = time.perf_counter() - start
+    latencies = []
+    for i in range(N):
+        start = time.perf_counter()
+        if i % 2:
+            comment_table.get_item(Key={"articleUrlTitle": "my-article", "id": "1"})
+        else:
+            article_table.get_item(Key={"urlTitle": "my-article"})
+        latencies.append(time.perf_counter() - start)
+    latencies = latencies[10:]  # warm path only
+    quantiles = statistics.quantiles(latencies, n=100)
+    return setup_seconds, quantiles[49], quantiles[98]
+
+
+def main():
+    tables = {
+        os.environ["ArticleTableName"]: ("urlTitle", None),
+        os.environ["CommentTableName"]: ("articleUrlTitle", "id"),
+    }
+    with DynamoDBStub(tables) as stub:
+        stub.load(os.environ["ArticleTableName"], [{"urlTitle": {"S": "my-article"}, "title": {"S": "My article"}}])
+        stub.load(os.environ["CommentTableName"],
+                  [{"articleUrlTitle": {"S": "my-article"}, "id": {"S": "1"}, "content": {"S": "Hi"}}])
+        os.environ["AWS_ENDPOINT_URL_DYNAMODB"] = stub.endpoint_url
+        for name, setup in (("per-table resources", before), ("shared resource", after)):
+            setup_seconds, p50, p99 = run(setup)
+            sys.stdout.write(f"{name:<22} setup {setup_seconds * 1e3:7.1f} ms   "
+                             f"get_item p50 {p50 * 1e3:6.3f} ms   p99 {p99 * 1e3:6.3f} ms\n")
+
+
+if __name__ == '__main__':
+    main()
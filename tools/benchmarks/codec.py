@@ -0,0 +1,58 @@
+"""Benchmark: encoding a GET /article response with 1,000 articles
+
+Items as returned by the boto3 resource layer (numbers as Decimal).
+run in project root dir: python -m tools.benchmarks.codec
+"""
+
+import sys
+import json
+import timeit
+from decimal import Decimal
+from uuid import uuid4
+import backend.middleware as middleware
+
+
+def generate_articles(n=1000):
+    return [
+        {
+            "urlTitle": "my-article-" + uuid4().hex,
+            "title": "My article " + uuid4().hex,
+            "tag": "test",
+            "description": "A very cool article " + uuid4().hex * 4,
+            "published": f"2021-{i % 12 + 1:02d}-{i % 28 + 1:02d}",
+            "readingTime": Decimal(i % 20 + 1)
+        }
+        for i in range(n)
+    ]
+
+
+def stdlib_with_pre_pass(body):
+    """What handlers had to do before: copy the items while converting Decimal, then json.dumps"""
+    def convert(value):
+        if isinstance(value, dict):
+            return {k: convert(v) for k, v in value.items()}
+        if isinstance(value, list):
+            return [convert(v) for v in value]
+        if isinstance(value, Decimal):
+            return int(value) if value == value.to_integral_value() else float(value)
+        return value
+    return json.dumps(convert(body))
+
+
+def main():
+    body = {"articles": generate_articles()}
+    candidates = [("json.dumps + pre-pass", stdlib_with_pre_pass)]
+    for name in ("json", "orjson"):
+        try:
+            codec = middleware.codec.get_codec(name)
+        except ValueError:
+            sys.stdout.write(f"codec '{name}' not installed, skipped\n")
+            continue
+        candidates.append((f"codec '{name}'", codec.dumps))
+    for name, dumps in candidates:
+        seconds = min(timeit.repeat(lambda: dumps(body), number=100, repeat=5)) / 100
+        sys.stdout.write(f"{name:<24} {seconds * 1e3:8.3f} ms/response\n")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,88 @@
+"""Benchmark: boto3 Table resource vs. LowLevelTable (low-level client + specialized deserializer), 10,000 items
+
+Deserialization alone (items as returned by the low-level client), and a full scan + JSON encoding of the article
+table served by a local DynamoDB stand-in (tools/benchmarks/dynamodb_stub.py).
+run in project root dir: python -m tools.benchmarks.dynamodb_client
+"""
+
+import os
+import sys
+import timeit
+
+os.environ.setdefault("AWS_DEFAULT_REGION", "us-east-1")
+os.environ.setdefault("AWS_ACCESS_KEY_ID", "benchmark")
+os.environ.setdefault("AWS_SECRET_ACCESS_KEY", "benchmark")
+os.environ.setdefault("ArticleTableName", "Article")
+os.environ.setdefault("CommentTableName", "Comment")
+
+from tools.benchmarks.dynamodb_stub import DynamoDBStub  # noqa: E402
+import backend.middleware as middleware  # noqa: E402
+
+N = 10000
+
+
+def generate_articles(n=N):
+    return [
+        {
+            "urlTitle": {"S": f"my-article-{i}"},
+            "title": {"S": f"My article {i}"},
+            "tag": {"S": "test"},
+            "description": {"S": "A very cool article " * 4},
+            "published": {"S": f"2021-{i % 12 + 1:02d}-{i % 28 + 1:02d}"},
+            "readingTime": {"N": str(i % 20 + 1)},
+        }
+        for i in range(n)
+    ]
+
+
+def generate_comments(n=N):
+    return [
+        {
+            "articleUrlTitle": {"S": "my-article"},
+            "id": {"S": f"2021-01-01T00:00:{i:06d}"},
+            "author": {"S": "Julius"},
+            "content": {"S": "A comment " * 8},
+            "resps": {"M": {
+                f"2021-01-02T00:00:{j:06d}": {"M": {"author": {"S": "Someone"}, "content": {"S": "A response"}}}
+                for j in range(i % 3)
+            }},
+        }
+        for i in range(n)
+    ]
+
+
+def timed(fn, number=5):
+    return min(timeit.repeat(fn, number=number, repeat=3)) / number
+
+
+def main():
+    from boto3.dynamodb.types import TypeDeserializer
+    type_deserializer = TypeDeserializer()
+
+    def boto3_deserialize(items):
+        return [{name: type_deserializer.deserialize(value) for name, value in item.items()} for item in items]
+
+    for shape, items in (("articles", generate_articles()), ("comments", generate_comments())):
+        for name, deserialize in (("boto3 TypeDeserializer", boto3_deserialize),
+                                  ("deserialize_item", lambda items: list(map(middleware.utils.deserialize_item,
+                                                                              items)))):
+            seconds = timed(lambda: deserialize(items))
+            sys.stdout.write(f"deserialize {shape:<9} {name:<24} {seconds * 1e3:8.2f} ms\n")
+
+    table_name = os.environ["ArticleTableName"]
+    with DynamoDBStub({table_name: ("urlTitle", None)}) as stub:
+        stub.load(table_name, generate_articles())
+        os.environ["AWS_ENDPOINT_URL_DYNAMODB"] = stub.endpoint_url
+        for name, low_level in (("Table resource", False), ("LowLevelTable", True)):
+            table = middleware.get_article_table(low_level=low_level)
+
+            def scan_and_encode():
+                articles = table.scan_paginate_items(ProjectionExpression="urlTitle,title,description,tag,published")
+                return middleware.codec.dumps({"articles": articles})
+            scan_and_encode()
+            seconds = timed(scan_and_encode, number=3)
+            sys.stdout.write(f"scan + encode {N} articles {name:<15} {seconds * 1e3:8.2f} ms\n")
+
+
+if __name__ == '__main__':
+    main()
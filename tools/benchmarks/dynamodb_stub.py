@@ -0,0 +1,329 @@
+"""Local DynamoDB stand-in for benchmarks: an in-memory, single-process HTTP server speaking the DynamoDB JSON protocol
+
+Supports what the benchmarks and tests need: GetItem, PutItem, DeleteItem, UpdateItem (SET/ REMOVE/ ADD of top-level
+attributes), conditions of these writes (comparisons and attribute_(not_)exists joined by AND/ OR), Query (partition
+key equality, begins_with on the sort key, ScanIndexForward, Limit, ExclusiveStartKey, IndexName), Scan (Limit,
+ExclusiveStartKey, Segment/ TotalSegments), BatchGetItem, BatchWriteItem. Items are stored in the low-level attribute
+value format. Consumed capacity is reported if requested. Like DynamoDB, expressions that use a reserved word as
+attribute name are rejected (ValidationException).
+
+    with DynamoDBStub({"Article": ("urlTitle", None)}, {"publishedIndex": ("Article", "collection", "published")}) as stub:
+        os.environ["AWS_ENDPOINT_URL_DYNAMODB"] = stub.endpoint_url
+"""
+
+import re
+import json
+import math
+import operator
+import threading
+import http.server
+from typing import Dict, Optional, Tuple
+
+MAX_PAGE_SIZE = 1024 * 1024  # like DynamoDB: pages are limited to 1 MB
+EXPRESSIONS = ["ProjectionExpression", "KeyConditionExpression", "FilterExpression", "ConditionExpression",
+               "UpdateExpression"]
+# https://docs.aws.amazon.com/amazondynamodb/latest/developerguide/ReservedWords.html
+RESERVED_WORDS = frozenset("""
+ABORT ABSOLUTE ACTION ADD AFTER AGENT AGGREGATE ALL ALLOCATE ALTER ANALYZE AND ANY ARCHIVE ARE ARRAY AS ASC ASCII
+ASENSITIVE ASSERTION ASYMMETRIC AT ATOMIC ATTACH ATTRIBUTE AUTH AUTHORIZATION AUTHORIZE AUTO AVG BACK BACKUP BASE BATCH
+BEFORE BEGIN BETWEEN BIGINT BINARY BIT BLOB BLOCK BOOLEAN BOTH BREADTH BUCKET BULK BY BYTE CALL CALLED CALLING CAPACITY
+CASCADE CASCADED CASE CAST CATALOG CHAR CHARACTER CHECK CLASS CLOB CLOSE CLUSTER CLUSTERED CLUSTERING CLUSTERS COALESCE
+COLLATE COLLATION COLLECTION COLUMN COLUMNS COMBINE COMMENT COMMIT COMPACT COMPILE COMPRESS CONDITION CONFLICT CONNECT
+CONNECTION CONSISTENCY CONSISTENT CONSTRAINT CONSTRAINTS CONSTRUCTOR CONSUMED CONTINUE CONVERT COPY CORRESPONDING COUNT
+COUNTER CREATE CROSS CUBE CURRENT CURSOR CYCLE DATA DATABASE DATE DATETIME DAY DEALLOCATE DEC DECIMAL DECLARE DEFAULT
+DEFERRABLE DEFERRED DEFINE DEFINED DEFINITION DELETE DELIMITED DEPTH DEREF DESC DESCRIBE DESCRIPTOR DETACH DETERMINISTIC
+DIAGNOSTICS DIRECTORIES DISABLE DISCONNECT DISTINCT DISTRIBUTE DO DOMAIN DOUBLE DROP DUMP DURATION DYNAMIC EACH ELEMENT
+ELSE ELSEIF EMPTY ENABLE END EQUAL EQUALS ERROR ESCAPE ESCAPED EVAL EVALUATE EXCEEDED EXCEPT EXCEPTION EXCEPTIONS
+EXCLUSIVE EXEC EXECUTE EXISTS EXIT EXPLAIN EXPLODE EXPORT EXPRESSION EXTENDED EXTERNAL EXTRACT FAIL FALSE FAMILY FETCH
+FIELDS FILE FILTER FILTERING FINAL FINISH FIRST FIXED FLATTERN FLOAT FOR FORCE FOREIGN FORMAT FORWARD FOUND FREE FROM
+FULL FUNCTION FUNCTIONS GENERAL GENERATE GET GLOB GLOBAL GO GOTO GRANT GREATER GROUP GROUPING HANDLER HASH HAVE HAVING
+HEAP HIDDEN HOLD HOUR IDENTIFIED IDENTITY IF IGNORE IMMEDIATE IMPORT IN INCLUDING INCLUSIVE INCREMENT INCREMENTAL INDEX
+INDEXED INDEXES INDICATOR INFINITE INITIALLY INLINE INNER INNTER INOUT INPUT INSENSITIVE INSERT INSTEAD INT INTEGER
+INTERSECT INTERVAL INTO INVALIDATE IS ISOLATION ITEM ITEMS ITERATE JOIN KEY KEYS LAG LANGUAGE LARGE LAST LATERAL LEAD
+LEADING LEAVE LEFT LENGTH LESS LEVEL LIKE LIMIT LIMITED LINES LIST LOAD LOCAL LOCALTIME LOCALTIMESTAMP LOCATION LOCATOR
+LOCK LOCKS LOG LOGED LONG LOOP LOWER MAP MATCH MATERIALIZED MAX MAXLEN MEMBER MERGE METHOD METRICS MIN MINUS MINUTE
+MISSING MOD MODE MODIFIES MODIFY MODULE MONTH MULTI MULTISET NAME NAMES NATIONAL NATURAL NCHAR NCLOB NEW NEXT NO NONE
+NOT NULL NULLIF NUMBER NUMERIC OBJECT OF OFFLINE OFFSET OLD ON ONLINE ONLY OPAQUE OPEN OPERATOR OPTION OR ORDER
+ORDINALITY OTHER OTHERS OUT OUTER OUTPUT OVER OVERLAPS OVERRIDE OWNER PAD PARALLEL PARAMETER PARAMETERS PARTIAL
+PARTITION PARTITIONED PARTITIONS PATH PERCENT PERCENTILE PERMISSION PERMISSIONS PIPE PIPELINED PLAN POOL POSITION
+PRECISION PREPARE PRESERVE PRIMARY PRIOR PRIVATE PRIVILEGES PROCEDURE PROCESSED PROJECT PROJECTION PROPERTY
+PROVISIONING PUBLIC PUT QUERY QUIT QUORUM RAISE RANDOM RANGE RANK RAW READ READS REAL REBUILD RECORD RECURSIVE REDUCE
+REF REFERENCE REFERENCES REFERENCING REGEXP REGION REINDEX RELATIVE RELEASE REMAINDER RENAME REPEAT REPLACE REQUEST
+RESET RESIGNAL RESOURCE RESPONSE RESTORE RESTRICT RESULT RETURN RETURNING RETURNS REVERSE REVOKE RIGHT ROLE ROLES
+ROLLBACK ROLLUP ROUTINE ROW ROWS RULE RULES SAMPLE SATISFIES SAVE SAVEPOINT SCAN SCHEMA SCOPE SCROLL SEARCH SECOND
+SECTION SEGMENT SEGMENTS SELECT SELF SEMI SENSITIVE SEPARATE SEQUENCE SERIALIZABLE SESSION SET SETS SHARD SHARE SHARED
+SHORT SHOW SIGNAL SIMILAR SIZE SKEWED SMALLINT SNAPSHOT SOME SOURCE SPACE SPACES SPARSE SPECIFIC SPECIFICTYPE SPLIT SQL
+SQLCODE SQLERROR SQLEXCEPTION SQLSTATE SQLWARNING START STATE STATIC STATUS STORAGE STORE STORED STREAM STRING STRUCT
+STYLE SUB SUBMULTISET SUBPARTITION SUBSTRING SUBTYPE SUM SUPER SYMMETRIC SYNONYM SYSTEM TABLE TABLESAMPLE TEMP
+TEMPORARY TERMINATED TEXT THAN THEN THROUGHPUT TIME TIMESTAMP TIMEZONE TINYINT TO TOKEN TOTAL TOUCH TRAILING
+TRANSACTION TRANSFORM TRANSLATE TRANSLATION TREAT TRIGGER TRIM TRUE TRUNCATE TTL TUPLE TYPE UNDER UNDO UNION UNIQUE
+UNIT UNKNOWN UNLOGGED UNNEST UNPROCESSED UNSIGNED UNTIL UPDATE UPPER URL USAGE USE USER USERS USING UUID VACUUM VALUE
+VALUED VALUES VARCHAR VARIABLE VARIANCE VARINT VARYING VIEW VIEWS VIRTUAL VOID WAIT WHEN WHENEVER WHERE WHILE WINDOW
+WITH WITHIN WITHOUT WORK WRAPPED WRITE YEAR ZONE
+""".split())
+_SYNTAX = frozenset(["SET", "REMOVE", "ADD", "DELETE", "AND", "OR", "NOT", "BETWEEN", "IN"])
+_NAME = re.compile(r"(?<![#:\w])([A-Za-z_]\w*)\b(?!\s*\()")  # attribute names (not placeholders, functions)
+_COMPARISONS = {"=": operator.eq, "<>": operator.ne, "<=": operator.le, ">=": operator.ge, "<": operator.lt,
+                ">": operator.gt}
+
+
+def _value(attribute_value: dict):
+    (type_, value), = attribute_value.items()
+    return value if type_ != "N" else float(value)
+
+
+def _size(item: dict) -> int:
+    return len(json.dumps(item))
+
+
+def _error(type_: str, message: str) -> dict:
+    return {"__type": f"com.amazonaws.dynamodb.v20120810#{type_}", "message": message}
+
+
+def _reserved_word_error(request: dict) -> Optional[dict]:
+    for expression in EXPRESSIONS:
+        for name in _NAME.findall(request.get(expression, "")):
+            if name.upper() in RESERVED_WORDS and name.upper() not in _SYNTAX:
+                return _error("ValidationException", f"Invalid {expression}: Attribute name is a reserved keyword; "
+                                                     f"reserved keyword: {name}")
+    return None
+
+
+def _condition(expression: str, item: dict, names: dict, values: dict) -> bool:
+    """Evaluates comparisons and attribute_exists/ attribute_not_exists, joined by AND/ OR (left to right)"""
+    result, join = None, None
+    for term in re.split(r"\s+(AND|OR)\s+", expression.strip()):
+        if term in ("AND", "OR"):
+            join = term
+            continue
+        function = re.fullmatch(r"(attribute_exists|attribute_not_exists)\(\s*(\S+?)\s*\)", term)
+        if function:
+            exists = names.get(function.group(2), function.group(2)) in item
+            value = exists if function.group(1) == "attribute_exists" else not exists
+        else:
+            name, comparison, placeholder = re.fullmatch(r"(\S+?)\s*(<>|<=|>=|=|<|>)\s*(\S+)", term).groups()
+            name = names.get(name, name)
+            value = name in item and _COMPARISONS[comparison](_value(item[name]), _value(values[placeholder]))
+        result = value if result is None else (result and value if join == "AND" else result or value)
+    return result
+
+
+class _Table:
+
+    def __init__(self, partition_key: str, sort_key: Optional[str]):
+        self.partition_key = partition_key
+        self.sort_key = sort_key
+        self.items: Dict[tuple, dict] = {}
+
+    def key(self, item: dict) -> tuple:
+        if self.sort_key is None:
+            return _value(item[self.partition_key]),
+        return _value(item[self.partition_key]), _value(item[self.sort_key])
+
+    def key_attributes(self, item: dict) -> dict:
+        names = [self.partition_key] + ([self.sort_key] if self.sort_key else [])
+        return {name: item[name] for name in names}
+
+
+class DynamoDBStub:
+
+    def __init__(self, tables: Dict[str, Tuple[str, Optional[str]]],
+                 indexes: Optional[Dict[str, Tuple[str, str, Optional[str]]]] = None):
+        """tables: name -> (partition key, sort key), indexes: name -> (table name, partition key, sort key)"""
+        self.tables = {name: _Table(*keys) for name, keys in tables.items()}
+        self.indexes = {name: (table_name, _Table(*keys)) for name, (table_name, *keys) in (indexes or {}).items()}
+        stub = self
+
+        class Handler(http.server.BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"  # keep-alive
+            disable_nagle_algorithm = True
+
+            def do_POST(self):
+                request = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+                operation = self.headers["X-Amz-Target"].split(".")[1]
+                status, response = 200, _reserved_word_error(request) or getattr(stub, operation)(request)
+                if "__type" in response:
+                    status = 400
+                data = json.dumps(response).encode()
+                self.send_response(status)
+                self.send_header("Content-Type", "application/x-amz-json-1.0")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def log_message(self, *args):
+                pass
+
+        self.server = http.server.ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.server.daemon_threads = True
+        self.endpoint_url = f"http://127.0.0.1:{self.server.server_address[1]}"
+        self._thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.server.shutdown()
+        self.server.server_close()
+
+    # helpers
+
+    def load(self, table_name: str, items):
+        table = self.tables[table_name]
+        for item in items:
+            table.items[table.key(item)] = item
+
+    @staticmethod
+    def _capacity(request: dict, table_name: str, size: int, write: bool = False) -> dict:
+        if request.get("ReturnConsumedCapacity", "NONE") == "NONE":
+            return {}
+        units = math.ceil(size / 1024) if write else math.ceil(size / 4096) / 2  # eventually consistent reads
+        return {"ConsumedCapacity": {"TableName": table_name, "CapacityUnits": max(units, 0.5 if not write else 1)}}
+
+    @staticmethod
+    def _project(request: dict, item: dict) -> dict:
+        if "ProjectionExpression" not in request:
+            return item
+        names = request.get("ExpressionAttributeNames", {})
+        attributes = [names.get(name.strip(), name.strip()) for name in request["ProjectionExpression"].split(",")]
+        return {name: item[name] for name in attributes if name in item}
+
+    def _page(self, request: dict, table_name: str, items: list, index: Optional[_Table] = None) -> dict:
+        table = self.tables[table_name]
+        start = request.get("ExclusiveStartKey")
+        if start is not None:
+            start_key = table.key(start)
+            keys = [table.key(item) for item in items]
+            if start_key in keys:
+                items = items[keys.index(start_key) + 1:]
+            else:  # a position between items (like DynamoDB, the key doesn't have to exist)
+                forward = request.get("ScanIndexForward", True)
+                items = [item for item, key in zip(items, keys) if (key > start_key if forward else key < start_key)]
+        limit = request.get("Limit", math.inf)
+        page, size = [], 0
+        for item in items:
+            if len(page) >= limit or size >= MAX_PAGE_SIZE:
+                break
+            page.append(item)
+            size += _size(item)
+        page = [self._project(request, item) for item in page]
+        response = {"Items": page, "Count": len(page), "ScannedCount": len(page),
+                    **self._capacity(request, table_name, size)}
+        if len(page) < len(items):
+            last = items[len(page) - 1]
+            response["LastEvaluatedKey"] = {**table.key_attributes(last),
+                                            **(index.key_attributes(last) if index else {})}
+        return response
+
+    # operations
+
+    def DescribeTable(self, request):
+        table = self.tables[request["TableName"]]
+        return {"Table": {"TableName": request["TableName"], "TableStatus": "ACTIVE", "ItemCount": len(table.items)}}
+
+    def GetItem(self, request):
+        table = self.tables[request["TableName"]]
+        item = table.items.get(table.key(request["Key"]))
+        response = self._capacity(request, request["TableName"], _size(item) if item else 1)
+        if item is not None:
+            response["Item"] = self._project(request, item)
+        return response
+
+    def _condition_failed(self, request, key: dict) -> Optional[dict]:
+        """The error response if the request's ConditionExpression fails on the stored item (None if it holds)"""
+        table = self.tables[request["TableName"]]
+        if "ConditionExpression" in request and not _condition(
+                request["ConditionExpression"], table.items.get(table.key(key), {}),
+                request.get("ExpressionAttributeNames", {}), request.get("ExpressionAttributeValues", {})):
+            return _error("ConditionalCheckFailedException", "The conditional request failed")
+        return None
+
+    def PutItem(self, request):
+        failed = self._condition_failed(request, request["Item"])
+        if failed:
+            return failed
+        self.load(request["TableName"], [request["Item"]])
+        return self._capacity(request, request["TableName"], _size(request["Item"]), write=True)
+
+    def DeleteItem(self, request):
+        failed = self._condition_failed(request, request["Key"])
+        if failed:
+            return failed
+        table = self.tables[request["TableName"]]
+        item = table.items.pop(table.key(request["Key"]), None)
+        return self._capacity(request, request["TableName"], _size(item) if item else 1, write=True)
+
+    def UpdateItem(self, request):
+        table = self.tables[request["TableName"]]
+        key = table.key(request["Key"])
+        names = request.get("ExpressionAttributeNames", {})
+        values = request.get("ExpressionAttributeValues", {})
+        item = dict(table.items.get(key, request["Key"]))
+        failed = self._condition_failed(request, request["Key"])
+        if failed:
+            return failed
+        for action, clause in re.findall(r"(SET|REMOVE|ADD)\s+(.*?)(?=\s+(?:SET|REMOVE|ADD)\s|$)",
+                                         request["UpdateExpression"].strip()):
+            for part in clause.split(","):
+                if action == "REMOVE":
+                    item.pop(names.get(part.strip(), part.strip()), None)
+                    continue
+                name, placeholder = re.split(r"\s*=\s*|\s+", part.strip())
+                name = names.get(name, name)
+                if action == "SET":
+                    item[name] = values[placeholder]
+                else:
+                    total = (_value(item[name]) if name in item else 0) + _value(values[placeholder])
+                    item[name] = {"N": str(int(total) if total == int(total) else total)}
+        table.items[key] = item
+        return self._capacity(request, request["TableName"], _size(item), write=True)
+
+    def Query(self, request):
+        table = self.tables[request["TableName"]]
+        values = request.get("ExpressionAttributeValues", {})
+        partition_value = _value(values[re.search(r"=\s*(:\w+)", request["KeyConditionExpression"]).group(1)])
+        begins_with = re.search(r"begins_with\(\s*\S+?\s*,\s*(:\w+)\s*\)", request["KeyConditionExpression"])
+        prefix = _value(values[begins_with.group(1)]) if begins_with else ""
+        if "IndexName" in request:
+            _, index = self.indexes[request["IndexName"]]
+            items = sorted((item for item in table.items.values() if index.partition_key in item
+                            and _value(item[index.partition_key]) == partition_value),
+                           key=lambda item: (index.key(item), table.key(item)),
+                           reverse=not request.get("ScanIndexForward", True))
+            return self._page(request, request["TableName"], items, index)
+        items = sorted((item for key, item in table.items.items()
+                        if key[0] == partition_value and (not prefix or key[1].startswith(prefix))),
+                       key=table.key, reverse=not request.get("ScanIndexForward", True))
+        return self._page(request, request["TableName"], items)
+
+    def Scan(self, request):
+        table = self.tables[request["TableName"]]
+        items = sorted(table.items.values(), key=table.key)
+        if "TotalSegments" in request:
+            segment, total = request["Segment"], request["TotalSegments"]
+            items = [item for i, item in enumerate(items) if i % total == segment]
+        return self._page(request, request["TableName"], items)
+
+    def BatchGetItem(self, request):
+        responses, capacity = {}, []
+        for table_name, keys_and_attributes in request["RequestItems"].items():
+            table = self.tables[table_name]
+            items = [table.items[table.key(key)] for key in keys_and_attributes["Keys"]
+                     if table.key(key) in table.items]
+            responses[table_name] = items
+            capacity.append(self._capacity(request, table_name, sum(map(_size, items))).get("ConsumedCapacity"))
+        response = {"Responses": responses, "UnprocessedKeys": {}}
+        if capacity[0] is not None:
+            response["ConsumedCapacity"] = capacity
+        return response
+
+    def BatchWriteItem(self, request):
+        for table_name, write_requests in request["RequestItems"].items():
+            table = self.tables[table_name]
+            for write_request in write_requests:
+                if "PutRequest" in write_request:
+                    self.load(table_name, [write_request["PutRequest"]["Item"]])
+                else:
+                    table.items.pop(table.key(write_request["DeleteRequest"]["Key"]), None)
+        return {"UnprocessedItems": {}}
@@ -0,0 +1,75 @@
+"""Microbenchmark: per-invocation cost of mapping an API Gateway event for GET routes
+
+Compares the lazy middleware.Event with the previous, eager mapping.
+run in project root dir: python -m tools.benchmarks.event
+"""
+
+import sys
+import json
+import timeit
+import tracemalloc
+import urllib.parse
+import backend.middleware as middleware
+from tests.unit.middleware.testing_data import middleware_raw_event
+
+
+class EagerEvent:
+    """Previous Event implementation (reference)"""
+
+    def __init__(self, event: dict):
+        self.ressource = event.get("resource")
+        self.path = event.get("path")
+        self.method = event.get("httpMethod")
+        self.headers = event.get("headers") or {}
+        self.multi_value_headers = event.get("multiValueHeaders") or {}
+        self.query_string_parameters = self._unquote(event.get("queryStringParameters") or {})
+        self.multi_value_query_string_parameters = event.get("multiValueQueryStringParameters") or {}
+        self.path_parameters = self._unquote(event.get("pathParameters") or {})
+        self.stage_variables = event.get("stageVariables") or {}
+        self.request_context = event.get("requestContext") or {}
+        try:
+            self.body = json.loads(event.get("body")) if type(event.get("body")) is str else None
+        except json.decoder.JSONDecodeError:
+            self.body = None
+        self.is_base_64_encoded = event.get("isBase64Encoded")
+
+    @staticmethod
+    def _unquote(dict_: dict):
+        for key in dict_:
+            dict_[key] = urllib.parse.unquote(dict_[key])
+        return dict_
+
+
+def get_collection(event_cls):
+    """GET /article, GET /tag: the handler doesn't read the event"""
+    event_cls(middleware_raw_event)
+
+
+def get_item(event_cls):
+    """GET /article/{articleUrlTitle}: the handler reads a path parameter"""
+    event_cls(middleware_raw_event).path_parameters.get("user")
+
+
+def measure(fn, event_cls, number=100_000):
+    seconds = min(timeit.repeat(lambda: fn(event_cls), number=number, repeat=5)) / number
+    tracemalloc.start()
+    fn(event_cls)
+    tracemalloc.reset_peak()
+    before = tracemalloc.get_traced_memory()[0]
+    fn(event_cls)
+    peak = tracemalloc.get_traced_memory()[1] - before
+    tracemalloc.stop()
+    return seconds, peak
+
+
+def main():
+    for fn in (get_collection, get_item):
+        sys.stdout.write(f"{fn.__name__}: {fn.__doc__}\n")
+        for event_cls in (EagerEvent, middleware.Event):
+            seconds, peak = measure(fn, event_cls)
+            sys.stdout.write(f"  {event_cls.__name__:<12} {seconds * 1e6:8.2f} us/invocation  "
+                             f"{peak:6d} B peak allocated\n")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,76 @@
+"""Import-time (cold start) profile of each Lambda function in backend/lambda_functions/
+
+Each handler module is imported in a fresh interpreter (python -X importtime).
+run in project root dir: python -m tools.benchmarks.import_time [--top N]
+"""
+
+import os
+import sys
+import json
+import argparse
+import tempfile
+import subprocess
+from typing import List
+
+LAMBDA_FUNCTIONS_DIR = "backend/lambda_functions"
+
+_measure = """
+import sys, time, json, importlib
+start = time.perf_counter()
+importlib.import_module(sys.argv[1])
+seconds = time.perf_counter() - start
+sys.stdout.write(json.dumps({"seconds": seconds, "modules": sorted(sys.modules)}))
+"""
+
+
+def get_lambda_functions() -> List[str]:
+    return sorted(name for name in os.listdir(LAMBDA_FUNCTIONS_DIR)
+                  if os.path.isfile(os.path.join(LAMBDA_FUNCTIONS_DIR, name, "lambda_function.py")))
+
+
+def profile(name: str) -> dict:
+    """Imports the handler module of the Lambda function in a new interpreter
+
+    Returns {"seconds": import time, "modules": imported modules, "imports": [(cumulative us, top-level module)]}
+    """
+    with tempfile.NamedTemporaryFile("w", suffix=".json") as admin_key_file:
+        json.dump({"blog-backend-admin-key": "import-time-profile"}, admin_key_file)  # keeps the prefetch local
+        admin_key_file.flush()
+        env = {
+            **os.environ,
+            "PYTHONPATH": os.getcwd(),
+            "AWS_DEFAULT_REGION": os.environ.get("AWS_DEFAULT_REGION", "eu-central-1"),
+            "ArticleTableName": "Article",
+            "CommentTableName": "Comment",
+            "CatalogTableName": "Catalog",
+            "AdminKeyFile": admin_key_file.name,
+        }
+        process = subprocess.run(
+            [sys.executable, "-X", "importtime", "-c", _measure, f"backend.lambda_functions.{name}.lambda_function"],
+            env=env, capture_output=True, text=True, check=True)
+    result = json.loads(process.stdout)
+    imports = []
+    for line in process.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, module = line[len("import time:"):].split("|")
+        if not module.startswith("  "):  # top-level imports only
+            imports.append((int(cumulative), module.strip()))
+    result["imports"] = sorted(imports, reverse=True)
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--top", type=int, default=5, help="Number of top-level imports listed per function")
+    args = parser.parse_args()
+    for name in get_lambda_functions():
+        result = profile(name)
+        heavy = [module for module in ("boto3", "pydantic") if module in result["modules"]]
+        sys.stdout.write(f"{name:<28} {result['seconds'] * 1000:8.1f} ms  (imports: {', '.join(heavy) or '-'})\n")
+        for cumulative, module in result["imports"][:args.top]:
+            sys.stdout.write(f"    {cumulative / 1000:8.1f} ms  {module}\n")
+
+
+if __name__ == '__main__':
+    main()
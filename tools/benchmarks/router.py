@@ -0,0 +1,164 @@
+"""Benchmark: cold start rate and latency percentiles of per-route functions vs. the single-function router
+
+Simulates a week of blog traffic (Poisson arrivals per route, see TRAFFIC) against Lambda's container pools: a request
+takes an idle container of its function or starts a new one, idle containers are reclaimed after 5-15 minutes.
+Init costs are measured here: the import time of each handler module in a fresh interpreter, and for the router the
+import of a route's module in a container that already serves other routes. Imports are CPU bound, so they are scaled
+with Lambda's CPU share (1 vCPU at 1769 MB), plus a fixed runtime init.
+run in project root dir: python -m tools.benchmarks.router [--hours H] [--runtime-init-ms MS]
+"""
+
+import os
+import sys
+import json
+import random
+import argparse
+import tempfile
+import subprocess
+from typing import Dict, List
+from backend.lambda_functions.router.lambda_function import ROUTES
+
+# requests per hour, warm handler duration (median ms)
+TRAFFIC = {
+    "GET /article/{articleUrlTitle}": (120, 25),
+    "GET /article": (40, 30),
+    "GET /article/{articleUrlTitle}/comments": (100, 20),
+    "GET /tag": (15, 15),
+    "GET /tag/{tagName}": (10, 25),
+    "POST /article/{articleUrlTitle}/comments": (2, 40),
+    "POST /article/{articleUrlTitle}/comments/{commentId}/resps": (1, 40),
+    "DELETE /article/{articleUrlTitle}/comments/{commentId}": (0.1, 45),
+    "DELETE /article/{articleUrlTitle}/comments/{commentId}/resps/{respId}": (0.05, 40),
+    "POST /admin-login": (0.2, 10),
+    "POST /article": (0.05, 60),
+    "PATCH /article/{articleUrlTitle}": (0.1, 60),
+    "DELETE /article/{articleUrlTitle}": (0.02, 60),
+    "POST /article-import": (0.01, 900),
+}
+# (the bulk import's own duration would dominate their p99)
+LOW_TRAFFIC = [route for route, (rate, _) in TRAFFIC.items() if rate < 1 and route != "POST /article-import"]
+FULL_CPU_MEMORY_SIZE = 1769
+
+_measure = """
+import sys, time, json, importlib
+seconds = []
+for name in sys.argv[1:]:
+    start = time.perf_counter()
+    importlib.import_module(f"backend.lambda_functions.{name}.lambda_function")
+    seconds.append(time.perf_counter() - start)
+sys.stdout.write(json.dumps(seconds))
+"""
+
+
+def import_seconds(names: List[str]) -> List[float]:
+    """Imports the handler modules one after another in a new interpreter, returns the import time of each"""
+    with tempfile.NamedTemporaryFile("w", suffix=".json") as admin_key_file:
+        json.dump({"blog-backend-admin-key": "router-benchmark"}, admin_key_file)  # keeps the prefetch local
+        admin_key_file.flush()
+        env = {
+            **os.environ,
+            "PYTHONPATH": os.getcwd(),
+            "AWS_DEFAULT_REGION": os.environ.get("AWS_DEFAULT_REGION", "eu-central-1"),
+            "ArticleTableName": "Article",
+            "CommentTableName": "Comment",
+            "CatalogTableName": "Catalog",
+            "AdminKeyFile": admin_key_file.name,
+        }
+        process = subprocess.run([sys.executable, "-c", _measure, *names], env=env, capture_output=True, text=True,
+                                 check=True)
+    return json.loads(process.stdout)
+
+
+def measure_init(repeat: int = 3) -> Dict[str, Dict[str, float]]:
+    """Per handler: "alone" (import in a new interpreter) and "incremental" (after all other handlers), seconds"""
+    names = sorted(set(ROUTES.values()))
+    init = {}
+    for name in names:
+        alone = min(import_seconds([name])[0] for _ in range(repeat))
+        others = [other for other in names if other != name]
+        incremental = min(import_seconds([*others, name])[-1] for _ in range(repeat))
+        init[name] = {"alone": alone, "incremental": incremental}
+    init["router"] = {"alone": min(import_seconds(["router"])[0] for _ in range(repeat))}
+    return init
+
+
+def cpu_scale(memory_size: int) -> float:
+    return max(1.0, FULL_CPU_MEMORY_SIZE / memory_size)
+
+
+def simulate(init: dict, single_function: bool, memory_size: int, hours: float, runtime_init: float,
+             seed: int = 1) -> dict:
+    """Returns the latencies (ms) per route and the number of cold starts/ route inits (router: first request of a
+    route in a running container)
+    """
+    rng = random.Random(seed)
+    arrivals = []
+    for route, (rate, _) in TRAFFIC.items():
+        t = rng.expovariate(rate / 3600)
+        while t < hours * 3600:
+            arrivals.append((t, route))
+            t += rng.expovariate(rate / 3600)
+    arrivals.sort()
+    scale = cpu_scale(memory_size)
+    pools = {}  # function -> containers: [busy until, idle until, loaded routes]
+    latencies = {route: [] for route in TRAFFIC}
+    cold_starts = route_inits = 0
+    for t, route in arrivals:
+        name = ROUTES[route]
+        pool = pools.setdefault("router" if single_function else name, [])
+        pool[:] = [container for container in pool if container[0] > t or container[1] > t]
+        idle = [container for container in pool if container[0] <= t]
+        duration = rng.lognormvariate(0, 0.4) * TRAFFIC[route][1]
+        if idle:
+            container = max(idle, key=lambda c: c[0])  # the most recently used one
+        else:
+            cold_starts += 1
+            container = [t, t, set()]
+            pool.append(container)
+            duration += runtime_init
+            if single_function:
+                duration += init["router"]["alone"] * 1000 * scale
+        if name not in container[2]:
+            if container[2]:
+                route_inits += 1
+                duration += init[name]["incremental"] * 1000 * scale
+            else:
+                duration += init[name]["alone"] * 1000 * scale
+            container[2].add(name)
+        container[0] = t + duration / 1000
+        container[1] = container[0] + rng.uniform(300, 900)
+        latencies[route].append(duration)
+    return {"latencies": latencies, "cold_starts": cold_starts, "route_inits": route_inits,
+            "requests": len(arrivals)}
+
+
+def percentile(values: List[float], p: float) -> float:
+    values = sorted(values)
+    return values[min(len(values) - 1, int(p / 100 * len(values)))] if values else float("nan")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--hours", type=float, default=7 * 24, help="Simulated traffic (default a week)")
+    parser.add_argument("--runtime-init-ms", type=float, default=150, help="Runtime/ layer init per cold start")
+    args = parser.parse_args()
+    init = measure_init()
+    sys.stdout.write("import (ms)                alone  incremental\n")
+    for name, seconds in sorted(init.items()):
+        sys.stdout.write(f"{name:<26} {seconds['alone'] * 1000:6.1f}  "
+                         f"{seconds.get('incremental', float('nan')) * 1000:6.1f}\n")
+    sys.stdout.write(f"\n{args.hours:.0f} h simulated      cold start  route init  p50 ms  p99 ms  "
+                     f"p99 ms (low traffic routes)\n")
+    for label, single_function, memory_size in (("per route, 256 MB", False, 256), ("router, 256 MB", True, 256),
+                                                ("router, 1024 MB", True, 1024)):
+        result = simulate(init, single_function, memory_size, args.hours, args.runtime_init_ms)
+        every = [latency for latencies in result["latencies"].values() for latency in latencies]
+        low = [latency for route in LOW_TRAFFIC for latency in result["latencies"][route]]
+        sys.stdout.write(
+            f"{label:<20} {result['cold_starts'] / result['requests']:10.3%}  "
+            f"{result['route_inits'] / result['requests']:10.3%}  {percentile(every, 50):6.1f}  "
+            f"{percentile(every, 99):6.1f}  {percentile(low, 99):6.1f}\n")
+
+
+if __name__ == '__main__':
+    main()
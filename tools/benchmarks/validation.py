@@ -0,0 +1,67 @@
+"""Benchmark: request validation cost per route, pydantic vs. validators compiled from the api spec
+
+run in project root dir: python -m tools.benchmarks.validation
+"""
+
+import os
+import sys
+import json
+import timeit
+import importlib
+
+# handler modules create table resources on import
+os.environ.setdefault("AWS_DEFAULT_REGION", "eu-central-1")
+os.environ.setdefault("ArticleTableName", "Article")
+os.environ.setdefault("CommentTableName", "Comment")
+os.environ.setdefault("CatalogTableName", "Catalog")
+
+import backend.middleware as middleware  # noqa: E402
+
+article = {
+    "urlTitle": "my-article",
+    "title": "My article",
+    "tag": "test",
+    "description": "A very cool article",
+    "content": "This is so cool... Just upload it and be done... " * 100
+}
+comment_path = {"articleUrlTitle": article["urlTitle"], "commentId": "2021-01-01T00:00:00#1234"}
+
+# handler name -> (resource, method, path parameters, body)
+routes = {
+    "article_create": ("/article", "POST", {}, {**article, "key": "1234"}),
+    "article_get": ("/article/{articleUrlTitle}", "GET", {"articleUrlTitle": article["urlTitle"]}, None),
+    "article_update": ("/article/{articleUrlTitle}", "PATCH", {"articleUrlTitle": article["urlTitle"]},
+                       {**article, "key": "1234"}),
+    "comment_create": ("/article/{articleUrlTitle}/comments", "POST", {"articleUrlTitle": article["urlTitle"]},
+                       {"author": "Lea", "content": "Wow that's so cool!"}),
+    "resp_create": ("/article/{articleUrlTitle}/comments/{commentId}/resps", "POST", comment_path,
+                    {"author": "Steve", "content": "You're right"}),
+    "tag_get_article_collection": ("/tag/{tagName}", "GET", {"tagName": article["tag"]}, None),
+}
+
+
+def main():
+    for name, (resource, method, path_parameters, body) in routes.items():
+        model = importlib.import_module(f"backend.lambda_functions.{name}.lambda_function").Model
+        raw_event = {"resource": resource, "httpMethod": method, "pathParameters": path_parameters,
+                     "body": json.dumps(body) if body is not None else None}
+        validator = middleware.validation.get_validator(f"{method} {resource}")
+
+        def pydantic_build():
+            model.build(middleware.Event(raw_event), None)
+
+        def compiled_build():
+            event = middleware.Event(raw_event)
+            validator(event)
+            model.build_validated(event, None)
+
+        results = []
+        for fn in (pydantic_build, compiled_build):
+            seconds = min(timeit.repeat(fn, number=20_000, repeat=5)) / 20_000
+            results.append(seconds * 1e6)
+        sys.stdout.write(f"{method + ' ' + resource:<56} pydantic {results[0]:6.2f} us  "
+                         f"compiled {results[1]:6.2f} us\n")
+
+
+if __name__ == '__main__':
+    main()
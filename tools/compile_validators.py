@@ -0,0 +1,85 @@
+"""Compiles the request schemas of the api spec into backend/middleware/request_schemas.json
+
+The middleware builds (and caches) a validator per route from that file, see backend/middleware/validation.py
+run in project root dir: python tools/compile_validators.py [--max-body-size BYTES]
+(operations can raise their limit with "x-max-body-size", e.g. bulk imports)
+"""
+
+import sys
+import json
+import argparse
+import yaml
+
+SPEC = "swagger/api_spec.yaml"
+OUTPUT = "backend/middleware/request_schemas.json"
+METHODS = ("get", "put", "post", "delete", "patch")
+KEYWORDS = ("type", "required", "properties", "additionalProperties", "items", "enum",
+            "minLength", "maxLength", "minimum", "maximum", "minItems", "maxItems")
+
+
+def lookup(spec: dict, ref: str):
+    target = spec
+    for part in ref.lstrip("#/").split("/"):
+        target = target[part]
+    return target
+
+
+def resolve(spec: dict, node):
+    """Inlines '$ref's and strips keywords that are irrelevant for validation"""
+    if isinstance(node, list):
+        return [resolve(spec, item) for item in node]
+    if not isinstance(node, dict):
+        return node
+    if "$ref" in node:
+        return resolve(spec, lookup(spec, node["$ref"]))
+    resolved = {}
+    for key, value in node.items():
+        if key == "properties":
+            resolved[key] = {name: resolve(spec, schema) for name, schema in value.items()}
+        elif key in KEYWORDS:
+            resolved[key] = resolve(spec, value)
+    return resolved
+
+
+def compile_route(spec: dict, operation: dict, max_body_size: int):
+    route = {"parameters": {}, "maxBodySize": operation.get("x-max-body-size", max_body_size)}
+    for parameter in operation.get("parameters", []):
+        if "$ref" in parameter:
+            parameter = lookup(spec, parameter["$ref"])
+        location = route["parameters"].setdefault(parameter["in"], {})
+        location[parameter["name"]] = {
+            "required": parameter.get("required", False),
+            "schema": resolve(spec, parameter.get("schema", {}))
+        }
+    request_body = operation.get("requestBody")
+    if request_body:
+        route["body"] = resolve(spec, request_body["content"]["application/json"]["schema"])
+        route["bodyRequired"] = request_body.get("required", False)
+    return route
+
+
+def compile_spec(spec: dict, max_body_size: int):
+    routes = {}
+    for path, operations in spec["paths"].items():
+        for method, operation in operations.items():
+            if method in METHODS:
+                routes[f"{method.upper()} {path}"] = compile_route(spec, operation, max_body_size)
+    return routes
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--max-body-size", type=int, default=400 * 1024,
+                        help="Max. raw request body size in bytes (default: DynamoDB's item size limit)")
+    args = parser.parse_args()
+    with open(SPEC) as f:
+        spec = yaml.safe_load(f)
+    routes = compile_spec(spec, args.max_body_size)
+    with open(OUTPUT, "w") as f:
+        json.dump(routes, f, indent=1, sort_keys=True)
+        f.write("\n")
+    sys.stdout.write(f"Compiled {len(routes)} routes into {OUTPUT}\n")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,89 @@
+"""Moves the replies of the comments' "resps" maps into their own items (see backend/middleware/comments.py)
+
+Batched: the comment table is scanned in pages of --batch-size comments, each comment is migrated with one
+transaction (reply items put, "resps" removed if it didn't change meanwhile). Resumable: the scan position is saved
+to --checkpoint after every page, and migrated comments don't match the scan's filter anymore (re-running is safe).
+run in project root dir: python -m tools.migrate_comment_replies COMMENT_TABLE_NAME [--batch-size N] [--checkpoint FILE]
+"""
+
+import os
+import sys
+import json
+import argparse
+
+MAX_TRANSACT_ITEMS = 100
+
+
+def migrate_comment(middleware, table_name: str, comment: dict) -> int:
+    """Migrates a comment's replies, returns their number (raises TransactionCanceled if the comment changed)"""
+    puts = [
+        {"Put": {
+            "TableName": table_name,
+            "Item": {**middleware.comments.reply_key(comment["articleUrlTitle"], comment["id"], resp_id),
+                     "author": resp.get("author"), "content": resp.get("content")}
+        }}
+        for resp_id, resp in comment["resps"].items()
+    ]
+    remove = {"Update": {
+        "TableName": table_name,
+        "Key": {"articleUrlTitle": comment["articleUrlTitle"], "id": comment["id"]},
+        "UpdateExpression": "REMOVE resps",
+        "ConditionExpression": "resps = :resps",
+        "ExpressionAttributeValues": {":resps": comment["resps"]}
+    }}
+    # more replies than fit in one transaction: put the first ones ahead (idempotent), the rest with the removal
+    while len(puts) >= MAX_TRANSACT_ITEMS:
+        middleware.transact_write_items(puts[:MAX_TRANSACT_ITEMS])
+        puts = puts[MAX_TRANSACT_ITEMS:]
+    middleware.transact_write_items([*puts, remove])
+    return len(comment["resps"])
+
+
+def migrate(middleware, table, batch_size: int = 100, checkpoint: str = None):
+    start_key = None
+    if checkpoint and os.path.exists(checkpoint):
+        with open(checkpoint) as f:
+            start_key = json.load(f)["startKey"]
+    comments = replies = 0
+    while True:
+        response = table.scan(
+            FilterExpression="attribute_exists(resps)",
+            Limit=batch_size,
+            ExclusiveStartKey=start_key
+        )
+        for comment in response["Items"]:
+            while True:
+                try:
+                    replies += migrate_comment(middleware, table.name, comment)
+                    break
+                except middleware.TransactionCanceled as e:
+                    if not e.condition_failed:
+                        raise
+                    # the map changed meanwhile (a reply was deleted), migrate the current one
+                    comment = table.get_item(Key={"articleUrlTitle": comment["articleUrlTitle"],
+                                                  "id": comment["id"]}, ConsistentRead=True).get("Item")
+                    if comment is None or "resps" not in comment:
+                        break
+            comments += 1
+        start_key = response.get("LastEvaluatedKey")
+        if checkpoint:
+            with open(checkpoint, "w") as f:
+                json.dump({"startKey": start_key}, f)
+        sys.stdout.write(f"Migrated {comments} comments ({replies} replies)\n")
+        if start_key is None:
+            return comments, replies
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("comment_table_name", help="Name of the comment table")
+    parser.add_argument("--batch-size", type=int, default=100, help="Items read per scan page (default 100)")
+    parser.add_argument("--checkpoint", help="File to save/ resume the scan position")
+    args = parser.parse_args()
+    os.environ["CommentTableName"] = args.comment_table_name
+    import backend.middleware as middleware
+    migrate(middleware, middleware.get_comment_table(), args.batch_size, args.checkpoint)
+
+
+if __name__ == '__main__':
+    main()
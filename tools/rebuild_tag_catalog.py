@@ -0,0 +1,30 @@
+"""Reconciles the tag catalog (catalog table) with the article table, see backend/middleware/tag_catalog.py
+
+Run it after the first deployment of the catalog table, and whenever the catalog may have drifted.
+run in project root dir: python -m tools.rebuild_tag_catalog ARTICLE_TABLE_NAME CATALOG_TABLE_NAME [--dry-run] [--segments N]
+"""
+
+import os
+import sys
+import argparse
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("article_table_name", help="Name of the article table")
+    parser.add_argument("catalog_table_name", help="Name of the catalog table")
+    parser.add_argument("--dry-run", action="store_true", help="Only print the tags that would change")
+    parser.add_argument("--segments", type=int, default=4, help="Parallel scan segments of the article table")
+    args = parser.parse_args()
+    os.environ["ArticleTableName"] = args.article_table_name
+    os.environ["CatalogTableName"] = args.catalog_table_name
+    import backend.middleware as middleware
+    changes = middleware.tag_catalog.rebuild(
+        middleware.get_article_table(), middleware.get_catalog_table(), dry_run=args.dry_run,
+        segments=args.segments)
+    for change, tags in changes.items():
+        sys.stdout.write(f"{'Would have ' if args.dry_run else ''}{change} {len(tags)} tags: {', '.join(tags)}\n")
+
+
+if __name__ == '__main__':
+    main()
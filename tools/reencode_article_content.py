@@ -0,0 +1,76 @@
+"""Re-encodes the stored content of existing articles, see backend/middleware/article_content.py
+
+Contents above the threshold are compressed, only articles whose stored form changes are written. The writes are
+conditional on the article's version: articles edited meanwhile are skipped (the edit encoded them already).
+--decompress stores every content as a plain string again (e.g. before rolling back).
+run in project root dir: python -m tools.reencode_article_content TABLE_NAME [--dry-run] [--decompress]
+"""
+
+import os
+import sys
+import argparse
+
+
+def _size(stored) -> int:
+    return len(stored.encode()) if isinstance(stored, str) else len(stored)
+
+
+def reencode(middleware, table, dry_run: bool = False, decompress: bool = False) -> dict:
+    """Returns the number of articles and re-encoded articles, and the stored content bytes before/ after"""
+    import botocore.exceptions
+    stats = {"articles": 0, "reencoded": 0, "bytesBefore": 0, "bytesAfter": 0}
+    for item in table.iter_scan(ProjectionExpression="urlTitle, content, contentEncoding, version"):
+        if "content" not in item:
+            continue
+        stats["articles"] += 1
+        content = middleware.article_content.decode(dict(item))["content"]
+        if decompress:
+            stored, encoding = content, None
+        else:
+            stored, encoding = middleware.article_content.encode(content)
+        stats["bytesBefore"] += _size(item["content"])
+        if encoding == item.get("contentEncoding"):
+            stats["bytesAfter"] += _size(item["content"])
+            continue
+        stats["bytesAfter"] += _size(stored)
+        stats["reencoded"] += 1
+        if dry_run:
+            continue
+        values = {":content": stored}
+        if encoding is None:
+            expression = "SET content=:content REMOVE contentEncoding"
+        else:
+            expression = "SET content=:content, contentEncoding=:content_encoding"
+            values[":content_encoding"] = encoding
+        if "version" in item:
+            condition = "version = :version"
+            values[":version"] = item["version"]
+        else:
+            condition = "attribute_exists(urlTitle) AND attribute_not_exists(version)"
+        try:
+            table.update_item(Key={"urlTitle": item["urlTitle"]}, UpdateExpression=expression,
+                              ConditionExpression=condition, ExpressionAttributeValues=values)
+        except botocore.exceptions.ClientError as e:
+            if e.response["Error"]["Code"] != "ConditionalCheckFailedException":  # edited or deleted meanwhile
+                raise
+            stats["reencoded"] -= 1
+            stats["bytesAfter"] += _size(item["content"]) - _size(stored)
+    return stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("table_name", help="Name of the article table")
+    parser.add_argument("--dry-run", action="store_true", help="Only count the articles to re-encode")
+    parser.add_argument("--decompress", action="store_true", help="Store all contents uncompressed")
+    args = parser.parse_args()
+    os.environ["ArticleTableName"] = args.table_name
+    import backend.middleware as middleware
+    stats = reencode(middleware, middleware.get_article_table(low_level=True), args.dry_run, args.decompress)
+    sys.stdout.write(
+        f"{'Would re-encode' if args.dry_run else 'Re-encoded'} {stats['reencoded']} of {stats['articles']} "
+        f"articles, stored content: {stats['bytesBefore']} -> {stats['bytesAfter']} bytes\n")
+
+
+if __name__ == '__main__':
+    main()
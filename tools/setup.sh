@@ -4,11 +4,18 @@
 rm -rf "build/"
 mkdir "build/"
 
+pip install -r requirements.txt
+
+python tools/compile_validators.py
+
 mkdir -p "build/middleware_layer/python/backend"
 cp -r "backend/middleware" "build/middleware_layer/python/backend"
 
 mkdir -p "build/vendor_layer/python"
 pydantic="$(grep "pydantic" requirements.txt)"
 pip install "$pydantic" -t build/vendor_layer/python
-
-pip install -r requirements.txt
+# compiled packages: wheels for the Lambda runtime (Python 3.8, x86_64), not for the build machine
+lambda_platform=(--platform manylinux2014_x86_64 --python-version 3.8 --implementation cp --only-binary=:all:)
+# optional, the middleware falls back to the stdlib
+pip install orjson "${lambda_platform[@]}" -t build/vendor_layer/python
+pip install brotli "${lambda_platform[@]}" -t build/vendor_layer/python